@@ -0,0 +1,58 @@
+"""Add running rating aggregates to perfis_pregadores
+
+Revision ID: add_agregados_avaliacoes
+Revises: add_jobs_geracao
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_agregados_avaliacoes'
+down_revision = 'add_jobs_geracao'
+branch_labels = None
+depends_on = None
+
+CRITERIOS = ('qualidade_conteudo', 'apresentacao', 'fundamentacao_biblica', 'engajamento')
+
+
+def upgrade() -> None:
+    # Agregados das avaliações: o score deixa de calcular AVG sobre todo o histórico
+    op.add_column('perfis_pregadores', sa.Column('avaliacoes_total', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('perfis_pregadores', sa.Column('avaliacoes_soma_notas', sa.Numeric(12, 1), nullable=False, server_default='0'))
+    for criterio in CRITERIOS:
+        op.add_column('perfis_pregadores', sa.Column(f'soma_{criterio}', sa.Numeric(12, 1), nullable=False, server_default='0'))
+        op.add_column('perfis_pregadores', sa.Column(f'total_{criterio}', sa.Integer(), nullable=False, server_default='0'))
+
+    # Preencher a partir das avaliações existentes (uma passada agrupada)
+    atribuicoes = ",\n            ".join(
+        f"soma_{c} = a.soma_{c}, total_{c} = a.total_{c}" for c in CRITERIOS
+    )
+    agregados = ",\n                ".join(
+        f"COALESCE(SUM({c}), 0) AS soma_{c}, COUNT({c}) AS total_{c}" for c in CRITERIOS
+    )
+    op.execute(f"""
+        UPDATE perfis_pregadores p SET
+            avaliacoes_total = a.total,
+            avaliacoes_soma_notas = a.soma_notas,
+            {atribuicoes}
+        FROM (
+            SELECT
+                pregador_id,
+                COUNT(*) AS total,
+                COALESCE(SUM(nota), 0) AS soma_notas,
+                {agregados}
+            FROM avaliacoes
+            GROUP BY pregador_id
+        ) a
+        WHERE a.pregador_id = p.usuario_id
+    """)
+
+
+def downgrade() -> None:
+    for criterio in reversed(CRITERIOS):
+        op.drop_column('perfis_pregadores', f'total_{criterio}')
+        op.drop_column('perfis_pregadores', f'soma_{criterio}')
+    op.drop_column('perfis_pregadores', 'avaliacoes_soma_notas')
+    op.drop_column('perfis_pregadores', 'avaliacoes_total')
@@ -0,0 +1,52 @@
+"""Add historico_scores table
+
+Revision ID: add_historico_scores
+Revises: add_agregados_avaliacoes
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'add_historico_scores'
+down_revision = 'add_agregados_avaliacoes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Série histórica do score: pontos diários recentes e mensais compactados
+    op.create_table(
+        'historico_scores',
+        sa.Column('pregador_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('usuarios.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('periodo_inicio', sa.Date(), nullable=False),
+        sa.Column('granularidade', sa.String(3), nullable=False, server_default='dia'),
+        sa.Column('score_medio', sa.Numeric(3, 2), nullable=False),
+        sa.Column('score_avaliacoes', sa.Numeric(3, 2), nullable=False),
+        sa.Column('score_frequencia', sa.Numeric(3, 2), nullable=False),
+        sa.Column('score_pontualidade', sa.Numeric(3, 2), nullable=False),
+        sa.Column('avaliacoes_total', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('amostras', sa.Integer(), nullable=False, server_default='1'),
+        sa.Column('atualizado_em', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint('pregador_id', 'periodo_inicio', 'granularidade'),
+        sa.CheckConstraint("granularidade IN ('dia', 'mes')", name='chk_historico_score_granularidade'),
+    )
+
+    # Primeiro ponto: o score atual de cada perfil
+    op.execute("""
+        INSERT INTO historico_scores (
+            pregador_id, periodo_inicio, granularidade,
+            score_medio, score_avaliacoes, score_frequencia, score_pontualidade, avaliacoes_total
+        )
+        SELECT
+            usuario_id, CURRENT_DATE, 'dia',
+            COALESCE(score_medio, 0), COALESCE(score_avaliacoes, 0),
+            COALESCE(score_frequencia, 0), COALESCE(score_pontualidade, 0), avaliacoes_total
+        FROM perfis_pregadores
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('historico_scores')
@@ -0,0 +1,48 @@
+"""Add jobs_geracao table
+
+Revision ID: add_jobs_geracao
+Revises: 7c50a429cfd5
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'add_jobs_geracao'
+down_revision = '7c50a429cfd5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Jobs de geração de escala executados em segundo plano
+    op.create_table(
+        'jobs_geracao',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('distrito_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('distritos.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('solicitado_por', postgresql.UUID(as_uuid=True), sa.ForeignKey('usuarios.id', ondelete='SET NULL'), nullable=True),
+        sa.Column('escala_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('escalas.id', ondelete='SET NULL'), nullable=True),
+        sa.Column('mes_referencia', sa.Integer(), nullable=False),
+        sa.Column('ano_referencia', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(20), nullable=False, server_default='pendente'),
+        sa.Column('fase', sa.String(30), nullable=True),
+        sa.Column('percentual', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('slots_processados', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('slots_total', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('relatorio', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('erro', sa.Text(), nullable=True),
+        sa.Column('iniciado_em', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('concluido_em', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('criado_em', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('atualizado_em', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index('idx_jobs_geracao_status', 'jobs_geracao', ['status', 'criado_em'])
+    op.create_index('idx_jobs_geracao_distrito_mes', 'jobs_geracao', ['distrito_id', 'mes_referencia', 'ano_referencia'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_jobs_geracao_distrito_mes', table_name='jobs_geracao')
+    op.drop_index('idx_jobs_geracao_status', table_name='jobs_geracao')
+    op.drop_table('jobs_geracao')
@@ -1,10 +1,11 @@
 """Router: Escalas"""
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from app.core.database import get_db
-from app.core.deps import require_pastor_distrital, get_current_active_user
-from app.models import Escala, Usuario, Pregacao, Igreja
+from app.core.deps import require_pastor_distrital, require_membro_associacao, get_current_active_user
+from app.models import Escala, Usuario, Pregacao, Igreja, JobGeracao
 from app.models.escala import StatusEscala
 from app.models.usuario import PerfilUsuario
 from app.schemas.escala import (
@@ -12,10 +13,18 @@ from app.schemas.escala import (
     EscalaUpdate,
     EscalaResponse,
     EscalaGerarRequest,
+    EscalaGerarAssociacaoRequest,
+    EscalaGerarPeriodoRequest,
+    JobGeracaoResponse,
+    PreviaEscalaResponse,
+    EscalaConfirmarPreviaRequest,
     EventoCalendario,
     EventoCalendarioComIgreja,
     MinhaPregacaoItem,
     RelatorioGeracao,
+    SubstitutosPregacao,
+    SimulacaoPesosRequest,
+    SimulacaoPesosResponse,
 )
 from app.schemas.pregacao import PregacaoCreate, PregacaoUpdate, PregacaoResponse
 from datetime import datetime, timedelta, date
@@ -40,11 +49,21 @@ def gerar_escala_automatica(data: EscalaGerarRequest, db: Session = Depends(get_
     - Total de pregações criadas
     - Horários que não puderam ser preenchidos
     - Estatísticas detalhadas por igreja
+    
+    Se o mesmo distrito/mês já estiver sendo gerado, retorna 409 na hora com o
+    `job_id` ativo (se a geração for um job). Se a escala acabou de ser gerada,
+    retorna essa escala (relatório com `reaproveitado`) em vez de gerar de novo.
     """
-    from app.services.escala_service import gerar_escala_automatica
+    from app.services.escala_service import gerar_escala_automatica, GeracaoEmAndamento
     
     try:
-        escala, relatorio = gerar_escala_automatica(db, data.distrito_id, data.mes_referencia, data.ano_referencia, current_user.id)
+        escala, relatorio = gerar_escala_automatica(
+            db, data.distrito_id, data.mes_referencia, data.ano_referencia, current_user.id,
+            orcamento_otimizacao=data.otimizar_segundos,
+            reaproveitar_recente=True
+        )
+    except GeracaoEmAndamento as e:
+        raise _geracao_em_andamento(e)
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
@@ -58,8 +77,23 @@ def gerar_escala_automatica(data: EscalaGerarRequest, db: Session = Depends(get_
             detail=f"Erro ao gerar escala: {str(e)}"
         )
     
-    # Serializar escala manualmente
-    escala_dict = {
+    return {
+        "escala": _serializar_escala(escala),
+        "relatorio": relatorio
+    }
+
+
+def _geracao_em_andamento(e) -> HTTPException:
+    """409 para geração já em execução no mesmo distrito/mês"""
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail={"mensagem": str(e), "job_id": e.job_id}
+    )
+
+
+def _serializar_escala(escala: Escala) -> dict:
+    """Serializar escala manualmente"""
+    return {
         "id": escala.id,
         "codigo": escala.codigo,
         "distrito_id": escala.distrito_id,
@@ -75,13 +109,209 @@ def gerar_escala_automatica(data: EscalaGerarRequest, db: Session = Depends(get_
         "finalizado_em": escala.finalizado_em,
         "atualizado_em": escala.atualizado_em
     }
-    
+
+
+@router.post("/gerar/previa", response_model=PreviaEscalaResponse)
+def pre_visualizar_escala(data: EscalaGerarRequest, db: Session = Depends(get_db), current_user: Usuario = Depends(require_pastor_distrital)):
+    """
+    Pré-visualizar a geração automática sem gravar nada no banco
+
+    Executa o algoritmo completo e retorna as pregações propostas e o relatório
+    de cobertura. Para gravar exatamente esta proposta, enviar as atribuições
+    para POST /gerar/confirmar.
+    """
+    from app.services.escala_service import pre_visualizar_escala
+
+    try:
+        return pre_visualizar_escala(db, str(data.distrito_id), data.mes_referencia, data.ano_referencia)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.post("/gerar/simulacao", response_model=SimulacaoPesosResponse)
+def simular_pesos_score(data: SimulacaoPesosRequest, db: Session = Depends(get_db), current_user: Usuario = Depends(require_pastor_distrital)):
+    """
+    Simular a geração com vários conjuntos de pesos do score (nada é gravado)
+
+    Carrega o distrito uma vez e executa a atribuição do mês para cada conjunto
+    de pesos (avaliacoes, frequencia, pontualidade), retornando cobertura,
+    distribuição de carga e concentração nos pregadores de maior score. Serve
+    para comparar configurações antes de alterar `escala.pesos_score`.
+    """
+    from app.services.simulacao_service import simular_pesos
+
+    try:
+        return simular_pesos(
+            db,
+            str(data.distrito_id),
+            data.mes_referencia,
+            data.ano_referencia,
+            [p.dict() for p in data.pesos],
+            estrategia=data.estrategia,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.post("/gerar/confirmar", status_code=status.HTTP_201_CREATED)
+def confirmar_pre_visualizacao(data: EscalaConfirmarPreviaRequest, db: Session = Depends(get_db), current_user: Usuario = Depends(require_pastor_distrital)):
+    """
+    Gravar uma pré-visualização como escala em rascunho
+
+    As atribuições são revalidadas contra o estado atual (indisponibilidades,
+    outras pregações, limites) e gravadas em uma única escrita. Se algo mudou
+    desde a pré-visualização, retorna 400 com os conflitos e nada é gravado.
+    """
+    from app.services.escala_service import confirmar_pre_visualizacao, GeracaoEmAndamento
+
+    try:
+        escala, relatorio = confirmar_pre_visualizacao(
+            db,
+            str(data.distrito_id),
+            data.mes_referencia,
+            data.ano_referencia,
+            [a.dict() for a in data.atribuicoes],
+            current_user.id,
+        )
+    except GeracaoEmAndamento as e:
+        raise _geracao_em_andamento(e)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
     return {
-        "escala": escala_dict,
+        "escala": _serializar_escala(escala),
         "relatorio": relatorio
     }
 
 
+@router.post("/gerar/jobs", response_model=JobGeracaoResponse, status_code=status.HTTP_202_ACCEPTED)
+def criar_job_geracao(data: EscalaGerarRequest, db: Session = Depends(get_db), current_user: Usuario = Depends(require_pastor_distrital)):
+    """
+    Enfileirar a geração automática da escala (execução em segundo plano)
+
+    Retorna o job imediatamente; o progresso é consultado em
+    GET /gerar/jobs/{job_id} ou acompanhado por GET /gerar/jobs/{job_id}/eventos.
+    Repetir a requisição enquanto o job está ativo retorna o mesmo job.
+    """
+    from app.services.job_geracao_service import criar_job
+
+    try:
+        return criar_job(db, str(data.distrito_id), data.mes_referencia, data.ano_referencia, current_user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.get("/gerar/jobs/{job_id}", response_model=JobGeracaoResponse)
+def obter_job_geracao(job_id: str, db: Session = Depends(get_db), current_user: Usuario = Depends(get_current_active_user)):
+    """Consultar status, fase e percentual de um job de geração (relatório ao concluir)"""
+    job = db.query(JobGeracao).filter(JobGeracao.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return job
+
+
+@router.get("/gerar/jobs/{job_id}/eventos")
+def acompanhar_job_geracao(job_id: str, db: Session = Depends(get_db), current_user: Usuario = Depends(get_current_active_user)):
+    """
+    Acompanhar um job de geração via Server-Sent Events
+
+    Envia um evento a cada mudança de progresso e encerra quando o job termina.
+    """
+    import time
+    from app.core.database import SessionLocal
+    from app.models import StatusJobGeracao
+
+    if not db.query(JobGeracao.id).filter(JobGeracao.id == job_id).first():
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+
+    finais = (StatusJobGeracao.CONCLUIDO.value, StatusJobGeracao.ERRO.value)
+
+    def eventos():
+        ultimo = None
+        while True:
+            sessao = SessionLocal()
+            try:
+                job = sessao.query(JobGeracao).filter(JobGeracao.id == job_id).first()
+                dados = JobGeracaoResponse.model_validate(job).model_dump_json()
+                final = job.status in finais
+            finally:
+                sessao.close()
+            if dados != ultimo:
+                ultimo = dados
+                yield f"data: {dados}\n\n"
+            if final:
+                return
+            time.sleep(1)
+
+    return StreamingResponse(eventos(), media_type="text/event-stream")
+
+
+@router.post("/gerar/periodo", status_code=status.HTTP_201_CREATED)
+def gerar_escalas_periodo(data: EscalaGerarPeriodoRequest, db: Session = Depends(get_db), current_user: Usuario = Depends(require_pastor_distrital)):
+    """
+    Gerar escalas de vários meses consecutivos (ex.: um trimestre) de uma vez
+
+    Cria uma escala em rascunho por mês. A carga de cada pregador é levada de
+    um mês para o outro, melhorando o rodízio (configuração `escala.fator_rotacao`).
+    Retorna um relatório por mês e a distribuição de pregações por pregador.
+    """
+    from app.services.escala_service import gerar_escalas_periodo, GeracaoEmAndamento
+
+    try:
+        return gerar_escalas_periodo(
+            db,
+            str(data.distrito_id),
+            data.mes_inicio,
+            data.ano_inicio,
+            data.quantidade_meses,
+            current_user.id,
+        )
+    except GeracaoEmAndamento as e:
+        raise _geracao_em_andamento(e)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.post("/gerar/associacao", status_code=status.HTTP_201_CREATED)
+def gerar_escalas_associacao(data: EscalaGerarAssociacaoRequest, db: Session = Depends(get_db), current_user: Usuario = Depends(require_membro_associacao)):
+    """
+    Gerar as escalas do mês para todos os distritos ativos de uma associação
+
+    Os distritos são gerados em paralelo (um processo e uma sessão por worker).
+    Retorna um relatório consolidado com o resultado de cada distrito; a falha
+    de um distrito (ex.: escala já existente) não interrompe os demais.
+    """
+    from app.services.geracao_associacao_service import gerar_escalas_associacao
+
+    if current_user.associacao_id and str(current_user.associacao_id) != str(data.associacao_id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Associação diferente da do usuário")
+
+    try:
+        return gerar_escalas_associacao(db, str(data.associacao_id), data.mes_referencia, data.ano_referencia, current_user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.post("/{escala_id}/repreencher")
+def repreencher_escala(escala_id: str, db: Session = Depends(get_db), current_user: Usuario = Depends(require_pastor_distrital)):
+    """
+    Repreencher uma escala em rascunho
+
+    Substitui apenas as pregações que passaram a violar restrições (recusadas,
+    pregador indisponível, inativo, já escalado no dia ou acima do limite
+    mensal) e preenche os horários vagos com o algoritmo de geração, mantendo
+    todas as demais pregações. 409 se houver geração em andamento no período.
+    """
+    from app.services.escala_service import GeracaoEmAndamento, repreencher_escala
+
+    try:
+        return repreencher_escala(db, escala_id)
+    except GeracaoEmAndamento as e:
+        raise _geracao_em_andamento(e)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
 @router.get("/{escala_id}/relatorio", response_model=RelatorioGeracao)
 def obter_relatorio_geracao(escala_id: str, db: Session = Depends(get_db), current_user: Usuario = Depends(get_current_active_user)):
     """
@@ -92,54 +322,30 @@ def obter_relatorio_geracao(escala_id: str, db: Session = Depends(get_db), curre
     - Quais horários não puderam ser preenchidos
     - Quais igrejas não receberam nenhuma pregação
     """
+    from app.services.escala_service import relatorio_escala_existente
+
     escala = db.query(Escala).filter(Escala.id == escala_id).first()
     if not escala:
         raise HTTPException(status_code=404, detail="Escala não encontrada")
     
-    # Buscar todas as igrejas do distrito
-    igrejas = db.query(Igreja).filter(
-        Igreja.distrito_id == escala.distrito_id,
-        Igreja.ativo == True
-    ).all()
-    
-    # Buscar pregações da escala
-    pregacoes = db.query(Pregacao).filter(Pregacao.escala_id == escala_id).all()
-    
-    # Agrupar pregações por igreja
-    pregacoes_por_igreja = {}
-    for pregacao in pregacoes:
-        igreja_id = str(pregacao.igreja_id)
-        if igreja_id not in pregacoes_por_igreja:
-            pregacoes_por_igreja[igreja_id] = []
-        pregacoes_por_igreja[igreja_id].append(pregacao)
-    
-    # Calcular estatísticas
-    estatisticas = []
-    igrejas_sem_pregacao = []
+    return relatorio_escala_existente(db, escala)
+
+
+@router.get("/{escala_id}/substitutos", response_model=List[SubstitutosPregacao])
+def listar_substitutos(escala_id: str, db: Session = Depends(get_db), current_user: Usuario = Depends(require_pastor_distrital)):
+    """
+    Sugerir substitutos para todas as pregações recusadas da escala
     
-    for igreja in igrejas:
-        igreja_id_str = str(igreja.id)
-        pregacoes_igreja = pregacoes_por_igreja.get(igreja_id_str, [])
-        num_pregacoes = len(pregacoes_igreja)
-        
-        if num_pregacoes == 0:
-            igrejas_sem_pregacao.append(igreja.nome)
-        
-        estatisticas.append({
-            "igreja_id": igreja_id_str,
-            "igreja_nome": igreja.nome,
-            "pregacoes_criadas": num_pregacoes,
-            "horarios_sem_pregador": 0  # Não temos como calcular retroativamente
-        })
+    Para cada recusa retorna os candidatos disponíveis por score e um
+    pregador sugerido, sem sugerir a mesma pessoa duas vezes no mesmo dia.
+    """
+    from app.services.substituicao_service import substitutos_da_escala
+
+    escala = db.query(Escala).filter(Escala.id == escala_id).first()
+    if not escala:
+        raise HTTPException(status_code=404, detail="Escala não encontrada")
     
-    return {
-        "escala_id": str(escala.id),
-        "total_igrejas": len(igrejas),
-        "total_pregacoes": len(pregacoes),
-        "total_horarios_sem_pregador": 0,  # Não temos como calcular retroativamente
-        "igrejas_sem_pregacao": igrejas_sem_pregacao,
-        "estatisticas_por_igreja": estatisticas
-    }
+    return substitutos_da_escala(db, escala)
 
 
 # ==============================
@@ -249,8 +455,13 @@ def remover_pregacao(
     if not preg:
         raise HTTPException(status_code=404, detail="Pregação não encontrada")
 
+    from app.services.pregador_service import agendar_scores, descontar_avaliacoes_pregacao
+
+    # As avaliações saem em cascata com a pregação: descontá-las dos agregados
+    pregadores_avaliados = descontar_avaliacoes_pregacao(db, preg)
     db.delete(preg)
     db.commit()
+    agendar_scores(db, pregadores_avaliados)
     return
 
 
@@ -1,11 +1,19 @@
 """Router: Pregadores"""
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Optional
+from datetime import date, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from pydantic import UUID4
 from sqlalchemy.orm import Session
 from app.core.database import get_db
-from app.core.deps import require_pregador, get_current_active_user
+from app.core.deps import require_pregador, require_pastor_distrital, get_current_active_user
 from app.models import Usuario, PerfilPregador
-from app.schemas.pregador import PregadorResponse, PregadorUpdate
+from app.schemas.pregador import (
+    PregadorResponse,
+    PregadorUpdate,
+    RecalculoEstatisticasRequest,
+    RecalculoEstatisticasResponse,
+    SerieHistoricoScore,
+)
 
 router = APIRouter()
 
@@ -49,6 +57,62 @@ def listar_pregadores(distrito_id: str = None, skip: int = 0, limit: int = 100,
     
     return resultado
 
+@router.post("/recalcular-estatisticas", response_model=RecalculoEstatisticasResponse)
+def recalcular_estatisticas(data: RecalculoEstatisticasRequest, db: Session = Depends(get_db), current_user: Usuario = Depends(require_pastor_distrital)):
+    """
+    Recalcular totais de pregações, taxa de frequência e score de todos os
+    pregadores de um distrito ou de uma associação (um único comando no banco)
+
+    O escopo de associação é restrito a membros da associação.
+    """
+    from app.services.pregador_service import recalcular_estatisticas_em_lote
+
+    if bool(data.distrito_id) == bool(data.associacao_id):
+        raise HTTPException(status_code=400, detail="Informe o distrito ou a associação")
+    if data.associacao_id and not current_user.tem_perfil("membro_associacao"):
+        raise HTTPException(status_code=403, detail="Sem permissão")
+
+    return recalcular_estatisticas_em_lote(db, distrito_id=data.distrito_id, associacao_id=data.associacao_id)
+
+@router.get("/historico-score", response_model=List[SerieHistoricoScore])
+def historico_score(
+    distrito_id: Optional[str] = None,
+    pregador_ids: Optional[List[UUID4]] = Query(None, max_length=200),
+    inicio: Optional[date] = None,
+    fim: Optional[date] = None,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=200),
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    """
+    Séries históricas de score para os sparklines do ranking (uma consulta).
+
+    Informe `pregador_ids` ou `distrito_id`; com o distrito, os pregadores são
+    os da mesma página de GET /pregadores/ (ordem por score, skip/limit).
+    Período padrão: os últimos 12 meses.
+    """
+    from app.services.historico_score_service import consultar_historico
+
+    fim = fim or date.today()
+    inicio = inicio or fim - timedelta(days=365)
+    if inicio > fim:
+        raise HTTPException(status_code=400, detail="A data inicial deve ser anterior à final")
+
+    if pregador_ids:
+        ids = [str(pid) for pid in pregador_ids]
+    elif distrito_id:
+        ids = [str(uid) for uid, in db.query(PerfilPregador.usuario_id).join(Usuario).filter(
+            Usuario.ativo == True,
+            PerfilPregador.ativo == True,
+            Usuario.distrito_id == distrito_id
+        ).order_by(PerfilPregador.score_medio.desc()).offset(skip).limit(limit).all()]
+    else:
+        raise HTTPException(status_code=400, detail="Informe os pregadores ou o distrito")
+
+    series = consultar_historico(db, ids, inicio, fim)
+    return [{"pregador_id": pid, "pontos": pontos} for pid, pontos in series.items()]
+
 @router.get("/{usuario_id}", response_model=PregadorResponse)
 def obter_pregador(usuario_id: str, db: Session = Depends(get_db), current_user: Usuario = Depends(get_current_active_user)):
     pregador = db.query(PerfilPregador).filter(PerfilPregador.usuario_id == usuario_id).first()
@@ -5,6 +5,7 @@ from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.core.deps import require_pregador, get_current_active_user
 from app.models import TrocaEscala, Usuario, Pregacao
+from app.models.troca_escala import StatusTroca
 from app.schemas.troca import TrocaCreate, TrocaResponse, TrocaAceitarRejeitar
 
 router = APIRouter()
@@ -59,18 +60,27 @@ def responder_troca(troca_id: str, data: TrocaAceitarRejeitar, db: Session = Dep
     
     from datetime import datetime
     if data.aceitar:
-        troca.status = "aceita"
-        troca.aceito_destinatario_em = datetime.utcnow()
-        troca.concluido_em = datetime.utcnow()
-        
-        # Executar troca automaticamente
+        # Troca de pregadores + status da troca em uma única transação (com travas de linha)
         from app.services.escala_service import executar_troca_automatica
-        executar_troca_automatica(db, troca.id)
-    else:
-        troca.status = "rejeitada"
-        troca.rejeitado_em = datetime.utcnow()
-        troca.motivo_rejeicao = data.motivo_rejeicao
-        troca.rejeitado_por = current_user.id
+        try:
+            troca = executar_troca_automatica(db, troca.id)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+        db.refresh(troca)
+        return troca
+    
+    # Travar a troca para não rejeitar uma troca sendo aceita ao mesmo tempo
+    troca = db.query(TrocaEscala).filter(
+        TrocaEscala.id == troca_id
+    ).with_for_update().populate_existing().first()
+    if troca.status != StatusTroca.PENDENTE_DESTINATARIO:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Troca não está mais pendente")
+    
+    troca.status = StatusTroca.REJEITADA
+    troca.rejeitado_em = datetime.utcnow()
+    troca.motivo_rejeicao = data.motivo_rejeicao
+    troca.rejeitado_por = current_user.id
     
     db.commit()
     db.refresh(troca)
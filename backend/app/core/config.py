@@ -155,6 +155,18 @@ class Settings(BaseSettings):
     SCORE_WEIGHT_FREQUENCIA: float = 0.25
     SCORE_WEIGHT_PONTUALIDADE: float = 0.15
     SCORE_PENALIZACAO_RECUSA: float = 0.15
+    GERACAO_MAX_WORKERS: int = 0  # Processos na geração por associação (0 = número de CPUs)
+    GERACAO_JOBS_WORKER_INTERNO: bool = True  # Executar jobs de geração dentro da API
+    GERACAO_JOBS_INTERVALO_SEGUNDOS: int = 5  # Intervalo de verificação da fila de jobs
+    GERACAO_JOBS_TIMEOUT_MINUTOS: int = 30  # Job em execução sem progresso é considerado interrompido
+    GERACAO_REAPROVEITAR_MINUTOS: int = 10  # Repetir a geração dentro deste prazo devolve a escala recém-gerada
+
+    # ============================================================
+    # RECÁLCULO DE SCORE
+    # ============================================================
+    SCORE_FILA_WORKER_INTERNO: bool = True  # Recalcular o score fora da requisição de avaliação
+    SCORE_FILA_JANELA_SEGUNDOS: float = 10.0  # Avaliações do mesmo pregador na janela geram um só recálculo
+    HISTORICO_SCORE_DIAS_DIARIOS: int = 90  # Pontos diários mais antigos são compactados em pontos mensais
 
     # ============================================================
     # LEMBRETES
@@ -0,0 +1,98 @@
+"""
+Instrumentação por fase (tempo, comandos SQL e linhas)
+Sistema de Gestão de Escalas de Pregação - IASD
+"""
+
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+
+from .database import engine
+
+
+# Instrumentação ativa na thread/contexto atual (None = desligada, custo zero nas fases)
+_instrumentacao_ativa: ContextVar[Optional["Instrumentacao"]] = ContextVar("instrumentacao_ativa", default=None)
+
+
+class Instrumentacao:
+    """
+    Mede fases sequenciais de um processamento: tempo de parede, comandos SQL e
+    linhas (retornadas ou afetadas). Os comandos são contados pelo listener do
+    engine e atribuídos à fase corrente do contexto.
+
+    Uso:
+        with Instrumentacao() as inst:
+            iniciar_fase("carregamento")
+            ...
+            iniciar_fase("gravacao")   # encerra a fase anterior
+            ...
+        inst.resumo()
+    """
+
+    def __init__(self):
+        self.fases: List[Dict] = []
+        self._atual: Optional[Dict] = None
+        self._inicio_fase = 0.0
+        self._inicio = 0.0
+        self._token = None
+        self.total_ms = 0.0
+
+    def __enter__(self) -> "Instrumentacao":
+        self._token = _instrumentacao_ativa.set(self)
+        self._inicio = perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.encerrar_fase()
+        self.total_ms = (perf_counter() - self._inicio) * 1000
+        _instrumentacao_ativa.reset(self._token)
+
+    def iniciar_fase(self, nome: str) -> None:
+        self.encerrar_fase()
+        self._atual = {"fase": nome, "tempo_ms": 0.0, "comandos_sql": 0, "linhas": 0}
+        self._inicio_fase = perf_counter()
+
+    def encerrar_fase(self) -> None:
+        if self._atual is not None:
+            self._atual["tempo_ms"] = (perf_counter() - self._inicio_fase) * 1000
+            self.fases.append(self._atual)
+            self._atual = None
+
+    def registrar_sql(self, linhas: int) -> None:
+        if self._atual is not None:
+            self._atual["comandos_sql"] += 1
+            if linhas > 0:
+                self._atual["linhas"] += linhas
+
+    def resumo(self) -> Dict:
+        """Fases na ordem de execução (fases repetidas são somadas) e totais"""
+        fases: Dict[str, Dict] = {}
+        for medicao in self.fases:
+            acumulado = fases.setdefault(medicao["fase"], {"tempo_ms": 0.0, "comandos_sql": 0, "linhas": 0})
+            acumulado["tempo_ms"] += medicao["tempo_ms"]
+            acumulado["comandos_sql"] += medicao["comandos_sql"]
+            acumulado["linhas"] += medicao["linhas"]
+        for acumulado in fases.values():
+            acumulado["tempo_ms"] = round(acumulado["tempo_ms"], 1)
+        return {
+            "tempo_total_ms": round(self.total_ms, 1),
+            "comandos_sql": sum(f["comandos_sql"] for f in fases.values()),
+            "linhas": sum(f["linhas"] for f in fases.values()),
+            "fases": [{"fase": nome, **valores} for nome, valores in fases.items()],
+        }
+
+
+def iniciar_fase(nome: str) -> None:
+    """Inicia uma fase (encerrando a anterior) se houver instrumentação ativa; senão não faz nada"""
+    instrumentacao = _instrumentacao_ativa.get()
+    if instrumentacao is not None:
+        instrumentacao.iniciar_fase(nome)
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _contar_comando_sql(conn, cursor, statement, parameters, context, executemany):
+    instrumentacao = _instrumentacao_ativa.get()
+    if instrumentacao is not None:
+        instrumentacao.registrar_sql(getattr(cursor, "rowcount", 0) or 0)
@@ -180,12 +180,30 @@ async def startup_event():
         Base.metadata.create_all(bind=engine)
         logger.info("Tabelas criadas/verificadas no banco de dados")
 
+    # Worker de jobs de geração de escalas (pode rodar separado: worker_geracao.py)
+    if settings.GERACAO_JOBS_WORKER_INTERNO:
+        from app.services.job_geracao_service import iniciar_worker_interno
+        iniciar_worker_interno()
+
+    # Recálculo de score adiado e agrupado por pregador (avaliações)
+    if settings.SCORE_FILA_WORKER_INTERNO:
+        from app.services.fila_score_service import iniciar_worker_interno as iniciar_worker_score
+        iniciar_worker_score()
+
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Executado ao encerrar a aplicação"""
     logger.info("Encerrando aplicação...")
 
+    if settings.GERACAO_JOBS_WORKER_INTERNO:
+        from app.services.job_geracao_service import parar_worker_interno
+        parar_worker_interno()
+
+    if settings.SCORE_FILA_WORKER_INTERNO:
+        from app.services.fila_score_service import parar_worker_interno as parar_worker_score
+        parar_worker_score()
+
 
 # ============================================================
 # ROTAS PRINCIPAIS
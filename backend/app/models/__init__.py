@@ -19,6 +19,8 @@ from .notificacao import Notificacao, TipoNotificacao, StatusNotificacao
 from .configuracao import Configuracao
 from .log_auditoria import LogAuditoria
 from .log_importacao import LogImportacao
+from .job_geracao import JobGeracao, StatusJobGeracao
+from .historico_score import HistoricoScore
 
 __all__ = [
     # Models
@@ -38,6 +40,8 @@ __all__ = [
     "Configuracao",
     "LogAuditoria",
     "LogImportacao",
+    "JobGeracao",
+    "HistoricoScore",
     # Enums
     "PerfilUsuario",
     "StatusAprovacao",
@@ -48,4 +52,5 @@ __all__ = [
     "StatusTroca",
     "TipoNotificacao",
     "StatusNotificacao",
+    "StatusJobGeracao",
 ]
@@ -0,0 +1,44 @@
+"""
+Model: HistoricoScore
+"""
+
+from sqlalchemy import Column, String, Integer, Date, Numeric, ForeignKey, DateTime, CheckConstraint
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class HistoricoScore(Base):
+    """
+    Série histórica dos componentes do score por pregador.
+    Pontos diários nos últimos dias (HISTORICO_SCORE_DIAS_DIARIOS); depois
+    disso, compactados em um ponto mensal (média dos diários do mês).
+    """
+
+    __tablename__ = "historico_scores"
+
+    # Chave: pregador + início do período + granularidade ("dia" ou "mes")
+    pregador_id = Column(UUID(as_uuid=True), ForeignKey("usuarios.id", ondelete="CASCADE"), primary_key=True)
+    periodo_inicio = Column(Date, primary_key=True)
+    granularidade = Column(String(3), primary_key=True, default="dia")
+
+    # Componentes do score (mesma escala de perfis_pregadores)
+    score_medio = Column(Numeric(3, 2), nullable=False)
+    score_avaliacoes = Column(Numeric(3, 2), nullable=False)
+    score_frequencia = Column(Numeric(3, 2), nullable=False)
+    score_pontualidade = Column(Numeric(3, 2), nullable=False)
+    avaliacoes_total = Column(Integer, nullable=False, default=0)
+
+    # Pontos diários agregados neste ponto (1 no diário)
+    amostras = Column(Integer, nullable=False, default=1)
+
+    atualizado_em = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    # Constraints
+    __table_args__ = (
+        CheckConstraint("granularidade IN ('dia', 'mes')", name="chk_historico_score_granularidade"),
+    )
+
+    def __repr__(self):
+        return f"<HistoricoScore {self.pregador_id} {self.granularidade} {self.periodo_inicio} score={self.score_medio}>"
@@ -0,0 +1,65 @@
+"""
+Model: JobGeracao
+"""
+
+from sqlalchemy import Column, String, Integer, Text, ForeignKey, DateTime, Index
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.orm import relationship
+import uuid
+import enum
+
+from app.core.database import Base
+from .mixins import TimestampMixinSimples
+
+
+class StatusJobGeracao(str, enum.Enum):
+    """Enum de status de job de geração"""
+    PENDENTE = "pendente"
+    EXECUTANDO = "executando"
+    CONCLUIDO = "concluido"
+    ERRO = "erro"
+
+
+class JobGeracao(Base, TimestampMixinSimples):
+    """Jobs de geração automática de escala executados em segundo plano"""
+
+    __tablename__ = "jobs_geracao"
+
+    # Chaves
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    distrito_id = Column(UUID(as_uuid=True), ForeignKey("distritos.id", ondelete="CASCADE"), nullable=False)
+    solicitado_por = Column(UUID(as_uuid=True), ForeignKey("usuarios.id", ondelete="SET NULL"))
+    escala_id = Column(UUID(as_uuid=True), ForeignKey("escalas.id", ondelete="SET NULL"))
+
+    # Período de referência
+    mes_referencia = Column(Integer, nullable=False)
+    ano_referencia = Column(Integer, nullable=False)
+
+    # Status e progresso
+    status = Column(String(20), nullable=False, default="pendente")
+    fase = Column(String(30))  # carregando, atribuindo, otimizando, tematicas, gravando
+    percentual = Column(Integer, nullable=False, default=0)
+    slots_processados = Column(Integer, nullable=False, default=0)
+    slots_total = Column(Integer, nullable=False, default=0)
+
+    # Resultado
+    relatorio = Column(JSONB)
+    erro = Column(Text)
+
+    # Timestamps específicos
+    iniciado_em = Column(DateTime(timezone=True))
+    concluido_em = Column(DateTime(timezone=True))
+
+    # Constraints
+    __table_args__ = (
+        Index("idx_jobs_geracao_status", "status", "criado_em"),
+        Index("idx_jobs_geracao_distrito_mes", "distrito_id", "mes_referencia", "ano_referencia"),
+    )
+
+    # Relacionamentos
+    distrito = relationship("Distrito")
+    solicitante = relationship("Usuario", foreign_keys=[solicitado_por])
+    escala = relationship("Escala")
+
+    def __repr__(self):
+        return f"<JobGeracao {self.mes_referencia}/{self.ano_referencia} Distrito {self.distrito_id} Status={self.status}>"
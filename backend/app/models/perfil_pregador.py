@@ -37,6 +37,19 @@ class PerfilPregador(Base):
     pregacoes_faltou = Column(Integer, default=0)
     pregacoes_recusadas = Column(Integer, default=0)
 
+    # Agregados das avaliações recebidas (atualizados a cada avaliação, sem reler o histórico)
+    avaliacoes_total = Column(Integer, nullable=False, default=0, server_default="0")
+    avaliacoes_soma_notas = Column(Numeric(12, 1), nullable=False, default=0, server_default="0")
+    # Critérios são opcionais: soma e quantidade de avaliações que informaram cada um
+    soma_qualidade_conteudo = Column(Numeric(12, 1), nullable=False, default=0, server_default="0")
+    total_qualidade_conteudo = Column(Integer, nullable=False, default=0, server_default="0")
+    soma_apresentacao = Column(Numeric(12, 1), nullable=False, default=0, server_default="0")
+    total_apresentacao = Column(Integer, nullable=False, default=0, server_default="0")
+    soma_fundamentacao_biblica = Column(Numeric(12, 1), nullable=False, default=0, server_default="0")
+    total_fundamentacao_biblica = Column(Integer, nullable=False, default=0, server_default="0")
+    soma_engajamento = Column(Numeric(12, 1), nullable=False, default=0, server_default="0")
+    total_engajamento = Column(Integer, nullable=False, default=0, server_default="0")
+
     # Taxas (0-100%)
     taxa_frequencia = Column(Numeric(5, 2), default=100.00)
     taxa_pontualidade = Column(Numeric(5, 2), default=100.00)
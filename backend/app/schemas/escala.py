@@ -2,7 +2,7 @@
 Schemas: Escala
 """
 
-from typing import Optional, List, Dict
+from typing import Any, Optional, List, Dict
 from datetime import datetime, date, time
 from pydantic import BaseModel, Field, UUID4
 
@@ -48,6 +48,117 @@ class EscalaGerarRequest(BaseModel):
     distrito_id: UUID4
     mes_referencia: int = Field(..., ge=1, le=12)
     ano_referencia: int = Field(..., ge=2024)
+    # Segundos de otimização por busca local (None = configuração do distrito, 0 = desligada)
+    otimizar_segundos: Optional[float] = Field(None, ge=0, le=30)
+
+
+class EscalaGerarPeriodoRequest(BaseModel):
+    """Schema para gerar escalas de vários meses consecutivos"""
+    distrito_id: UUID4
+    mes_inicio: int = Field(..., ge=1, le=12)
+    ano_inicio: int = Field(..., ge=2024)
+    quantidade_meses: int = Field(..., ge=1, le=12)
+
+
+class EscalaGerarAssociacaoRequest(BaseModel):
+    """Schema para gerar as escalas de todos os distritos de uma associação"""
+    associacao_id: UUID4
+    mes_referencia: int = Field(..., ge=1, le=12)
+    ano_referencia: int = Field(..., ge=2024)
+
+
+class AtribuicaoPrevia(BaseModel):
+    """Pregação proposta por uma pré-visualização de geração"""
+    igreja_id: UUID4
+    pregador_id: UUID4
+    data_pregacao: date
+    horario_pregacao: time
+    tematica_id: Optional[UUID4] = None
+    dia_semana: Optional[str] = None
+    nome_culto: Optional[str] = None
+    igreja_nome: Optional[str] = None
+    pregador_nome: Optional[str] = None
+
+
+class PreviaEscalaResponse(BaseModel):
+    """Resultado da pré-visualização (nada é gravado)"""
+    distrito_id: UUID4
+    mes_referencia: int
+    ano_referencia: int
+    estrategia: str
+    atribuicoes: List[AtribuicaoPrevia]
+    relatorio: Dict[str, Any]
+
+
+class EscalaConfirmarPreviaRequest(EscalaGerarRequest):
+    """Schema para gravar exatamente as atribuições de uma pré-visualização"""
+    atribuicoes: List[AtribuicaoPrevia]
+
+
+class PesosScore(BaseModel):
+    """Pesos do score efetivo (normalizados para somar 1)"""
+    avaliacoes: float = Field(..., ge=0)
+    frequencia: float = Field(..., ge=0)
+    pontualidade: float = Field(..., ge=0)
+
+
+class SimulacaoPesosRequest(BaseModel):
+    """Schema para simular a geração com vários conjuntos de pesos de score"""
+    distrito_id: UUID4
+    mes_referencia: int = Field(..., ge=1, le=12)
+    ano_referencia: int = Field(..., ge=2024)
+    pesos: List[PesosScore] = Field(..., min_length=1, max_length=100)
+    estrategia: Optional[str] = Field(None, pattern="^(guloso|fluxo)$")  # None = configuração do distrito
+
+
+class ResultadoSimulacao(BaseModel):
+    """Métricas da escala simulada para um conjunto de pesos"""
+    pesos: PesosScore
+    pregacoes: int
+    horarios_sem_pregador: int
+    cobertura_percentual: float
+    pregadores_escalados: int
+    carga_minima: int
+    carga_maxima: int
+    carga_desvio_padrao: float
+    concentracao_top_percentual: float  # Pregações feitas pelos 20% de maior score
+    repeticoes_consecutivas: int
+    tempo_ms: float
+
+
+class SimulacaoPesosResponse(BaseModel):
+    """Resultado da simulação de pesos (nada é gravado)"""
+    distrito_id: UUID4
+    mes_referencia: int
+    ano_referencia: int
+    estrategia: str
+    total_horarios: int
+    total_pregadores: int
+    pesos_atuais: PesosScore
+    resultados: List[ResultadoSimulacao]
+    tempo_total_ms: float
+
+
+class JobGeracaoResponse(BaseModel):
+    """Schema de resposta de job de geração em segundo plano"""
+    id: UUID4
+    distrito_id: UUID4
+    mes_referencia: int
+    ano_referencia: int
+    status: str
+    fase: Optional[str] = None
+    percentual: int
+    slots_processados: int
+    slots_total: int
+    escala_id: Optional[UUID4] = None
+    relatorio: Optional[Dict[str, Any]] = None
+    erro: Optional[str] = None
+    criado_em: datetime
+    iniciado_em: Optional[datetime] = None
+    concluido_em: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
 
 
 # =======================
@@ -62,6 +173,31 @@ class EstatisticaIgreja(BaseModel):
     horarios_sem_pregador: int
 
 
+class LacunaGeracao(BaseModel):
+    """Horário que ficou sem pregador"""
+    igreja_id: UUID4
+    igreja_nome: str
+    data_pregacao: date
+    dia_semana: str
+    horario_pregacao: time
+    nome_culto: Optional[str] = None
+
+
+class CoberturaIgreja(BaseModel):
+    """Linha do mapa de cobertura: fração preenchida por data (None = sem culto na data)"""
+    igreja_id: UUID4
+    igreja_nome: str
+    preenchimento: List[Optional[float]]
+
+
+class MapaCobertura(BaseModel):
+    """Mapa de calor igrejas × datas da geração"""
+    datas: List[date]
+    horarios_por_data: List[int]
+    pregadores_viaveis_por_data: List[int]
+    igrejas: List[CoberturaIgreja]
+
+
 class RelatorioGeracao(BaseModel):
     """Relatório completo da geração de escala"""
     escala_id: UUID4
@@ -70,6 +206,34 @@ class RelatorioGeracao(BaseModel):
     total_horarios_sem_pregador: int
     igrejas_sem_pregacao: List[str]
     estatisticas_por_igreja: List[EstatisticaIgreja]
+    lacunas: List[LacunaGeracao] = []
+    mapa_cobertura: Optional[MapaCobertura] = None  # Somente na geração
+    otimizacao: Optional[Dict[str, Any]] = None  # Objetivo antes/depois da busca local
+    instrumentacao: Optional[Dict[str, Any]] = None  # Tempo, SQL e linhas por fase (somente na geração)
+    reaproveitado: bool = False  # Escala recém-gerada devolvida a uma nova solicitação
+
+
+class CandidatoSubstituto(BaseModel):
+    """Pregador disponível para substituir uma pregação recusada"""
+    pregador_id: UUID4
+    pregador_nome: str
+    score: float
+    limite_mensal: int
+    pregacoes_mes: int
+
+
+class SubstitutosPregacao(BaseModel):
+    """Pregação recusada com os candidatos a substituto (ordem do ranking)"""
+    pregacao_id: UUID4
+    igreja_id: UUID4
+    igreja_nome: Optional[str] = None
+    data_pregacao: date
+    horario_pregacao: time
+    pregador_recusou_id: UUID4
+    pregador_recusou_nome: Optional[str] = None
+    motivo_recusa: Optional[str] = None
+    candidatos: List[CandidatoSubstituto]
+    sugerido_id: Optional[UUID4] = None  # Sem repetir pregador no mesmo dia dentro do lote
 
 
 # =======================
@@ -56,3 +56,32 @@ class PregadorResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class RecalculoEstatisticasRequest(BaseModel):
+    """Escopo do recálculo em lote de estatísticas e scores (um dos dois)"""
+    distrito_id: Optional[UUID4] = None
+    associacao_id: Optional[UUID4] = None
+
+
+class RecalculoEstatisticasResponse(BaseModel):
+    """Resultado do recálculo em lote"""
+    perfis_atualizados: int
+    tempo_ms: float
+
+
+class PontoHistoricoScore(BaseModel):
+    """Ponto da série histórica de score (diário ou mensal compactado)"""
+    data: date
+    granularidade: str  # dia, mes
+    score_medio: Decimal
+    score_avaliacoes: Decimal
+    score_frequencia: Decimal
+    score_pontualidade: Decimal
+    avaliacoes_total: int
+
+
+class SerieHistoricoScore(BaseModel):
+    """Série histórica de score de um pregador (sparkline do ranking)"""
+    pregador_id: UUID4
+    pontos: List[PontoHistoricoScore]
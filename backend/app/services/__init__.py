@@ -1,5 +1,7 @@
 """Services - Lógica de Negócio"""
 
+# app.core antes dos models: processos de geração (spawn) importam os services direto
+import app.core  # noqa: F401
 from .pregador_service import recalcular_score, aplicar_penalizacao_recusa, atualizar_estatisticas
 from .escala_service import gerar_escala_automatica, executar_troca_automatica
 from .notificacao_service import enviar_notificacoes_escala, enviar_notificacao_troca
@@ -0,0 +1,130 @@
+"""
+Service: Avaliação
+Envio de avaliações pelos membros (formulário do QR code).
+
+Depois de um culto, centenas de celulares enviam avaliações em poucos minutos.
+O envio faz uma única consulta para todas as validações (pregação, período
+configurado na igreja/distrito e conflito de horário do avaliador), grava com
+INSERT ... ON CONFLICT DO NOTHING sobre `uk_avaliacao_pregacao_avaliador`
+(a restrição única faz a deduplicação, sem consulta prévia), atualiza os
+agregados do perfil e deixa o score para a fila de recálculo.
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import exists, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, aliased
+
+from app.models import Avaliacao, Pregacao, Usuario
+from app.models.configuracao import Configuracao
+
+CHAVE_PERIODO_AVALIACAO = "periodo_avaliacao"
+# Período padrão quando não há configuração na igreja nem no distrito
+PERIODO_PADRAO = {"dias_antes_pregacao": 0, "dias_depois_pregacao": 7, "habilitado": True}
+
+
+class AvaliacaoRecusada(ValueError):
+    """Avaliação rejeitada pela validação; `status_code` é o código HTTP da resposta"""
+
+    def __init__(self, mensagem: str, status_code: int = 403):
+        super().__init__(mensagem)
+        self.status_code = status_code
+
+
+def _periodo_configurado(filtro):
+    return select(Configuracao.valor).where(
+        filtro,
+        Configuracao.chave == CHAVE_PERIODO_AVALIACAO
+    ).limit(1).scalar_subquery()
+
+
+def carregar_validacao(db: Session, pregacao_id: str, avaliador: Usuario):
+    """
+    Uma consulta com tudo o que a validação precisa: dados da pregação,
+    período configurado (igreja > distrito do avaliador) e se o avaliador
+    estava escalado no mesmo horário. Retorna None se a pregação não existe.
+    """
+    outra = aliased(Pregacao)
+    return db.query(
+        Pregacao.igreja_id,
+        Pregacao.pregador_id,
+        Pregacao.data_pregacao,
+        func.coalesce(
+            _periodo_configurado(Configuracao.igreja_id == avaliador.igreja_id),
+            _periodo_configurado(Configuracao.distrito_id == avaliador.distrito_id),
+        ).label("periodo"),
+        exists().where(
+            outra.pregador_id == avaliador.id,
+            outra.data_pregacao == Pregacao.data_pregacao,
+            outra.horario_pregacao == Pregacao.horario_pregacao
+        ).label("escalado_no_horario"),
+    ).filter(Pregacao.id == pregacao_id).first()
+
+
+def verificar_periodo(data_pregacao, periodo: Optional[Dict[str, Any]], agora: Optional[datetime] = None) -> None:
+    """Levanta AvaliacaoRecusada se a avaliação estiver fora do período permitido"""
+    valor = {**PERIODO_PADRAO, **(periodo or {})}
+    if not valor["habilitado"]:
+        return
+
+    inicio_dia = datetime.combine(data_pregacao, datetime.min.time())
+    data_inicio = inicio_dia - timedelta(days=valor["dias_antes_pregacao"])
+    data_fim = inicio_dia + timedelta(days=valor["dias_depois_pregacao"])
+    agora = agora or datetime.utcnow()
+
+    if agora < data_inicio:
+        raise AvaliacaoRecusada(
+            f"O formulário de avaliação estará disponível a partir de {data_inicio.strftime('%d/%m/%Y')}"
+        )
+    if agora > data_fim:
+        raise AvaliacaoRecusada(f"O período para avaliação encerrou em {data_fim.strftime('%d/%m/%Y')}")
+
+
+def enviar_avaliacao(db: Session, dados: Dict[str, Any], avaliador: Usuario) -> Avaliacao:
+    """
+    Valida e grava a avaliação de `avaliador` (dados do AvaliacaoCreate).
+
+    Comandos por envio: SELECT de validação, INSERT ... RETURNING e o UPDATE
+    dos agregados, em uma transação. O score do pregador é agendado na fila
+    (recalculado na hora se o worker não estiver ativo).
+
+    A avaliação retornada é desanexada da sessão antes do commit, para que a
+    resposta não precise recarregá-la.
+    """
+    from app.services.pregador_service import atualizar_agregados_avaliacao, recalcular_score
+    from app.services.fila_score_service import agendar_recalculo_score
+
+    pregacao = carregar_validacao(db, dados["pregacao_id"], avaliador)
+    if not pregacao:
+        raise AvaliacaoRecusada("Pregação não encontrada", status_code=404)
+
+    verificar_periodo(pregacao.data_pregacao, pregacao.periodo)
+
+    if avaliador.igreja_id != pregacao.igreja_id:
+        raise AvaliacaoRecusada("Você só pode avaliar pregações da sua própria igreja")
+    if avaliador.id == pregacao.pregador_id:
+        raise AvaliacaoRecusada("Você não pode avaliar sua própria pregação")
+    if pregacao.escalado_no_horario:
+        raise AvaliacaoRecusada(
+            "Você não pode avaliar esta pregação pois estava escalado para pregar no mesmo horário"
+        )
+
+    avaliacao = db.scalars(
+        insert(Avaliacao).values(**dados, avaliador_id=avaliador.id).on_conflict_do_nothing(
+            constraint="uk_avaliacao_pregacao_avaliador"
+        ).returning(Avaliacao)
+    ).first()
+    if avaliacao is None:
+        db.rollback()
+        raise AvaliacaoRecusada("Você já avaliou esta pregação", status_code=400)
+
+    atualizar_agregados_avaliacao(db, avaliacao, sinal=1)
+    db.expunge(avaliacao)
+    db.commit()
+
+    pregador_id = str(avaliacao.pregador_id)
+    if not agendar_recalculo_score(pregador_id):
+        recalcular_score(db, pregador_id)
+    return avaliacao
@@ -9,6 +9,11 @@ from sqlalchemy.orm import Session
 from app.models.configuracao import Configuracao
 
 
+# Estratégias de geração de escala (chave `escala.estrategia_geracao`)
+ESTRATEGIA_GULOSO = "guloso"
+ESTRATEGIA_FLUXO = "fluxo"
+
+
 def _first_config(
     db: Session,
     chave: str,
@@ -146,3 +151,38 @@ def get_limite_forcado_extra_max(db: Session, distrito_id: str) -> int:
             except Exception:
                 pass
     return 5
+
+
+def get_estrategia_geracao(db: Session, distrito_id: str) -> str:
+    """Estratégia de atribuição usada na geração automática: "guloso" (padrão) ou "fluxo"."""
+    valor = get_district_config_value(db, distrito_id, "escala.estrategia_geracao", default=ESTRATEGIA_GULOSO)
+    if isinstance(valor, dict):
+        valor = valor.get("valor", ESTRATEGIA_GULOSO)
+    valor = str(valor).strip().lower()
+    return valor if valor in (ESTRATEGIA_GULOSO, ESTRATEGIA_FLUXO) else ESTRATEGIA_GULOSO
+
+
+def get_fator_rotacao(db: Session, distrito_id: str) -> float:
+    """Penalidade de score por pregação já atribuída nos meses anteriores de uma geração em lote.
+    Quanto maior, mais a carga é distribuída entre os pregadores ao longo do período.
+    """
+    valor = get_district_config_value(db, distrito_id, "escala.fator_rotacao", default=0.5)
+    if isinstance(valor, dict):
+        valor = valor.get("valor", 0.5)
+    try:
+        return max(0.0, float(valor))
+    except Exception:
+        return 0.5
+
+
+def get_orcamento_otimizacao(db: Session, distrito_id: str) -> float:
+    """Tempo (segundos) da busca local que melhora a escala após a atribuição; 0 desativa.
+    Limitado a 30 segundos para não prender a requisição de geração.
+    """
+    valor = get_district_config_value(db, distrito_id, "escala.otimizacao_segundos", default=0)
+    if isinstance(valor, dict):
+        valor = valor.get("valor", 0)
+    try:
+        return min(30.0, max(0.0, float(valor)))
+    except Exception:
+        return 0.0
@@ -0,0 +1,358 @@
+"""
+Service: Disponibilidade
+Fotografia em memória da disponibilidade dos pregadores usada pela geração de escalas
+"""
+
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models import Pregacao, PeriodoIndisponibilidade
+
+
+# Status que impedem outra pregação no mesmo dia
+STATUS_CONFLITO_DIA = ("agendado", "aceito")
+# Status que contam para limite mensal e semanas consecutivas
+STATUS_CONTABILIZADOS = ("agendado", "aceito", "realizado")
+
+
+class SnapshotDisponibilidade:
+    """
+    Disponibilidade dos pregadores para um período, carregada uma única vez.
+
+    Todas as validações do algoritmo de geração (indisponibilidade, conflito no
+    mesmo dia, semanas consecutivas e limite mensal) são respondidas a partir
+    de estruturas indexadas em memória, sem consultas ao banco dentro do loop.
+    """
+
+    def __init__(self, primeiro_dia: date, ultimo_dia: date):
+        self.primeiro_dia = primeiro_dia
+        self.ultimo_dia = ultimo_dia
+        # uid -> lista de intervalos (inicio, fim) de indisponibilidade
+        self.indisponibilidades: Dict[str, List[Tuple[date, date]]] = {}
+        # uid -> datas em que já está escalado (agendado/aceito)
+        self.ocupacao_por_dia: Dict[str, Set[date]] = {}
+        # (uid, igreja_id, data) de pregações contabilizadas, incluindo a semana anterior ao período
+        self.pregacoes_por_igreja: Set[Tuple[str, str, date]] = set()
+        # uid -> total de pregações contabilizadas dentro do período
+        self.contagem_mes: Dict[str, int] = {}
+        # (ano, mes) -> uid -> total de pregações contabilizadas no mês (base dos recortes)
+        self.contagem_por_mes: Dict[Tuple[int, int], Dict[str, int]] = {}
+
+    @classmethod
+    def carregar(
+        cls,
+        db: Session,
+        pregador_ids: Iterable[str],
+        primeiro_dia: date,
+        ultimo_dia: date,
+    ) -> "SnapshotDisponibilidade":
+        """Carrega indisponibilidades e pregações existentes com duas consultas"""
+        snapshot = cls(primeiro_dia, ultimo_dia)
+        ids = [str(uid) for uid in pregador_ids]
+        if not ids:
+            return snapshot
+
+        # 1. Indisponibilidades que tocam o período
+        periodos = db.query(
+            PeriodoIndisponibilidade.pregador_id,
+            PeriodoIndisponibilidade.data_inicio,
+            PeriodoIndisponibilidade.data_fim,
+        ).filter(
+            PeriodoIndisponibilidade.pregador_id.in_(ids),
+            PeriodoIndisponibilidade.ativo == True,
+            PeriodoIndisponibilidade.data_inicio <= ultimo_dia,
+            PeriodoIndisponibilidade.data_fim >= primeiro_dia,
+        ).all()
+
+        for pregador_id, inicio, fim in periodos:
+            snapshot.indisponibilidades.setdefault(str(pregador_id), []).append((inicio, fim))
+
+        # 2. Pregações existentes do período e da semana anterior (semanas consecutivas)
+        pregacoes = db.query(
+            Pregacao.pregador_id,
+            Pregacao.igreja_id,
+            Pregacao.data_pregacao,
+            Pregacao.status,
+        ).filter(
+            Pregacao.pregador_id.in_(ids),
+            Pregacao.data_pregacao >= primeiro_dia - timedelta(days=7),
+            Pregacao.data_pregacao <= ultimo_dia,
+            Pregacao.status.in_(STATUS_CONTABILIZADOS),
+        ).all()
+
+        for pregador_id, igreja_id, data_pregacao, status in pregacoes:
+            uid = str(pregador_id)
+            snapshot.pregacoes_por_igreja.add((uid, str(igreja_id), data_pregacao))
+            if status in STATUS_CONFLITO_DIA:
+                snapshot.ocupacao_por_dia.setdefault(uid, set()).add(data_pregacao)
+            if primeiro_dia <= data_pregacao <= ultimo_dia:
+                snapshot._contar(uid, data_pregacao, 1)
+
+        return snapshot
+
+    @classmethod
+    def carregar_datas(
+        cls,
+        db: Session,
+        pregador_ids: Iterable[str],
+        datas: Iterable[date],
+        primeiro_dia: date,
+        ultimo_dia: date,
+    ) -> "SnapshotDisponibilidade":
+        """
+        Fotografia restrita a algumas datas do período (repreenchimento de um rascunho).
+
+        Indisponibilidades e pregações vêm somente das `datas` (e de 7 dias antes
+        de cada uma, para semanas consecutivas); a contagem mensal é agregada no
+        banco. Responde às mesmas perguntas que `carregar` para essas datas, com
+        três consultas cujo custo acompanha a quantidade de datas.
+        """
+        snapshot = cls(primeiro_dia, ultimo_dia)
+        ids = [str(uid) for uid in pregador_ids]
+        datas = sorted(set(datas))
+        if not ids or not datas:
+            return snapshot
+
+        # 1. Indisponibilidades que tocam o intervalo das datas
+        periodos = db.query(
+            PeriodoIndisponibilidade.pregador_id,
+            PeriodoIndisponibilidade.data_inicio,
+            PeriodoIndisponibilidade.data_fim,
+        ).filter(
+            PeriodoIndisponibilidade.pregador_id.in_(ids),
+            PeriodoIndisponibilidade.ativo == True,
+            PeriodoIndisponibilidade.data_inicio <= datas[-1],
+            PeriodoIndisponibilidade.data_fim >= datas[0],
+        ).all()
+
+        for pregador_id, inicio, fim in periodos:
+            snapshot.indisponibilidades.setdefault(str(pregador_id), []).append((inicio, fim))
+
+        # 2. Pregações nas datas e uma semana antes de cada uma
+        consultadas = set(datas) | {data - timedelta(days=7) for data in datas}
+        pregacoes = db.query(
+            Pregacao.pregador_id,
+            Pregacao.igreja_id,
+            Pregacao.data_pregacao,
+            Pregacao.status,
+        ).filter(
+            Pregacao.pregador_id.in_(ids),
+            Pregacao.data_pregacao.in_(consultadas),
+            Pregacao.status.in_(STATUS_CONTABILIZADOS),
+        ).all()
+
+        for pregador_id, igreja_id, data_pregacao, status in pregacoes:
+            uid = str(pregador_id)
+            snapshot.pregacoes_por_igreja.add((uid, str(igreja_id), data_pregacao))
+            if status in STATUS_CONFLITO_DIA:
+                snapshot.ocupacao_por_dia.setdefault(uid, set()).add(data_pregacao)
+
+        # 3. Contagem mensal agregada (uma linha por pregador e mês)
+        ano = func.extract("year", Pregacao.data_pregacao)
+        mes = func.extract("month", Pregacao.data_pregacao)
+        contagens = db.query(Pregacao.pregador_id, ano, mes, func.count(Pregacao.id)).filter(
+            Pregacao.pregador_id.in_(ids),
+            Pregacao.data_pregacao >= primeiro_dia,
+            Pregacao.data_pregacao <= ultimo_dia,
+            Pregacao.status.in_(STATUS_CONTABILIZADOS),
+        ).group_by(Pregacao.pregador_id, ano, mes).all()
+
+        for pregador_id, ano_pregacao, mes_pregacao, total in contagens:
+            uid = str(pregador_id)
+            snapshot.contagem_mes[uid] = snapshot.contagem_mes.get(uid, 0) + total
+            por_mes = snapshot.contagem_por_mes.setdefault((int(ano_pregacao), int(mes_pregacao)), {})
+            por_mes[uid] = total
+
+        return snapshot
+
+    def copiar(self) -> "SnapshotDisponibilidade":
+        """Cópia independente (para executar estratégias sem afetar a fotografia original)"""
+        copia = SnapshotDisponibilidade(self.primeiro_dia, self.ultimo_dia)
+        copia.indisponibilidades = self.indisponibilidades  # somente leitura durante a geração
+        copia.ocupacao_por_dia = {uid: set(datas) for uid, datas in self.ocupacao_por_dia.items()}
+        copia.pregacoes_por_igreja = set(self.pregacoes_por_igreja)
+        copia.contagem_mes = dict(self.contagem_mes)
+        copia.contagem_por_mes = {chave: dict(contagem) for chave, contagem in self.contagem_por_mes.items()}
+        return copia
+
+    def recortar(self, primeiro_dia: date, ultimo_dia: date) -> "SnapshotDisponibilidade":
+        """
+        Visão de um mês dentro de uma fotografia carregada para vários meses.
+        Ocupação, pregações e contagens por mês são compartilhadas com a
+        fotografia original (o que for registrado em um mês vale para os
+        seguintes); a contagem mensal do recorte sai das contagens por mês.
+        """
+        recorte = SnapshotDisponibilidade(primeiro_dia, ultimo_dia)
+        recorte.indisponibilidades = self.indisponibilidades
+        recorte.ocupacao_por_dia = self.ocupacao_por_dia
+        recorte.pregacoes_por_igreja = self.pregacoes_por_igreja
+        recorte.contagem_por_mes = self.contagem_por_mes
+        ano, mes = primeiro_dia.year, primeiro_dia.month
+        while (ano, mes) <= (ultimo_dia.year, ultimo_dia.month):
+            for uid, total in self.contagem_por_mes.get((ano, mes), {}).items():
+                recorte.contagem_mes[uid] = recorte.contagem_mes.get(uid, 0) + total
+            ano, mes = (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+        return recorte
+
+    def esta_indisponivel(self, uid: str, data: date) -> bool:
+        """Pregador possui período de indisponibilidade ativo na data"""
+        for inicio, fim in self.indisponibilidades.get(uid, ()):
+            if inicio <= data <= fim:
+                return True
+        return False
+
+    def tem_conflito_no_dia(self, uid: str, data: date) -> bool:
+        """Pregador já está escalado em alguma igreja na data"""
+        return data in self.ocupacao_por_dia.get(uid, ())
+
+    def pregou_semana_anterior(self, uid: str, igreja_id: str, data: date) -> bool:
+        """Pregador pregou na mesma igreja exatamente 7 dias antes"""
+        return (uid, igreja_id, data - timedelta(days=7)) in self.pregacoes_por_igreja
+
+    def total_mes(self, uid: str) -> int:
+        """Total de pregações do pregador no período (banco + geração atual)"""
+        return self.contagem_mes.get(uid, 0)
+
+    def registrar(self, uid: str, igreja_id: str, data: date) -> None:
+        """Registra uma nova atribuição feita pela geração atual"""
+        self.ocupacao_por_dia.setdefault(uid, set()).add(data)
+        self.pregacoes_por_igreja.add((uid, igreja_id, data))
+        if self.primeiro_dia <= data <= self.ultimo_dia:
+            self._contar(uid, data, 1)
+
+    def remover(self, uid: str, igreja_id: str, data: date) -> None:
+        """Desfaz uma pregação contabilizada (ex.: removida ao repreencher um rascunho)"""
+        self.ocupacao_por_dia.get(uid, set()).discard(data)
+        self.pregacoes_por_igreja.discard((uid, igreja_id, data))
+        if self.primeiro_dia <= data <= self.ultimo_dia and self.contagem_mes.get(uid):
+            self._contar(uid, data, -1)
+
+    def bloquear_dia(self, uid: str, data: date) -> None:
+        """Impede novas atribuições do pregador na data (ex.: recusou pregar neste dia)"""
+        self.ocupacao_por_dia.setdefault(uid, set()).add(data)
+
+    def _contar(self, uid: str, data: date, delta: int) -> None:
+        """Soma `delta` na contagem do período e na do mês da data"""
+        self.contagem_mes[uid] = self.contagem_mes.get(uid, 0) + delta
+        por_mes = self.contagem_por_mes.setdefault((data.year, data.month), {})
+        por_mes[uid] = por_mes.get(uid, 0) + delta
+
+
+class MatrizDisponibilidade:
+    """
+    Matriz densa pregadores × datas montada a partir de uma fotografia.
+
+    As linhas seguem a ordem de `uids` (ranking de score na geração) e as colunas
+    a ordem de `datas`. Cada regra é uma operação vetorizada:
+    - `indisponivel`: intervalos de indisponibilidade comparados com todas as datas;
+    - `ocupado`: já escalado na data (conflito no mesmo dia);
+    - `contagem`: pregações contabilizadas no período, para a capacidade mensal;
+    - `consecutivo(igreja_id)`: pregações na igreja deslocadas uma semana.
+
+    Reflete a fotografia no momento da montagem. Como a geração só acrescenta
+    atribuições, uma matriz antiga continua sendo um superconjunto dos candidatos
+    viáveis (serve para podar, não dispensa a validação final).
+    """
+
+    def __init__(self, snapshot: SnapshotDisponibilidade, uids: Sequence[str], datas: Sequence[date]):
+        self.uids = [str(uid) for uid in uids]
+        self.datas = list(datas)
+        self.linha_por_uid = {uid: i for i, uid in enumerate(self.uids)}
+        self.coluna_por_data = {data: j for j, data in enumerate(self.datas)}
+        self._snapshot = snapshot
+        self._ordinais = np.array([data.toordinal() for data in self.datas], dtype=np.int64)
+        self._consecutivo_por_igreja: Optional[Dict[str, np.ndarray]] = None
+
+        total_pregadores, total_datas = len(self.uids), len(self.datas)
+
+        # Indisponibilidade: cada intervalo contra todas as datas de uma vez
+        self.indisponivel = np.zeros((total_pregadores, total_datas), dtype=bool)
+        intervalos = [
+            (self.linha_por_uid[uid], inicio.toordinal(), fim.toordinal())
+            for uid, periodos in snapshot.indisponibilidades.items()
+            if uid in self.linha_por_uid
+            for inicio, fim in periodos
+        ]
+        if intervalos and total_datas:
+            linhas, inicios, fins = np.array(intervalos, dtype=np.int64).T
+            cobertas = (self._ordinais >= inicios[:, None]) & (self._ordinais <= fins[:, None])
+            np.logical_or.at(self.indisponivel, linhas, cobertas)
+
+        # Conflito no mesmo dia
+        self.ocupado = np.zeros((total_pregadores, total_datas), dtype=bool)
+        ocupacoes = [
+            (self.linha_por_uid[uid], self.coluna_por_data[data])
+            for uid, datas_ocupadas in snapshot.ocupacao_por_dia.items()
+            if uid in self.linha_por_uid
+            for data in datas_ocupadas
+            if data in self.coluna_por_data
+        ]
+        if ocupacoes:
+            linhas, colunas = np.array(ocupacoes, dtype=np.int64).T
+            self.ocupado[linhas, colunas] = True
+
+        self.contagem = np.array([snapshot.total_mes(uid) for uid in self.uids], dtype=np.int64)
+        self.livre = ~(self.indisponivel | self.ocupado)
+
+    def reordenada(self, uids: Sequence[str]) -> "MatrizDisponibilidade":
+        """
+        A mesma matriz com as linhas na ordem de `uids` (outro ranking dos mesmos
+        pregadores), sem recalcular as regras a partir da fotografia.
+        """
+        linhas = np.array([self.linha_por_uid[str(uid)] for uid in uids], dtype=np.int64)
+        copia = object.__new__(MatrizDisponibilidade)
+        copia.uids = [str(uid) for uid in uids]
+        copia.datas = self.datas
+        copia.linha_por_uid = {uid: i for i, uid in enumerate(copia.uids)}
+        copia.coluna_por_data = self.coluna_por_data
+        copia._snapshot = self._snapshot
+        copia._ordinais = self._ordinais
+        copia._consecutivo_por_igreja = None if self._consecutivo_por_igreja is None else {
+            igreja_id: mascara[linhas] for igreja_id, mascara in self._consecutivo_por_igreja.items()
+        }
+        copia.indisponivel = self.indisponivel[linhas]
+        copia.ocupado = self.ocupado[linhas]
+        copia.contagem = self.contagem[linhas]
+        copia.livre = self.livre[linhas]
+        return copia
+
+    def viaveis(self, limites: np.ndarray) -> np.ndarray:
+        """Máscara pregadores × datas: livre na data e com capacidade mensal restante"""
+        return self.livre & (self.contagem < limites)[:, None]
+
+    def consecutivo(self, igreja_id: str) -> np.ndarray:
+        """Máscara pregadores × datas: pregou na igreja exatamente 7 dias antes da data"""
+        if self._consecutivo_por_igreja is None:
+            self._consecutivo_por_igreja = self._montar_consecutivos()
+        mascara = self._consecutivo_por_igreja.get(str(igreja_id))
+        if mascara is None:
+            return np.zeros((len(self.uids), len(self.datas)), dtype=bool)
+        return mascara
+
+    def _montar_consecutivos(self) -> Dict[str, np.ndarray]:
+        if not self.datas:
+            return {}
+        # Eixo diário desde uma semana antes da primeira data: a semana anterior
+        # de cada coluna é a mesma máscara deslocada 7 posições
+        base = int(self._ordinais.min()) - 7
+        total_dias = int(self._ordinais.max()) - base + 1
+        colunas_semana_anterior = self._ordinais - base - 7
+
+        por_igreja: Dict[str, List[Tuple[int, int]]] = {}
+        for uid, igreja_id, data in self._snapshot.pregacoes_por_igreja:
+            linha = self.linha_por_uid.get(uid)
+            dia = data.toordinal() - base
+            if linha is not None and 0 <= dia < total_dias:
+                por_igreja.setdefault(igreja_id, []).append((linha, dia))
+
+        mascaras: Dict[str, np.ndarray] = {}
+        for igreja_id, pregacoes in por_igreja.items():
+            diario = np.zeros((len(self.uids), total_dias), dtype=bool)
+            linhas, dias = np.array(pregacoes, dtype=np.int64).T
+            diario[linhas, dias] = True
+            mascaras[igreja_id] = diario[:, colunas_semana_anterior]
+        return mascaras
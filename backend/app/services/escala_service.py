@@ -3,41 +3,401 @@ Service: Escala
 Lógica de negócio para escalas - ALGORITMO DE GERAÇÃO AUTOMÁTICA
 """
 
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, func, or_
-from datetime import datetime, date, timedelta
-from typing import List, Optional, Dict, Tuple
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import and_, exists, func, or_, insert, text
+from datetime import datetime, date, time, timedelta
+from typing import Callable, Iterator, List, Optional, Dict, Set, Tuple
+from contextlib import contextmanager
+import hashlib
+import heapq
+import json
 import logging
+import uuid
+import numpy as np
+from time import perf_counter
 from app.models import (
     Escala, Pregacao, PerfilPregador, Usuario, Igreja, HorarioCulto,
-    Tematica, PeriodoIndisponibilidade, TrocaEscala
+    PeriodoIndisponibilidade, TrocaEscala
 )
 from app.models.notificacao import TipoNotificacao
+from app.core.instrumentacao import Instrumentacao, iniciar_fase
 from app.services.config_service import (
     get_score_weights,
     get_max_pregacoes_mes_default,
     get_limite_forcado_extra_max,
+    get_estrategia_geracao,
+    get_fator_rotacao,
+    get_orcamento_otimizacao,
+    ESTRATEGIA_GULOSO,
+    ESTRATEGIA_FLUXO,
 )
+from app.services.disponibilidade_service import (
+    MatrizDisponibilidade,
+    SnapshotDisponibilidade,
+    STATUS_CONFLITO_DIA,
+    STATUS_CONTABILIZADOS,
+)
+from app.services.pregador_service import agendar_scores, descontar_avaliacoes_pregacao
+from app.services.tematica_service import montar_calendario_tematicas
 
 logger = logging.getLogger(__name__)
 
 
+# Ordem de processamento dos dias (prioridade: Sábado > Domingo > Quarta)
+DIAS_PRIORIDADE = ["sabado", "domingo", "quarta"]
+
+# Callback de progresso: (fase, horarios_processados, total_horarios)
+ProgressoGeracao = Callable[[str, int, int], None]
+
+# Espera máxima por travas de linha ao executar uma troca (ms)
+TROCA_LOCK_TIMEOUT_MS = 5000
+
+
+class GeracaoEmAndamento(ValueError):
+    """Já há uma geração em execução para o mesmo distrito/mês"""
+
+    def __init__(self, mes: int, ano: int, job_id: Optional[str] = None):
+        super().__init__(f"Geração da escala de {mes:02d}/{ano} já em andamento")
+        self.mes = mes
+        self.ano = ano
+        self.job_id = job_id
+
+
+class ContextoGeracao:
+    """
+    Dados carregados uma única vez para gerar a escala de um distrito/mês.
+    As estratégias de atribuição trabalham somente sobre este contexto (sem SQL).
+    """
+
+    def __init__(
+        self,
+        distrito_id: str,
+        mes: int,
+        ano: int,
+        igrejas: List[Igreja],
+        pregadores_list: List[tuple],
+        score_por_usuario: Dict[str, float],
+        limite_por_usuario: Dict[str, int],
+        limite_forcado_extra_max: int,
+        horarios_cultos: List[dict],
+        datas_por_dia: Dict[str, List[date]],
+        primeiro_dia: date,
+        ultimo_dia: date,
+        snapshot: SnapshotDisponibilidade,
+    ):
+        self.distrito_id = distrito_id
+        self.mes = mes
+        self.ano = ano
+        self.igrejas = igrejas
+        self.pregadores_list = pregadores_list
+        self.score_por_usuario = score_por_usuario
+        self.limite_por_usuario = limite_por_usuario
+        self.limite_forcado_extra_max = limite_forcado_extra_max
+        self.horarios_cultos = horarios_cultos
+        self.datas_por_dia = datas_por_dia
+        self.primeiro_dia = primeiro_dia
+        self.ultimo_dia = ultimo_dia
+        self.snapshot = snapshot
+        self.horarios_por_igreja_dia = indexar_horarios(horarios_cultos)
+        self._slots: Optional[List[Tuple[str, date, Igreja, dict]]] = None
+        self._matriz: Optional[MatrizDisponibilidade] = None
+
+    def para_mes(
+        self,
+        mes: int,
+        ano: int,
+        snapshot: SnapshotDisponibilidade,
+        score_por_usuario: Dict[str, float]
+    ) -> "ContextoGeracao":
+        """
+        Contexto de outro mês reaproveitando igrejas, pregadores, limites e horários.
+        No mesmo mês, os horários já expandidos (`slots`) também são reaproveitados.
+        """
+        primeiro_dia, ultimo_dia, datas_por_dia = datas_do_mes(mes, ano)
+        pregadores_list = sorted(
+            self.pregadores_list,
+            key=lambda up: score_por_usuario.get(str(up[0].id), 0.0),
+            reverse=True,
+        )
+        contexto = ContextoGeracao(
+            distrito_id=self.distrito_id,
+            mes=mes,
+            ano=ano,
+            igrejas=self.igrejas,
+            pregadores_list=pregadores_list,
+            score_por_usuario=score_por_usuario,
+            limite_por_usuario=self.limite_por_usuario,
+            limite_forcado_extra_max=self.limite_forcado_extra_max,
+            horarios_cultos=self.horarios_cultos,
+            datas_por_dia=datas_por_dia,
+            primeiro_dia=primeiro_dia,
+            ultimo_dia=ultimo_dia,
+            snapshot=snapshot,
+        )
+        if (mes, ano) == (self.mes, self.ano):
+            contexto._slots = self._slots
+        return contexto
+
+    def slots(self) -> List[Tuple[str, date, Igreja, dict]]:
+        """
+        Horários a preencher no mês, na ordem de prioridade: (dia_semana, data, igreja, horario).
+        Calculado uma vez a partir do índice (igreja_id, dia_semana) e reaproveitado
+        pela atribuição, pela detecção de lacunas e pelo relatório.
+        """
+        if self._slots is None:
+            self._slots = expandir_slots(self.igrejas, self.datas_por_dia, self.horarios_por_igreja_dia)
+        return self._slots
+
+    def datas(self) -> List[date]:
+        """Datas com horários de culto, na ordem de prioridade dos horários"""
+        return list(dict.fromkeys(data for _, data, _, _ in self.slots()))
+
+    def matriz(self) -> MatrizDisponibilidade:
+        """
+        Matriz pregadores × datas da fotografia do contexto (montada na primeira chamada).
+        `executar_estrategia` a monta antes das atribuições, para o mapa de cobertura
+        refletir a disponibilidade anterior à geração.
+        """
+        if self._matriz is None:
+            self._matriz = MatrizDisponibilidade(
+                self.snapshot, [str(u.id) for u, _ in self.pregadores_list], self.datas()
+            )
+        return self._matriz
+
+
 def gerar_escala_automatica(
     db: Session,
     distrito_id: str,
     mes: int,
     ano: int,
-    criado_por_id: str
+    criado_por_id: str,
+    progresso: Optional[ProgressoGeracao] = None,
+    orcamento_otimizacao: Optional[float] = None,
+    reaproveitar_recente: bool = False
 ) -> Tuple[Escala, Dict]:
     """
     ALGORITMO DE GERAÇÃO AUTOMÁTICA DE ESCALAS
     Baseado em SCORE dos pregadores
     
+    A estratégia de atribuição é escolhida pela configuração distrital
+    `escala.estrategia_geracao` ("guloso" ou "fluxo").
+    
+    `progresso`, se informado, é chamado a cada fase e a cada horário processado.
+    `orcamento_otimizacao` (segundos) substitui a configuração `escala.otimizacao_segundos`.
+    
+    O relatório inclui `instrumentacao`: tempo, comandos SQL e linhas de cada
+    fase (também registrados no log em uma linha JSON).
+    
+    Só uma geração por distrito/mês executa por vez (trava consultiva): uma
+    segunda chamada simultânea recebe GeracaoEmAndamento na hora, sem refazer
+    o cálculo. Com `reaproveitar_recente`, se a escala do período acabou de ser
+    gerada (ver resultado_geracao_recente), ela é retornada em vez do erro de
+    escala existente.
+    
     Retorna: (escala, relatorio_geracao)
     """
+    with trava_geracao(db, distrito_id, [(mes, ano)]):
+        if reaproveitar_recente:
+            recente = resultado_geracao_recente(db, distrito_id, mes, ano)
+            if recente:
+                return recente
+        
+        with Instrumentacao() as instrumentacao:
+            contexto, estrategia, atribuicoes, complementos = planejar_escala(
+                db, distrito_id, mes, ano, progresso=progresso, orcamento_otimizacao=orcamento_otimizacao
+            )
+            
+            # 10. Gravação em lote: escala + todas as pregações em uma única transação
+            iniciar_fase("gravacao")
+            if progresso:
+                total_slots = len(contexto.slots())
+                progresso("gravando", total_slots, total_slots)
+            nova_escala = gravar_escala(db, distrito_id, mes, ano, criado_por_id, atribuicoes)
+            
+            iniciar_fase("relatorio")
+            relatorio = montar_relatorio_geracao(contexto, atribuicoes)
+    
+    relatorio["escala_id"] = str(nova_escala.id)
+    relatorio["estrategia"] = estrategia
+    relatorio.update(complementos)
+    relatorio["instrumentacao"] = instrumentacao.resumo()
     
+    logger.info("Instrumentação da geração: %s", json.dumps({
+        "distrito_id": str(distrito_id),
+        "mes": mes,
+        "ano": ano,
+        "escala_id": relatorio["escala_id"],
+        "estrategia": estrategia,
+        **relatorio["instrumentacao"],
+    }))
+    
+    return nova_escala, relatorio
+
+
+def planejar_escala(
+    db: Session,
+    distrito_id: str,
+    mes: int,
+    ano: int,
+    progresso: Optional[ProgressoGeracao] = None,
+    somente_leitura: bool = False,
+    orcamento_otimizacao: Optional[float] = None
+) -> Tuple[ContextoGeracao, str, List[Dict], Dict]:
+    """
+    Executa o algoritmo completo (passos 1-9) sem gravar a escala.
+    Com `somente_leitura`, nenhum dado é criado no banco (pré-visualização).
+    Sem `orcamento_otimizacao`, o tempo da busca local vem da configuração distrital.
+    
+    Retorna: (contexto, estrategia, atribuicoes, complementos do relatório)
+    Os complementos são `comparativo_estrategias` e `otimizacao`, quando houver.
+    """
     # 1. Verificar se já existe escala para este mês
-    escala_existente = db.query(Escala).filter(
+    iniciar_fase("verificacao")
+    verificar_escala_inexistente(db, distrito_id, mes, ano)
+    
+    # 2. A escala só é criada na gravação final (passo 10), junto com as pregações,
+    # para que toda a escrita aconteça em uma única transação curta
+    
+    # 3-7. Carregar igrejas, pregadores, configurações, horários e disponibilidade
+    if progresso:
+        progresso("carregando", 0, 0)
+    contexto = carregar_contexto_geracao(db, distrito_id, mes, ano, somente_leitura=somente_leitura)
+    
+    logger.info(f"Iniciando geração de escala para distrito {distrito_id}, mês {mes}/{ano}")
+    logger.info(f"Total de igrejas: {len(contexto.igrejas)}")
+    logger.info(f"Total de pregadores disponíveis: {len(contexto.pregadores_list)}")
+    
+    # 8-9. Atribuição (guloso ou fluxo de custo mínimo) + preenchimento de lacunas
+    iniciar_fase("configuracoes")
+    estrategia = get_estrategia_geracao(db, distrito_id)
+    if orcamento_otimizacao is None:
+        orcamento_otimizacao = get_orcamento_otimizacao(db, distrito_id)
+    atribuicoes, comparativo = executar_estrategia(contexto, estrategia, progresso=progresso)
+    complementos: Dict = {}
+    if comparativo:
+        complementos["comparativo_estrategias"] = comparativo
+    
+    # 9.1 Otimização opcional: busca local em memória dentro do orçamento de tempo
+    if orcamento_otimizacao and orcamento_otimizacao > 0:
+        from app.services.otimizacao_service import otimizar_atribuicoes
+        
+        iniciar_fase("otimizacao")
+        if progresso:
+            total_slots = len(contexto.slots())
+            progresso("otimizando", total_slots, total_slots)
+        atribuicoes, complementos["otimizacao"] = otimizar_atribuicoes(contexto, atribuicoes, orcamento_otimizacao)
+        logger.info(f"Otimização da escala: {complementos['otimizacao']}")
+    
+    # Temática sugestiva de cada pregação
+    iniciar_fase("tematicas")
+    if progresso:
+        total_slots = len(contexto.slots())
+        progresso("tematicas", total_slots, total_slots)
+    calendario = montar_calendario_tematicas(db, distrito_id, contexto.primeiro_dia, contexto.ultimo_dia)
+    for atribuicao in atribuicoes:
+        atribuicao["tematica_id"] = calendario.get(atribuicao["data_pregacao"])
+    
+    return contexto, estrategia, atribuicoes, complementos
+
+
+def gerar_escalas_periodo(
+    db: Session,
+    distrito_id: str,
+    mes_inicio: int,
+    ano_inicio: int,
+    quantidade_meses: int,
+    criado_por_id: str
+) -> Dict:
+    """
+    Gera escalas para meses consecutivos em uma única passada.
+
+    Os dados do distrito e a disponibilidade do período inteiro são carregados
+    uma vez; contagens mensais e semanas consecutivas passam de um mês para o
+    outro em memória. Para melhorar o rodízio, o score de cada pregador é
+    reduzido em `escala.fator_rotacao` por pregação já atribuída nos meses
+    anteriores do lote. Todas as escalas são gravadas na mesma transação.
+
+    Retorna o relatório combinado (um relatório por mês + carga por pregador).
+    """
+    meses = []
+    mes, ano = mes_inicio, ano_inicio
+    for _ in range(quantidade_meses):
+        meses.append((mes, ano))
+        mes, ano = (1, ano + 1) if mes == 12 else (mes + 1, ano)
+
+    with trava_geracao(db, distrito_id, meses):
+        existentes = db.query(Escala.mes_referencia, Escala.ano_referencia).filter(
+            Escala.distrito_id == distrito_id,
+            or_(*[and_(Escala.mes_referencia == m, Escala.ano_referencia == a) for m, a in meses])
+        ).all()
+        if existentes:
+            periodos = ", ".join(f"{m:02d}/{a}" for m, a in sorted(existentes, key=lambda e: (e[1], e[0])))
+            raise ValueError(f"Já existe escala para: {periodos}")
+
+        base = carregar_contexto_geracao(db, distrito_id, mes_inicio, ano_inicio, ate=meses[-1])
+        calendario = montar_calendario_tematicas(db, distrito_id, base.primeiro_dia, datas_do_mes(*meses[-1])[1])
+        estrategia = get_estrategia_geracao(db, distrito_id)
+        fator_rotacao = get_fator_rotacao(db, distrito_id)
+
+        carga_acumulada: Dict[str, int] = {}
+        relatorios = []
+        for mes, ano in meses:
+            primeiro_dia, ultimo_dia, _ = datas_do_mes(mes, ano)
+            scores = {
+                uid: score - fator_rotacao * carga_acumulada.get(uid, 0)
+                for uid, score in base.score_por_usuario.items()
+            }
+            contexto = base.para_mes(mes, ano, base.snapshot.recortar(primeiro_dia, ultimo_dia), scores)
+
+            atribuicoes, comparativo = executar_estrategia(contexto, estrategia)
+            for atribuicao in atribuicoes:
+                # Registrar na fotografia compartilhada: vale para os meses seguintes
+                contexto.snapshot.registrar(atribuicao["pregador_id"], atribuicao["igreja_id"], atribuicao["data_pregacao"])
+                carga_acumulada[atribuicao["pregador_id"]] = carga_acumulada.get(atribuicao["pregador_id"], 0) + 1
+                atribuicao["tematica_id"] = calendario.get(atribuicao["data_pregacao"])
+
+            escala = gravar_escala(db, distrito_id, mes, ano, criado_por_id, atribuicoes, commit=False)
+
+            relatorio = montar_relatorio_geracao(contexto, atribuicoes)
+            relatorio["escala_id"] = str(escala.id)
+            relatorio["mes_referencia"] = mes
+            relatorio["ano_referencia"] = ano
+            relatorio["estrategia"] = estrategia
+            if comparativo:
+                relatorio["comparativo_estrategias"] = comparativo
+            relatorios.append(relatorio)
+
+        db.commit()
+
+    nomes = {str(u.id): u.nome_completo for u, _ in base.pregadores_list}
+    cargas = [carga_acumulada.get(uid, 0) for uid in nomes]
+    return {
+        "distrito_id": str(distrito_id),
+        "meses": len(meses),
+        "fator_rotacao": fator_rotacao,
+        "total_pregacoes": sum(r["total_pregacoes"] for r in relatorios),
+        "total_horarios_sem_pregador": sum(r["total_horarios_sem_pregador"] for r in relatorios),
+        "carga_por_pregador": {
+            "minimo": min(cargas, default=0),
+            "maximo": max(cargas, default=0),
+            "media": round(sum(cargas) / len(cargas), 2) if cargas else 0,
+            "pregadores_sem_pregacao": sum(1 for c in cargas if c == 0),
+            "pregadores": sorted(
+                (
+                    {"pregador_id": uid, "pregador_nome": nome, "pregacoes": carga_acumulada.get(uid, 0)}
+                    for uid, nome in nomes.items()
+                ),
+                key=lambda p: p["pregacoes"],
+                reverse=True,
+            ),
+        },
+        "relatorios": relatorios,
+    }
+
+
+def verificar_escala_inexistente(db: Session, distrito_id: str, mes: int, ano: int) -> None:
+    """Impede gerar uma segunda escala para o mesmo distrito/mês"""
+    escala_existente = db.query(Escala.id).filter(
         Escala.distrito_id == distrito_id,
         Escala.mes_referencia == mes,
         Escala.ano_referencia == ano
@@ -45,10 +405,100 @@ def gerar_escala_automatica(
     
     if escala_existente:
         raise ValueError("Já existe uma escala para este período")
+
+
+def chave_trava_geracao(distrito_id: str, mes: int, ano: int, escopo: str = "geracao") -> int:
+    """Chave (bigint) da trava consultiva do PostgreSQL para um distrito/mês"""
+    digest = hashlib.blake2b(f"{escopo}:{distrito_id}:{ano}:{mes}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+@contextmanager
+def trava_geracao(db: Session, distrito_id: str, meses: List[Tuple[int, int]]) -> Iterator[None]:
+    """
+    Trava consultiva (pg_try_advisory_lock) por distrito/mês durante a geração.
     
-    # 2. Criar escala (status: rascunho)
+    Não espera: se outro processo já gera algum dos meses, levanta
+    GeracaoEmAndamento com o job ativo do período, se houver. A trava é de
+    sessão do PostgreSQL e fica em uma conexão própria, pois a geração faz
+    commit no meio; é liberada ao sair, e também se o processo morrer.
+    """
+    from app.models import JobGeracao, StatusJobGeracao
+
+    conexao = db.get_bind().connect()
+    obtidas: List[int] = []
+    try:
+        for mes, ano in sorted(meses, key=lambda m: (m[1], m[0])):
+            chave = chave_trava_geracao(distrito_id, mes, ano)
+            if not conexao.execute(text("SELECT pg_try_advisory_lock(:chave)"), {"chave": chave}).scalar():
+                job_id = db.query(JobGeracao.id).filter(
+                    JobGeracao.distrito_id == distrito_id,
+                    JobGeracao.mes_referencia == mes,
+                    JobGeracao.ano_referencia == ano,
+                    JobGeracao.status.in_([StatusJobGeracao.PENDENTE.value, StatusJobGeracao.EXECUTANDO.value])
+                ).scalar()
+                raise GeracaoEmAndamento(mes, ano, str(job_id) if job_id else None)
+            obtidas.append(chave)
+        conexao.commit()
+        yield
+    finally:
+        try:
+            for chave in obtidas:
+                conexao.execute(text("SELECT pg_advisory_unlock(:chave)"), {"chave": chave})
+            conexao.commit()
+        except Exception:
+            # Conexão com trava presa não volta ao pool
+            conexao.invalidate()
+        finally:
+            conexao.close()
+
+
+def resultado_geracao_recente(db: Session, distrito_id: str, mes: int, ano: int) -> Optional[Tuple[Escala, Dict]]:
+    """
+    Escala do período gerada há menos de GERACAO_REAPROVEITAR_MINUTOS e ainda
+    em rascunho, com o relatório da geração (do job que a gerou, se houver, ou
+    recalculado). Serve para repetir a resposta a um segundo clique em vez de
+    falhar com "já existe escala".
+    """
+    from app.core.config import settings
+    from app.models import JobGeracao, StatusJobGeracao
     from app.models.escala import StatusEscala
-    
+
+    limite = datetime.now().astimezone() - timedelta(minutes=settings.GERACAO_REAPROVEITAR_MINUTOS)
+    escala = db.query(Escala).filter(
+        Escala.distrito_id == distrito_id,
+        Escala.mes_referencia == mes,
+        Escala.ano_referencia == ano,
+        Escala.status == StatusEscala.RASCUNHO.value,
+        Escala.criado_em >= limite
+    ).first()
+    if not escala:
+        return None
+
+    relatorio = db.query(JobGeracao.relatorio).filter(
+        JobGeracao.escala_id == escala.id,
+        JobGeracao.status == StatusJobGeracao.CONCLUIDO.value
+    ).order_by(JobGeracao.concluido_em.desc()).scalar()
+    relatorio = dict(relatorio) if relatorio else relatorio_escala_existente(db, escala)
+    relatorio["reaproveitado"] = True
+    return escala, relatorio
+
+
+def gravar_escala(
+    db: Session,
+    distrito_id: str,
+    mes: int,
+    ano: int,
+    criado_por_id: str,
+    atribuicoes: List[Dict],
+    commit: bool = True
+) -> Escala:
+    """
+    Grava a escala em rascunho e todas as pregações em uma única transação.
+    Com `commit=False`, apenas envia ao banco (para agrupar várias escalas na mesma transação).
+    """
+    from app.models.escala import StatusEscala
+
     nova_escala = Escala(
         distrito_id=distrito_id,
         mes_referencia=mes,
@@ -58,8 +508,365 @@ def gerar_escala_automatica(
     )
     db.add(nova_escala)
     db.flush()  # Obter ID sem commit
+    persistir_pregacoes(db, nova_escala.id, atribuicoes)
+    if commit:
+        db.commit()
+        db.refresh(nova_escala)
+    return nova_escala
+
+
+def pre_visualizar_escala(db: Session, distrito_id: str, mes: int, ano: int) -> Dict:
+    """
+    Executa a geração completa sem gravar nada no banco.
+    Retorna as atribuições propostas e o relatório de cobertura; as atribuições
+    podem ser enviadas depois a `confirmar_pre_visualizacao`.
+    """
+    try:
+        contexto, estrategia, atribuicoes, complementos = planejar_escala(
+            db, distrito_id, mes, ano, somente_leitura=True
+        )
+
+        igrejas = {str(i.id): i.nome for i in contexto.igrejas}
+        pregadores = {str(u.id): u.nome_completo for u, _ in contexto.pregadores_list}
+
+        relatorio = montar_relatorio_geracao(contexto, atribuicoes)
+        relatorio["estrategia"] = estrategia
+        relatorio.update(complementos)
+    finally:
+        # Garantia: a pré-visualização nunca deixa alterações pendentes na sessão
+        db.rollback()
+
+    return {
+        "distrito_id": str(distrito_id),
+        "mes_referencia": mes,
+        "ano_referencia": ano,
+        "estrategia": estrategia,
+        "atribuicoes": [
+            {
+                **a,
+                "igreja_nome": igrejas.get(a["igreja_id"]),
+                "pregador_nome": pregadores.get(a["pregador_id"]),
+            }
+            for a in atribuicoes
+        ],
+        "relatorio": relatorio,
+    }
+
+
+def confirmar_pre_visualizacao(
+    db: Session,
+    distrito_id: str,
+    mes: int,
+    ano: int,
+    atribuicoes_previa: List[Dict],
+    criado_por_id: str
+) -> Tuple[Escala, Dict]:
+    """
+    Grava exatamente as atribuições de uma pré-visualização, em uma única escrita.
+    As restrições são revalidadas contra o estado atual do banco, pois algo pode
+    ter mudado desde a pré-visualização (indisponibilidades, outras escalas).
+    """
+    with trava_geracao(db, distrito_id, [(mes, ano)]):
+        verificar_escala_inexistente(db, distrito_id, mes, ano)
+        contexto = carregar_contexto_geracao(db, distrito_id, mes, ano)
+
+        atribuicoes, erros = validar_atribuicoes(contexto, atribuicoes_previa)
+        if erros:
+            db.rollback()
+            raise ValueError("Pré-visualização desatualizada: " + "; ".join(erros))
+
+        nova_escala = gravar_escala(db, distrito_id, mes, ano, criado_por_id, atribuicoes)
+
+    relatorio = montar_relatorio_geracao(contexto, atribuicoes)
+    relatorio["escala_id"] = str(nova_escala.id)
+    return nova_escala, relatorio
+
+
+def validar_atribuicoes(contexto: ContextoGeracao, atribuicoes_previa: List[Dict]) -> Tuple[List[Dict], List[str]]:
+    """
+    Revalida atribuições recebidas com as mesmas regras da geração: horário
+    existente no distrito, sem duplicidade, pregador do distrito, disponível,
+    sem outra pregação no dia e dentro do limite mensal (com o extra do
+    preenchimento forçado).
     
+    Retorna: (atribuicoes normalizadas, erros)
+    """
+    slots = {
+        (str(igreja.id), data_pregacao, horario["horario"]): (dia_semana_pt, horario)
+        for dia_semana_pt, data_pregacao, igreja, horario in contexto.slots()
+    }
+    pregadores = {str(u.id) for u, _ in contexto.pregadores_list}
+    snapshot = contexto.snapshot.copiar()
+
+    atribuicoes: List[Dict] = []
+    erros: List[str] = []
+    chaves_atribuidas: Set[Tuple[str, date, time]] = set()
+    for previa in atribuicoes_previa:
+        igreja_id = str(previa["igreja_id"])
+        pregador_id = str(previa["pregador_id"])
+        data_pregacao = previa["data_pregacao"]
+        chave = (igreja_id, data_pregacao, previa["horario_pregacao"])
+        descricao = f"{data_pregacao} {previa['horario_pregacao']}"
+
+        if chave not in slots:
+            erros.append(f"Horário inexistente no distrito: {descricao}")
+            continue
+        if chave in chaves_atribuidas:
+            erros.append(f"Horário atribuído mais de uma vez: {descricao}")
+            continue
+        if pregador_id not in pregadores:
+            erros.append(f"Pregador não disponível no distrito: {descricao}")
+            continue
+        if snapshot.esta_indisponivel(pregador_id, data_pregacao):
+            erros.append(f"Pregador indisponível em {data_pregacao}")
+            continue
+        if snapshot.tem_conflito_no_dia(pregador_id, data_pregacao):
+            erros.append(f"Pregador já escalado em {data_pregacao}")
+            continue
+        limite = contexto.limite_por_usuario.get(pregador_id, 4) + contexto.limite_forcado_extra_max
+        if snapshot.total_mes(pregador_id) >= limite:
+            erros.append(f"Pregador acima do limite mensal: {descricao}")
+            continue
+
+        dia_semana_pt, horario = slots[chave]
+        atribuicao = _nova_atribuicao(igreja_id, pregador_id, dia_semana_pt, data_pregacao, horario)
+        atribuicao["tematica_id"] = str(previa["tematica_id"]) if previa.get("tematica_id") else None
+        atribuicoes.append(atribuicao)
+        chaves_atribuidas.add(chave)
+        snapshot.registrar(pregador_id, igreja_id, data_pregacao)
+
+    return atribuicoes, erros
+
+
+def detectar_violacoes(db: Session, escala: Escala, contexto: ContextoGeracao) -> Tuple[List[Pregacao], Dict[str, str]]:
+    """
+    Pregações da escala (em ordem de data e horário) e o motivo de cada uma
+    que viola alguma regra da geração, por id: recusada, pregador inativo,
+    indisponível, já escalado no mesmo dia em outra pregação ou acima do
+    limite mensal (com o extra do preenchimento forçado).
+
+    Indisponibilidade e conflito no dia saem da mesma consulta das pregações;
+    a contagem mensal, de uma consulta agregada. O custo acompanha o tamanho
+    da escala, não o do distrito.
+    """
+    outra = aliased(Pregacao)
+    indisponivel = exists().where(
+        PeriodoIndisponibilidade.pregador_id == Pregacao.pregador_id,
+        PeriodoIndisponibilidade.ativo == True,
+        PeriodoIndisponibilidade.data_inicio <= Pregacao.data_pregacao,
+        PeriodoIndisponibilidade.data_fim >= Pregacao.data_pregacao,
+    )
+    # Entre duas pregações da própria escala no mesmo dia, mantém-se a de horário anterior
+    conflito = exists().where(
+        outra.pregador_id == Pregacao.pregador_id,
+        outra.data_pregacao == Pregacao.data_pregacao,
+        outra.id != Pregacao.id,
+        outra.status.in_(STATUS_CONFLITO_DIA),
+        or_(
+            outra.escala_id != Pregacao.escala_id,
+            outra.horario_pregacao < Pregacao.horario_pregacao,
+            and_(outra.horario_pregacao == Pregacao.horario_pregacao, outra.id < Pregacao.id),
+        ),
+    )
+    linhas = db.query(Pregacao, indisponivel, conflito).filter(
+        Pregacao.escala_id == escala.id
+    ).order_by(Pregacao.data_pregacao, Pregacao.horario_pregacao).all()
+
+    pregadores = {p.pregador_id for p, _, _ in linhas}
+    contagem = {
+        str(pregador_id): total
+        for pregador_id, total in db.query(Pregacao.pregador_id, func.count(Pregacao.id)).filter(
+            Pregacao.pregador_id.in_(pregadores),
+            Pregacao.data_pregacao >= contexto.primeiro_dia,
+            Pregacao.data_pregacao <= contexto.ultimo_dia,
+            Pregacao.status.in_(STATUS_CONTABILIZADOS),
+        ).group_by(Pregacao.pregador_id).all()
+    } if pregadores else {}
+
+    pregadores_ativos = {str(u.id) for u, _ in contexto.pregadores_list}
+    motivos: Dict[str, str] = {}
+    for pregacao, esta_indisponivel, tem_conflito in linhas:
+        uid = str(pregacao.pregador_id)
+        if pregacao.status == "recusado":
+            motivo = "recusada"
+        elif uid not in pregadores_ativos:
+            motivo = "pregador inativo"
+        elif esta_indisponivel:
+            motivo = "pregador indisponível"
+        elif tem_conflito and pregacao.status in STATUS_CONFLITO_DIA:
+            motivo = "pregador já escalado no dia"
+        else:
+            continue
+        motivos[str(pregacao.id)] = motivo
+        if pregacao.status in STATUS_CONTABILIZADOS:
+            contagem[uid] = contagem.get(uid, 0) - 1
+
+    # Acima do limite mensal: saem as pregações mais tardias do pregador
+    for pregacao, _, _ in reversed(linhas):
+        uid = str(pregacao.pregador_id)
+        if str(pregacao.id) in motivos or pregacao.status not in STATUS_CONTABILIZADOS:
+            continue
+        limite = contexto.limite_por_usuario.get(uid, 4) + contexto.limite_forcado_extra_max
+        if contagem.get(uid, 0) > limite:
+            motivos[str(pregacao.id)] = "acima do limite mensal"
+            contagem[uid] -= 1
+
+    return [p for p, _, _ in linhas], motivos
+
+
+def repreencher_escala(db: Session, escala_id: str) -> Dict:
+    """
+    Recalcula apenas os horários afetados de uma escala em rascunho.
+
+    Horários afetados são os vagos e os das pregações que passaram a violar
+    alguma regra (ver `detectar_violacoes`); as demais pregações são mantidas.
+    Os substitutos são escolhidos pelo mesmo algoritmo da geração, sobre uma
+    fotografia carregada só para as datas afetadas.
+
+    A pregação violada recebe o substituto na própria linha, como na troca
+    manual de pregador (`pregador_original_id`, `foi_trocado`), e a recusa
+    continua registrada em `recusado_em`/`motivo_recusa`. Sem substituto, a
+    recusa permanece como está e as demais pregações violadas são excluídas.
+
+    Roda sob a trava de geração do distrito/mês (GeracaoEmAndamento se houver
+    geração em andamento).
+    """
+    from app.models.escala import StatusEscala
+
+    escala = db.query(Escala).filter(Escala.id == escala_id).first()
+    if not escala:
+        raise ValueError("Escala não encontrada")
+
+    distrito_id = str(escala.distrito_id)
+    with trava_geracao(db, distrito_id, [(escala.mes_referencia, escala.ano_referencia)]):
+        # Status relido sob trava de linha: aprovação concorrente espera o fim
+        escala = db.query(Escala).filter(Escala.id == escala.id).populate_existing().with_for_update().first()
+        if escala.status != StatusEscala.RASCUNHO.value:
+            raise ValueError("Apenas escalas em rascunho podem ser repreenchidas")
+
+        contexto = carregar_contexto_geracao(
+            db, distrito_id, escala.mes_referencia, escala.ano_referencia, fotografia=False
+        )
+
+        # 1. Pregações que violam restrições e horários afetados
+        pregacoes, motivos = detectar_violacoes(db, escala, contexto)
+        violadas: Dict[Tuple[str, date, time], Pregacao] = {}
+        chaves_mantidas: Set[Tuple[str, date, time]] = set()
+        for pregacao in pregacoes:
+            chave = (str(pregacao.igreja_id), pregacao.data_pregacao, pregacao.horario_pregacao)
+            if str(pregacao.id) in motivos:
+                violadas[chave] = pregacao
+            else:
+                chaves_mantidas.add(chave)
+        afetados = detectar_lacunas(contexto.slots(), chaves_mantidas)
+
+        # 2. Fotografia só das datas afetadas, sem as pregações violadas
+        snapshot = SnapshotDisponibilidade.carregar_datas(
+            db,
+            [str(u.id) for u, _ in contexto.pregadores_list],
+            [data for _, data, _, _ in afetados],
+            contexto.primeiro_dia,
+            contexto.ultimo_dia,
+        )
+        contexto.snapshot = snapshot
+        for pregacao in violadas.values():
+            uid = str(pregacao.pregador_id)
+            if pregacao.status in STATUS_CONTABILIZADOS:
+                snapshot.remover(uid, str(pregacao.igreja_id), pregacao.data_pregacao)
+            # Quem saiu do horário não volta para o mesmo dia
+            snapshot.bloquear_dia(uid, pregacao.data_pregacao)
+
+        novas = atribuir_guloso(contexto, snapshot, slots=afetados) if afetados else []
+
+        # 3. Substituir na própria linha; horários sem linha recebem pregação nova
+        substituidas: List[Dict] = []
+        removidas: List[Dict] = []
+        criadas: List[Dict] = []
+        for atribuicao in novas:
+            chave = (atribuicao["igreja_id"], atribuicao["data_pregacao"], atribuicao["horario_pregacao"])
+            pregacao = violadas.pop(chave, None)
+            if pregacao is None:
+                criadas.append(atribuicao)
+                continue
+            substituidas.append({
+                **_descrever_violacao(pregacao, motivos),
+                "substituto_id": atribuicao["pregador_id"],
+            })
+            if not pregacao.pregador_original_id:
+                pregacao.pregador_original_id = pregacao.pregador_id
+            pregacao.pregador_id = uuid.UUID(atribuicao["pregador_id"])
+            pregacao.foi_trocado = True
+            pregacao.status = "agendado"
+            pregacao.aceito_em = None
+
+        pregadores_avaliados: Set[str] = set()
+        for pregacao in violadas.values():
+            if pregacao.status == "recusado":
+                continue
+            removidas.append(_descrever_violacao(pregacao, motivos))
+            pregadores_avaliados.update(descontar_avaliacoes_pregacao(db, pregacao))
+            db.delete(pregacao)
+
+        if criadas:
+            datas_criadas = [a["data_pregacao"] for a in criadas]
+            calendario = montar_calendario_tematicas(db, distrito_id, min(datas_criadas), max(datas_criadas))
+            for atribuicao in criadas:
+                atribuicao["tematica_id"] = calendario.get(atribuicao["data_pregacao"])
+
+        persistir_pregacoes(db, escala.id, criadas)
+        db.commit()
+        agendar_scores(db, sorted(pregadores_avaliados))
+
+    lacunas_restantes = descrever_lacunas(detectar_lacunas(afetados, chaves_de_atribuicoes(novas)))
+
+    logger.info(
+        f"Escala {escala.id} repreenchida: {len(substituidas)} substituídas, {len(removidas)} removidas, "
+        f"{len(criadas)} criadas, {len(lacunas_restantes)} horários sem pregador"
+    )
+
+    return {
+        "escala_id": str(escala.id),
+        "pregacoes_mantidas": len(pregacoes) - len(motivos),
+        "pregacoes_substituidas": substituidas,
+        "pregacoes_removidas": removidas,
+        "horarios_analisados": len(afetados),
+        "pregacoes_criadas": len(criadas),
+        "horarios_sem_pregador": lacunas_restantes,
+    }
+
+
+def _descrever_violacao(pregacao: Pregacao, motivos: Dict[str, str]) -> Dict:
+    """Pregação violada no formato do relatório de repreenchimento"""
+    return {
+        "pregacao_id": str(pregacao.id),
+        "igreja_id": str(pregacao.igreja_id),
+        "pregador_id": str(pregacao.pregador_id),
+        "data_pregacao": pregacao.data_pregacao,
+        "horario_pregacao": pregacao.horario_pregacao,
+        "motivo": motivos[str(pregacao.id)],
+    }
+
+
+def carregar_contexto_geracao(
+    db: Session,
+    distrito_id: str,
+    mes: int,
+    ano: int,
+    somente_leitura: bool = False,
+    ate: Optional[Tuple[int, int]] = None,
+    fotografia: bool = True
+) -> ContextoGeracao:
+    """
+    Executa todas as leituras necessárias para a geração de um distrito/mês.
+    Com `somente_leitura`, pregadores sem PerfilPregador recebem um perfil
+    padrão apenas em memória (nada é adicionado à sessão).
+    Com `ate` = (mes, ano), a fotografia de disponibilidade cobre do mês
+    informado até o mês final (geração em lote de vários meses).
+    Sem `fotografia`, o contexto sai com a fotografia vazia e quem chama
+    carrega somente as datas de que precisa (repreenchimento de rascunho).
+    """
     # 3. Buscar igrejas do distrito
+    iniciar_fase("igrejas_pregadores")
     igrejas = db.query(Igreja).filter(
         Igreja.distrito_id == distrito_id,
         Igreja.ativo == True
@@ -82,14 +889,23 @@ def gerar_escala_automatica(
         Usuario.status_aprovacao == "aprovado"
     ).all()
     
-    print(f"[DEBUG] Total de usuários ativos e aprovados: {len(usuarios_pregadores)}")
+    logger.debug(f"Total de usuários ativos e aprovados: {len(usuarios_pregadores)}")
+    
+    # Perfis de pregador carregados de uma vez
+    perfis_por_usuario = {
+        perfil.usuario_id: perfil
+        for perfil in db.query(PerfilPregador).filter(
+            PerfilPregador.usuario_id.in_([u.id for u in usuarios_pregadores])
+        ).all()
+    } if usuarios_pregadores else {}
     
     # Criar lista de pregadores com seus perfis (criar PerfilPregador se não existir)
     pregadores_list = []
+    # Logs por usuário só são formatados com o nível DEBUG habilitado
+    debug_ativo = logger.isEnabledFor(logging.DEBUG)
     for usuario in usuarios_pregadores:
-        print(f"[DEBUG] Usuário: {usuario.nome_completo}")
-        print(f"[DEBUG]   - Perfis raw: {usuario.perfis}")
-        print(f"[DEBUG]   - Tipo perfis: {type(usuario.perfis)}")
+        if debug_ativo:
+            logger.debug(f"Usuário: {usuario.nome_completo} - perfis: {usuario.perfis}")
         
         # Verificar se tem perfil de pregador no array
         tem_perfil_pregador = False
@@ -102,36 +918,32 @@ def gerar_escala_automatica(
                 else:
                     perfis_valores.append(str(p))
             
-            print(f"[DEBUG]   - Perfis valores: {perfis_valores}")
-            
             # Verificar se 'pregador' está nos valores
             if 'pregador' in perfis_valores:
                 tem_perfil_pregador = True
-                print(f"[DEBUG]   - Encontrou 'pregador' nos perfis")
         
         if tem_perfil_pregador:
             # Buscar ou criar PerfilPregador
-            perfil_pregador = db.query(PerfilPregador).filter(
-                PerfilPregador.usuario_id == usuario.id
-            ).first()
+            perfil_pregador = perfis_por_usuario.get(usuario.id)
             
             if not perfil_pregador:
                 # Criar perfil pregador se não existir
-                print(f"[DEBUG] Criando PerfilPregador para usuário {usuario.nome_completo}")
+                if debug_ativo:
+                    logger.debug(f"Criando PerfilPregador para usuário {usuario.nome_completo}")
                 perfil_pregador = PerfilPregador(
                     usuario_id=usuario.id,
                     ativo=True,
                     max_pregacoes_mes=4,  # Valor padrão
                     score_medio=0.0
                 )
-                db.add(perfil_pregador)
-                db.flush()
+                if not somente_leitura:
+                    db.add(perfil_pregador)
+                    db.flush()
             
             if perfil_pregador.ativo:
                 pregadores_list.append((usuario, perfil_pregador))
-                print(f"[DEBUG]   - Adicionado à lista de pregadores")
     
-    print(f"[DEBUG] Pregadores finais com perfil ativo: {len(pregadores_list)}")
+    logger.debug(f"Pregadores finais com perfil ativo: {len(pregadores_list)}")
     
     # Converter para o formato esperado pelo resto do código
     pregadores_query = pregadores_list
@@ -143,6 +955,7 @@ def gerar_escala_automatica(
         raise ValueError("Nenhum pregador disponível no distrito")
 
     # 3.1 Carregar configurações de pesos e limite mensal padrão por distrito
+    iniciar_fase("configuracoes")
     pesos = get_score_weights(db, distrito_id)
     limite_default = get_max_pregacoes_mes_default(db, distrito_id)
     limite_forcado_extra_max = get_limite_forcado_extra_max(db, distrito_id)
@@ -175,274 +988,218 @@ def gerar_escala_automatica(
     pregadores_list.sort(key=lambda up: score_por_usuario.get(str(up[0].id), 0.0), reverse=True)
     
     # 5. Buscar horários de culto
+    iniciar_fase("horarios")
     horarios_cultos = buscar_horarios_culto(db, distrito_id, igrejas)
-    print(f"[DEBUG] Total de horários de culto encontrados: {len(horarios_cultos)}")
+    logger.debug(f"Total de horários de culto encontrados: {len(horarios_cultos)}")
     
     # Permitir criar escala mesmo sem horários - apenas avisar no relatório
     if not horarios_cultos:
         logger.warning("Nenhum horário de culto cadastrado. Escala será criada sem pregações.")
     
-    # 6. Gerar datas do mês
-    primeiro_dia = date(ano, mes, 1)
-    if mes == 12:
-        ultimo_dia = date(ano + 1, 1, 1) - timedelta(days=1)
+    # 6-7. Gerar datas do mês separadas por dia da semana
+    primeiro_dia, ultimo_dia, datas_por_dia = datas_do_mes(mes, ano)
+
+    # 7.1 Carregar fotografia de disponibilidade (indisponibilidades, pregações
+    # existentes do mês e da semana anterior, contagens mensais) uma única vez
+    iniciar_fase("disponibilidade")
+    if fotografia:
+        snapshot = SnapshotDisponibilidade.carregar(
+            db,
+            [str(u.id) for u, _ in pregadores_list],
+            primeiro_dia,
+            ultimo_dia if ate is None else datas_do_mes(ate[0], ate[1])[1],
+        )
     else:
-        ultimo_dia = date(ano, mes + 1, 1) - timedelta(days=1)
+        snapshot = SnapshotDisponibilidade(primeiro_dia, ultimo_dia)
 
-    # 7. Coletar todas as datas do mês separadas por dia da semana
-    datas_por_dia = {
-        "sabado": [],
-        "domingo": [],
-        "quarta": []
-    }
+    return ContextoGeracao(
+        distrito_id=distrito_id,
+        mes=mes,
+        ano=ano,
+        igrejas=igrejas,
+        pregadores_list=pregadores_list,
+        score_por_usuario=score_por_usuario,
+        limite_por_usuario=limite_por_usuario,
+        limite_forcado_extra_max=int(limite_forcado_extra_max),
+        horarios_cultos=horarios_cultos,
+        datas_por_dia=datas_por_dia,
+        primeiro_dia=primeiro_dia,
+        ultimo_dia=ultimo_dia,
+        snapshot=snapshot,
+    )
 
-    data_atual = primeiro_dia
-    while data_atual <= ultimo_dia:
-        # Usar weekday() para evitar dependência de locale
-        # 0=segunda ... 2=quarta ... 5=sabado, 6=domingo
-        wd = data_atual.weekday()
-        if wd == 5:  # sábado
-            datas_por_dia["sabado"].append(data_atual)
-        elif wd == 6:  # domingo
-            datas_por_dia["domingo"].append(data_atual)
-        elif wd == 2:  # quarta
-            datas_por_dia["quarta"].append(data_atual)
 
-        data_atual += timedelta(days=1)
+def executar_estrategia(
+    contexto: ContextoGeracao,
+    estrategia: str,
+    progresso: Optional[ProgressoGeracao] = None
+) -> Tuple[List[Dict], Optional[Dict]]:
+    """
+    Executa a estratégia de atribuição sobre uma cópia da fotografia de disponibilidade.
+    Quando a estratégia é "fluxo", o guloso também é executado (somente em memória)
+    para comparar cobertura e tempo no relatório.
+    
+    Retorna: (atribuicoes, comparativo ou None)
+    """
+    # Disponibilidade anterior às atribuições (mapa de cobertura do relatório)
+    contexto.matriz()
+
+    if estrategia != ESTRATEGIA_FLUXO:
+        return atribuir_guloso(contexto, contexto.snapshot.copiar(), progresso=progresso), None
+
+    from app.services.fluxo_service import atribuir_fluxo_custo_minimo
+
+    total_slots = len(contexto.slots())
+    comparativo = {}
+    resultados = {}
+    for nome, funcao in (
+        (ESTRATEGIA_GULOSO, atribuir_guloso),
+        (ESTRATEGIA_FLUXO, atribuir_fluxo_custo_minimo),
+    ):
+        snapshot = contexto.snapshot.copiar()
+        if nome == ESTRATEGIA_FLUXO:
+            iniciar_fase("atribuicao_fluxo")
+        inicio = perf_counter()
+        atribuicoes = funcao(contexto, snapshot)
+        tempo_ms = (perf_counter() - inicio) * 1000
+        if progresso and nome == ESTRATEGIA_FLUXO:
+            # O fluxo resolve o mês inteiro de uma vez
+            progresso("atribuindo", total_slots, total_slots)
+        resultados[nome] = atribuicoes
+        comparativo[nome] = {
+            "pregacoes": len(atribuicoes),
+            "horarios_sem_pregador": total_slots - len(atribuicoes),
+            "cobertura_percentual": round(100 * len(atribuicoes) / total_slots, 1) if total_slots else 100.0,
+            "repeticoes_consecutivas": contar_repeticoes_consecutivas(contexto.snapshot, atribuicoes),
+            "tempo_ms": round(tempo_ms, 1),
+        }
+
+    logger.info(f"Comparativo de estratégias: {comparativo}")
+    return resultados[ESTRATEGIA_FLUXO], comparativo
+
+
+def atribuir_guloso(
+    contexto: ContextoGeracao,
+    snapshot: SnapshotDisponibilidade,
+    progresso: Optional[ProgressoGeracao] = None,
+    slots: Optional[List[Tuple[str, date, Igreja, dict]]] = None,
+    matriz: Optional[MatrizDisponibilidade] = None
+) -> List[Dict]:
+    """
+    Estratégia gulosa: maior score primeiro, Sábado > Domingo > Quarta,
+    seguida do preenchimento forçado das lacunas com limite mensal flexível.
+    Trabalha somente em memória e registra as atribuições em `snapshot`.
+    Por padrão processa todos os horários do mês; `slots` restringe a um subconjunto.
+    A seleção de candidatos usa `IndiceCandidatos` (um índice por nível de limite)
+    sobre a matriz de disponibilidade de `snapshot`. Uma `matriz` já montada
+    para `snapshot` e as datas de `slots`, na ordem de `contexto.pregadores_list`,
+    pode ser informada para não recalculá-la (simulação de pesos).
+    """
+    pregadores_list = contexto.pregadores_list
+    limite_por_usuario = contexto.limite_por_usuario
+    atribuicoes: List[Dict] = []                 # Pregações montadas em memória (gravadas em lote no final)
+    chaves_atribuidas: Set[Tuple[str, date, time]] = set()  # (igreja_id, data, horario) já atribuídos
+    if slots is None:
+        slots = contexto.slots()
+    if matriz is None:
+        matriz = MatrizDisponibilidade(
+            snapshot,
+            [str(u.id) for u, _ in pregadores_list],
+            list(dict.fromkeys(data for _, data, _, _ in slots)),
+        )
+    indice = IndiceCandidatos(snapshot, pregadores_list, limite_por_usuario, matriz)
+    debug_ativo = logger.isEnabledFor(logging.DEBUG)
 
     # 8. Processar por PRIORIDADE: Sábado > Domingo > Quarta
     # Isso garante que pregadores com maior score sejam escalados primeiro para os sábados
-    contador_pregacoes_mes: Dict[str, int] = {}  # Controlar limite mensal por pregador (apenas desta geração)
-    ocupacao_por_dia: Dict[str, set] = {}        # Controlar ocupação por dia nesta geração: uid -> set(datas)
-    estatisticas_geracao: Dict[str, Dict] = {}  # Rastrear pregações por igreja
+    iniciar_fase("atribuicao")
+    for processados, (dia_semana_pt, data_pregacao, igreja, horario) in enumerate(slots):
+        igreja_id_str = str(igreja.id)
+        if progresso:
+            progresso("atribuindo", processados, len(slots))
 
-    dias_prioridade = ["sabado", "domingo", "quarta"]
+        # Evitar duplicidade: já existe pregação para este horário nesta escala?
+        chave = (igreja_id_str, data_pregacao, horario["horario"])
+        if chave in chaves_atribuidas:
+            logger.warning(
+                f"Duplicidade evitada: já existe pregação para Igreja={igreja.nome}, Data={data_pregacao}, Horário={horario['horario']}"
+            )
+            continue
 
-    logger.info(f"Iniciando geração de escala para distrito {distrito_id}, mês {mes}/{ano}")
-    logger.info(f"Total de igrejas: {len(igrejas)}")
-    logger.info(f"Total de pregadores disponíveis: {len(pregadores_list)}")
-    print(f"[DEBUG] Total de horários de culto: {len(horarios_cultos)}")
-    print(f"[DEBUG] Horários por dia: {[(k, len(v)) for k, v in datas_por_dia.items()]}")
+        # Buscar pregador disponível com maior score
+        pregador_selecionado = indice.selecionar(data_pregacao, igreja_id_str, evitar_consecutivo=True)
 
-    for dia_semana_pt in dias_prioridade:
-        datas_deste_dia = datas_por_dia.get(dia_semana_pt, [])
-        print(f"[DEBUG] Processando {dia_semana_pt}: {len(datas_deste_dia)} datas")
+        # Se ninguém encontrado respeitando o critério de evitar sequência na mesma igreja,
+        # relaxar regra e aceitar sequência (quando não houver alternativa)
+        if not pregador_selecionado:
+            pregador_selecionado = indice.selecionar(data_pregacao, igreja_id_str, evitar_consecutivo=False)
 
-        for data_pregacao in datas_deste_dia:
-            # Para cada igreja
-            for igreja in igrejas:
-                igreja_id_str = str(igreja.id)
-                
-                # Inicializar estatísticas desta igreja se necessário
-                if igreja_id_str not in estatisticas_geracao:
-                    estatisticas_geracao[igreja_id_str] = {
-                        "nome": igreja.nome,
-                        "pregacoes_criadas": 0,
-                        "horarios_sem_pregador": 0
-                    }
-
-                # Buscar horários de culto deste dia
-                horarios_dia = [
-                    h for h in horarios_cultos
-                    if h["dia_semana"] == dia_semana_pt and h["igreja_id"] == igreja.id
-                ]
-                
-                print(f"[DEBUG]   Igreja {igreja.nome} em {data_pregacao}: {len(horarios_dia)} horários encontrados")
+        if pregador_selecionado:
+            usuario, perfil_pregador = pregador_selecionado
+            atribuicoes.append(_nova_atribuicao(igreja_id_str, str(usuario.id), dia_semana_pt, data_pregacao, horario))
+            chaves_atribuidas.add(chave)
 
-                for horario in horarios_dia:
-                    # Evitar duplicidade: já existe pregação para este horário nesta escala?
-                    # Verificação robusta com flush para garantir consistência
-                    db.flush()
-                    existe = db.query(Pregacao).filter(
-                        Pregacao.escala_id == nova_escala.id,
-                        Pregacao.igreja_id == str(igreja.id),
-                        Pregacao.data_pregacao == data_pregacao,
-                        Pregacao.horario_pregacao == horario["horario"]
-                    ).first()
-                    if existe:
-                        logger.warning(
-                            f"Duplicidade evitada: já existe pregação para Igreja={igreja.nome}, Data={data_pregacao}, Horário={horario['horario']}"
-                        )
-                        continue
-
-                    # Buscar pregador disponível com maior score
-                    pregador_selecionado = selecionar_pregador_disponivel(
-                        db,
-                        pregadores_list,
-                        data_pregacao,
-                        contador_pregacoes_mes,
-                        limite_por_usuario,
-                        igreja_id_str,
-                        distrito_id,
-                        ocupacao_por_dia,
-                        evitar_consecutivo=True,
-                    )
+            # Incrementar contador mensal e marcar ocupação no dia
+            snapshot.registrar(str(usuario.id), igreja_id_str, data_pregacao)
 
-                    # Se ninguém encontrado respeitando o critério de evitar sequência na mesma igreja,
-                    # relaxar regra e aceitar sequência (quando não houver alternativa)
-                    if not pregador_selecionado:
-                        pregador_selecionado = selecionar_pregador_disponivel(
-                            db,
-                            pregadores_list,
-                            data_pregacao,
-                            contador_pregacoes_mes,
-                            limite_por_usuario,
-                            igreja_id_str,
-                            distrito_id,
-                            ocupacao_por_dia,
-                            evitar_consecutivo=False,
-                        )
-
-                    if pregador_selecionado:
-                        usuario, perfil_pregador = pregador_selecionado
-
-                        # Buscar temática sugestiva
-                        tematica = buscar_tematica_para_data(
-                            db, distrito_id, data_pregacao, dia_semana_pt
-                        )
-
-                        # Criar pregação
-                        pregacao = Pregacao(
-                            escala_id=nova_escala.id,
-                            igreja_id=str(igreja.id),
-                            pregador_id=str(usuario.id),
-                            tematica_id=str(tematica.id) if tematica else None,
-                            data_pregacao=data_pregacao,
-                            horario_pregacao=horario["horario"],
-                            nome_culto=horario["nome_culto"],
-                            status="agendado"
-                        )
-                        db.add(pregacao)
-                        db.flush()  # Força commit imediato para evitar duplicatas
-
-                        # Incrementar contador mensal e marcar ocupação no dia
-                        uid = str(usuario.id)
-                        contador_pregacoes_mes[uid] = contador_pregacoes_mes.get(uid, 0) + 1
-                        if uid not in ocupacao_por_dia:
-                            ocupacao_por_dia[uid] = set()
-                        ocupacao_por_dia[uid].add(data_pregacao)
-
-                        # Atualizar estatísticas
-                        estatisticas_geracao[igreja_id_str]["pregacoes_criadas"] += 1
-                        
-                        logger.debug(
-                            f"Pregação criada: Igreja={igreja.nome}, Data={data_pregacao}, "
-                            f"Pregador={usuario.nome_completo}, Horário={horario['horario']}"
-                        )
-                    else:
-                        # Nenhum pregador disponível
-                        estatisticas_geracao[igreja_id_str]["horarios_sem_pregador"] += 1
-                        logger.warning(
-                            f"Nenhum pregador disponível: Igreja={igreja.nome}, "
-                            f"Data={data_pregacao}, Horário={horario['horario']}"
-                        )
+            if debug_ativo:
+                logger.debug(
+                    f"Pregação criada: Igreja={igreja.nome}, Data={data_pregacao}, "
+                    f"Pregador={usuario.nome_completo}, Horário={horario['horario']}"
+                )
+        else:
+            # Nenhum pregador disponível
+            logger.warning(
+                f"Nenhum pregador disponível: Igreja={igreja.nome}, "
+                f"Data={data_pregacao}, Horário={horario['horario']}"
+            )
     
+    if progresso:
+        progresso("atribuindo", len(slots), len(slots))
+
     # 9. Etapa de preenchimento forçado: cobrir lacunas remanescentes
-    # Buscar horários que ficaram sem pregador
-    lacunas = []
-    for dia_semana_pt in dias_prioridade:
-        datas_deste_dia = datas_por_dia.get(dia_semana_pt, [])
-        for data_pregacao in datas_deste_dia:
-            for igreja in igrejas:
-                horarios_dia = [
-                    h for h in horarios_cultos
-                    if h["dia_semana"] == dia_semana_pt and h["igreja_id"] == igreja.id
-                ]
-                for horario in horarios_dia:
-                    # Verificar se já existe pregação para este horário
-                    existe = db.query(Pregacao).filter(
-                        Pregacao.escala_id == nova_escala.id,
-                        Pregacao.igreja_id == igreja.id,
-                        Pregacao.data_pregacao == data_pregacao,
-                        Pregacao.horario_pregacao == horario["horario"]
-                    ).first()
-                    
-                    if not existe:
-                        lacunas.append({
-                            "igreja": igreja,
-                            "data": data_pregacao,
-                            "dia_semana": dia_semana_pt,
-                            "horario": horario
-                        })
+    # Horários esperados menos os atribuídos (em memória)
+    iniciar_fase("lacunas")
+    lacunas = detectar_lacunas(slots, chaves_atribuidas)
     
     if lacunas:
+        iniciar_fase("preenchimento_forcado")
         logger.warning(f"Encontradas {len(lacunas)} lacunas. Iniciando preenchimento forçado...")
         
         # Tentar preencher lacunas aumentando progressivamente o limite mensal,
         # SEM permitir duas pregações no mesmo dia e SEM desrespeitar indisponibilidade.
-        for lacuna in lacunas:
-            igreja = lacuna["igreja"]
-            data_pregacao = lacuna["data"]
-            dia_semana_pt = lacuna["dia_semana"]
-            horario = lacuna["horario"]
+        indices_flexiveis: Dict[int, IndiceCandidatos] = {}
+        for dia_semana_pt, data_pregacao, igreja, horario in lacunas:
             igreja_id_str = str(igreja.id)
 
             pregador_selecionado = None
             # Aumentar limite em +1, +2, ... até configuração distrital (padrão 5)
-            for extra_limite in range(1, int(limite_forcado_extra_max) + 1):
-                limite_flexivel = {uid: limite + extra_limite for uid, limite in limite_por_usuario.items()}
-                pregador_selecionado = selecionar_pregador_disponivel(
-                    db,
-                    pregadores_list,
-                    data_pregacao,
-                    contador_pregacoes_mes,
-                    limite_flexivel,
-                    igreja_id_str,
-                    distrito_id,
-                    ocupacao_por_dia,
-                    evitar_consecutivo=False,
-                )
+            for extra_limite in range(1, contexto.limite_forcado_extra_max + 1):
+                indice_flexivel = indices_flexiveis.get(extra_limite)
+                if indice_flexivel is None:
+                    limite_flexivel = {uid: limite + extra_limite for uid, limite in limite_por_usuario.items()}
+                    indice_flexivel = IndiceCandidatos(snapshot, pregadores_list, limite_flexivel, matriz)
+                    indices_flexiveis[extra_limite] = indice_flexivel
+                pregador_selecionado = indice_flexivel.selecionar(data_pregacao, igreja_id_str, evitar_consecutivo=False)
                 if pregador_selecionado:
                     break
             
             if pregador_selecionado:
                 usuario, perfil_pregador = pregador_selecionado
                 
-                # Buscar temática
-                tematica = buscar_tematica_para_data(
-                    db, distrito_id, data_pregacao, dia_semana_pt
-                )
-                
                 # Evitar duplicidade também no preenchimento forçado
-                # Verificação robusta com flush para garantir consistência
-                db.flush()
-                existe = db.query(Pregacao).filter(
-                    Pregacao.escala_id == nova_escala.id,
-                    Pregacao.igreja_id == str(igreja.id),
-                    Pregacao.data_pregacao == data_pregacao,
-                    Pregacao.horario_pregacao == horario["horario"]
-                ).first()
-                if existe:
+                chave = (igreja_id_str, data_pregacao, horario["horario"])
+                if chave in chaves_atribuidas:
                     logger.warning(
                         f"Duplicidade evitada (forçado): já existe pregação para Igreja={igreja.nome}, Data={data_pregacao}, Horário={horario['horario']}"
                     )
                     continue
 
-                # Criar pregação
-                pregacao = Pregacao(
-                    escala_id=nova_escala.id,
-                    igreja_id=str(igreja.id),
-                    pregador_id=str(usuario.id),
-                    tematica_id=str(tematica.id) if tematica else None,
-                    data_pregacao=data_pregacao,
-                    horario_pregacao=horario["horario"],
-                    nome_culto=horario["nome_culto"],
-                    status="agendado"
-                )
-                db.add(pregacao)
-                db.flush()  # Força commit imediato para evitar duplicatas
+                atribuicoes.append(_nova_atribuicao(igreja_id_str, str(usuario.id), dia_semana_pt, data_pregacao, horario))
+                chaves_atribuidas.add(chave)
                 
                 # Atualizar contadores
-                uid = str(usuario.id)
-                contador_pregacoes_mes[uid] = contador_pregacoes_mes.get(uid, 0) + 1
-                if uid not in ocupacao_por_dia:
-                    ocupacao_por_dia[uid] = set()
-                ocupacao_por_dia[uid].add(data_pregacao)
-                
-                # Atualizar estatísticas
-                estatisticas_geracao[igreja_id_str]["pregacoes_criadas"] += 1
-                if estatisticas_geracao[igreja_id_str]["horarios_sem_pregador"] > 0:
-                    estatisticas_geracao[igreja_id_str]["horarios_sem_pregador"] -= 1
+                snapshot.registrar(str(usuario.id), igreja_id_str, data_pregacao)
                 
                 logger.info(
                     f"Lacuna preenchida (forçado): Igreja={igreja.nome}, Data={data_pregacao}, "
@@ -453,43 +1210,182 @@ def gerar_escala_automatica(
                     f"CRÍTICO: Impossível preencher lacuna mesmo com relaxamento: "
                     f"Igreja={igreja.nome}, Data={data_pregacao}, Horário={horario['horario']}"
                 )
+
+    return atribuicoes
+
+
+def _nova_atribuicao(igreja_id: str, pregador_id: str, dia_semana: str, data_pregacao: date, horario: dict) -> Dict:
+    """Representação em memória de uma pregação gerada (antes da gravação)"""
+    return {
+        "igreja_id": igreja_id,
+        "pregador_id": pregador_id,
+        "tematica_id": None,
+        "dia_semana": dia_semana,
+        "data_pregacao": data_pregacao,
+        "horario_pregacao": horario["horario"],
+        "nome_culto": horario["nome_culto"],
+    }
+
+
+def contar_repeticoes_consecutivas(snapshot: SnapshotDisponibilidade, atribuicoes: List[Dict]) -> int:
+    """Quantas atribuições repetem o pregador na mesma igreja da semana anterior"""
+    chaves = set(snapshot.pregacoes_por_igreja)
+    for a in atribuicoes:
+        chaves.add((a["pregador_id"], a["igreja_id"], a["data_pregacao"]))
+    return sum(
+        1 for a in atribuicoes
+        if (a["pregador_id"], a["igreja_id"], a["data_pregacao"] - timedelta(days=7)) in chaves
+    )
+
+
+def expandir_slots(
+    igrejas: List[Igreja],
+    datas_por_dia: Dict[str, List[date]],
+    horarios_por_igreja_dia: Dict[Tuple, List[dict]]
+) -> List[Tuple[str, date, Igreja, dict]]:
+    """Horários do mês na ordem de prioridade (Sábado > Domingo > Quarta)"""
+    resultado = []
+    for dia_semana_pt in DIAS_PRIORIDADE:
+        for data_pregacao in datas_por_dia.get(dia_semana_pt, []):
+            for igreja in igrejas:
+                for horario in horarios_por_igreja_dia.get((igreja.id, dia_semana_pt), ()):
+                    resultado.append((dia_semana_pt, data_pregacao, igreja, horario))
+    return resultado
+
+
+def chaves_de_atribuicoes(atribuicoes: List[Dict]) -> Set[Tuple[str, date, time]]:
+    """Conjunto (igreja_id, data, horario) das atribuições"""
+    return {(a["igreja_id"], a["data_pregacao"], a["horario_pregacao"]) for a in atribuicoes}
+
+
+def detectar_lacunas(
+    slots: List[Tuple[str, date, Igreja, dict]],
+    chaves_atribuidas: Set[Tuple[str, date, time]]
+) -> List[Tuple[str, date, Igreja, dict]]:
+    """Horários esperados menos os atribuídos, em O(horários), preservando a ordem de prioridade"""
+    return [
+        slot for slot in slots
+        if (str(slot[2].id), slot[1], slot[3]["horario"]) not in chaves_atribuidas
+    ]
+
+
+def descrever_lacunas(lacunas: List[Tuple[str, date, Igreja, dict]]) -> List[Dict]:
+    """Lacunas no formato do relatório (ordenadas por data, igreja e horário)"""
+    return [
+        {
+            "igreja_id": str(igreja.id),
+            "igreja_nome": igreja.nome,
+            "data_pregacao": data_pregacao,
+            "dia_semana": dia_semana_pt,
+            "horario_pregacao": horario["horario"],
+            "nome_culto": horario.get("nome_culto"),
+        }
+        for dia_semana_pt, data_pregacao, igreja, horario in sorted(
+            lacunas, key=lambda s: (s[1], s[2].nome, s[3]["horario"])
+        )
+    ]
+
+
+def montar_relatorio_geracao(contexto: ContextoGeracao, atribuicoes: List[Dict]) -> Dict:
+    """Estatísticas por igreja, totais, lacunas e mapa de cobertura da geração a partir das atribuições em memória"""
+    lacunas = detectar_lacunas(contexto.slots(), chaves_de_atribuicoes(atribuicoes))
+    relatorio = montar_relatorio_cobertura(
+        contexto.igrejas, [a["igreja_id"] for a in atribuicoes], lacunas
+    )
+    relatorio["mapa_cobertura"] = montar_mapa_cobertura(contexto, atribuicoes)
     
-    # 10. Commit e log final
-    db.commit()
-    db.refresh(nova_escala)
-    
-    # Log de estatísticas finais
-    total_pregacoes = sum(e["pregacoes_criadas"] for e in estatisticas_geracao.values())
-    total_sem_pregador = sum(e["horarios_sem_pregador"] for e in estatisticas_geracao.values())
-    
-    logger.info(f"Geração concluída: {total_pregacoes} pregações criadas")
-    logger.info(f"Horários sem pregador: {total_sem_pregador}")
+    logger.info(f"Geração concluída: {relatorio['total_pregacoes']} pregações criadas")
+    logger.info(f"Horários sem pregador: {relatorio['total_horarios_sem_pregador']}")
     
-    for igreja_id_str, stats in estatisticas_geracao.items():
+    for stats in relatorio["estatisticas_por_igreja"]:
         logger.info(
-            f"Igreja: {stats['nome']} - "
+            f"Igreja: {stats['igreja_nome']} - "
             f"Pregações: {stats['pregacoes_criadas']}, "
             f"Sem pregador: {stats['horarios_sem_pregador']}"
         )
     
     # Validação: verificar se todas igrejas receberam pelo menos 1 pregação
-    igrejas_sem_pregacao = [
-        stats["nome"] for stats in estatisticas_geracao.values()
-        if stats["pregacoes_criadas"] == 0
-    ]
-    
-    if igrejas_sem_pregacao:
+    if relatorio["igrejas_sem_pregacao"]:
         logger.warning(
-            f"ATENÇÃO: Igrejas sem nenhuma pregação gerada: {', '.join(igrejas_sem_pregacao)}"
+            f"ATENÇÃO: Igrejas sem nenhuma pregação gerada: {', '.join(relatorio['igrejas_sem_pregacao'])}"
         )
     
-    # Preparar relatório de geração
-    relatorio = {
-        "escala_id": str(nova_escala.id),
+    return relatorio
+
+
+def montar_mapa_cobertura(contexto: ContextoGeracao, atribuicoes: List[Dict]) -> Dict:
+    """
+    Mapa de calor igrejas × datas: fração dos horários preenchidos em cada célula
+    (None onde a igreja não tem culto na data), com horários e pregadores
+    viáveis por data (livres e com capacidade antes da geração).
+    """
+    matriz = contexto.matriz()
+    coluna_por_data = matriz.coluna_por_data
+    linha_por_igreja = {str(igreja.id): i for i, igreja in enumerate(contexto.igrejas)}
+    formato = (len(contexto.igrejas), len(matriz.datas))
+
+    horarios = np.zeros(formato, dtype=np.int64)
+    for _, data, igreja, _ in contexto.slots():
+        horarios[linha_por_igreja[str(igreja.id)], coluna_por_data[data]] += 1
+
+    preenchidos = np.zeros(formato, dtype=np.int64)
+    celulas = [
+        (linha_por_igreja[a["igreja_id"]], coluna_por_data[a["data_pregacao"]])
+        for a in atribuicoes
+        if a["igreja_id"] in linha_por_igreja and a["data_pregacao"] in coluna_por_data
+    ]
+    if celulas:
+        linhas, colunas = np.array(celulas, dtype=np.int64).T
+        np.add.at(preenchidos, (linhas, colunas), 1)
+
+    limites = np.array([contexto.limite_por_usuario.get(uid, 4) for uid in matriz.uids], dtype=np.int64)
+    fracao = np.divide(preenchidos, horarios, out=np.zeros(formato), where=horarios > 0).round(2)
+
+    return {
+        "datas": matriz.datas,
+        "horarios_por_data": horarios.sum(axis=0).tolist(),
+        "pregadores_viaveis_por_data": matriz.viaveis(limites).sum(axis=0).tolist(),
+        "igrejas": [
+            {
+                "igreja_id": str(igreja.id),
+                "igreja_nome": igreja.nome,
+                "preenchimento": [
+                    float(valor) if total else None
+                    for valor, total in zip(fracao[i].tolist(), horarios[i].tolist())
+                ],
+            }
+            for i, igreja in enumerate(contexto.igrejas)
+        ],
+    }
+
+
+def montar_relatorio_cobertura(
+    igrejas: List[Igreja],
+    igreja_id_por_pregacao: List[str],
+    lacunas: List[Tuple[str, date, Igreja, dict]]
+) -> Dict:
+    """Relatório de cobertura: totais, estatísticas por igreja e a lista exata de lacunas"""
+    estatisticas_geracao: Dict[str, Dict] = {
+        str(igreja.id): {"nome": igreja.nome, "pregacoes_criadas": 0, "horarios_sem_pregador": 0}
+        for igreja in igrejas
+    }
+    for igreja_id in igreja_id_por_pregacao:
+        if igreja_id in estatisticas_geracao:
+            estatisticas_geracao[igreja_id]["pregacoes_criadas"] += 1
+    for _, _, igreja, _ in lacunas:
+        estatisticas_geracao[str(igreja.id)]["horarios_sem_pregador"] += 1
+
+    total_pregacoes = sum(e["pregacoes_criadas"] for e in estatisticas_geracao.values())
+    
+    return {
+        "escala_id": None,
         "total_igrejas": len(igrejas),
         "total_pregacoes": total_pregacoes,
-        "total_horarios_sem_pregador": total_sem_pregador,
-        "igrejas_sem_pregacao": igrejas_sem_pregacao,
+        "total_horarios_sem_pregador": len(lacunas),
+        "igrejas_sem_pregacao": [
+            stats["nome"] for stats in estatisticas_geracao.values()
+            if stats["pregacoes_criadas"] == 0
+        ],
         "estatisticas_por_igreja": [
             {
                 "igreja_id": igreja_id_str,
@@ -498,161 +1394,224 @@ def gerar_escala_automatica(
                 "horarios_sem_pregador": stats["horarios_sem_pregador"]
             }
             for igreja_id_str, stats in estatisticas_geracao.items()
-        ]
+        ],
+        "lacunas": descrever_lacunas(lacunas),
     }
+
+
+def relatorio_escala_existente(db: Session, escala: Escala) -> Dict:
+    """
+    Relatório de cobertura de uma escala já gravada: horários esperados do mês
+    menos os ocupados pelas pregações da escala (uma consulta de chaves).
+    """
+    igrejas = db.query(Igreja).filter(
+        Igreja.distrito_id == escala.distrito_id,
+        Igreja.ativo == True
+    ).all()
     
-    return nova_escala, relatorio
+    _, _, datas_por_dia = datas_do_mes(escala.mes_referencia, escala.ano_referencia)
+    horarios = indexar_horarios(buscar_horarios_culto(db, str(escala.distrito_id), igrejas))
+    slots = expandir_slots(igrejas, datas_por_dia, horarios)
+    
+    pregacoes = db.query(
+        Pregacao.igreja_id, Pregacao.data_pregacao, Pregacao.horario_pregacao
+    ).filter(Pregacao.escala_id == escala.id).all()
+    chaves = {(str(igreja_id), data, horario) for igreja_id, data, horario in pregacoes}
+    
+    relatorio = montar_relatorio_cobertura(
+        igrejas, [str(igreja_id) for igreja_id, _, _ in pregacoes], detectar_lacunas(slots, chaves)
+    )
+    relatorio["escala_id"] = str(escala.id)
+    return relatorio
+
+
+def datas_do_mes(mes: int, ano: int) -> Tuple[date, date, Dict[str, List[date]]]:
+    """Primeiro e último dia do mês e as datas de sábado, domingo e quarta"""
+    primeiro_dia = date(ano, mes, 1)
+    if mes == 12:
+        ultimo_dia = date(ano + 1, 1, 1) - timedelta(days=1)
+    else:
+        ultimo_dia = date(ano, mes + 1, 1) - timedelta(days=1)
+
+    datas_por_dia = {
+        "sabado": [],
+        "domingo": [],
+        "quarta": []
+    }
+
+    data_atual = primeiro_dia
+    while data_atual <= ultimo_dia:
+        # Usar weekday() para evitar dependência de locale
+        # 0=segunda ... 2=quarta ... 5=sabado, 6=domingo
+        wd = data_atual.weekday()
+        if wd == 5:  # sábado
+            datas_por_dia["sabado"].append(data_atual)
+        elif wd == 6:  # domingo
+            datas_por_dia["domingo"].append(data_atual)
+        elif wd == 2:  # quarta
+            datas_por_dia["quarta"].append(data_atual)
+
+        data_atual += timedelta(days=1)
+
+    return primeiro_dia, ultimo_dia, datas_por_dia
+
+
+def persistir_pregacoes(db: Session, escala_id, atribuicoes: List[Dict]) -> None:
+    """
+    Grava as pregações geradas com um único INSERT em lote.
+    Os valores de `codigo` são reservados antecipadamente na sequence com uma consulta.
+    Não faz commit: a transação é controlada por quem chama.
+    """
+    if not atribuicoes:
+        return
+
+    codigos = db.execute(
+        text("SELECT nextval('pregacoes_codigo_seq') FROM generate_series(1, :n)"),
+        {"n": len(atribuicoes)},
+    ).scalars().all()
+
+    linhas = [
+        {
+            "id": uuid.uuid4(),
+            "codigo": codigo,
+            "escala_id": escala_id,
+            "igreja_id": a["igreja_id"],
+            "pregador_id": a["pregador_id"],
+            "tematica_id": a["tematica_id"],
+            "data_pregacao": a["data_pregacao"],
+            "horario_pregacao": a["horario_pregacao"],
+            "nome_culto": a["nome_culto"],
+            "status": "agendado",
+            "foi_trocado": False,
+        }
+        for a, codigo in zip(atribuicoes, codigos)
+    ]
+    db.execute(insert(Pregacao), linhas)
 
 
 def buscar_horarios_culto(db: Session, distrito_id: str, igrejas: List[Igreja]) -> List[dict]:
-    """Busca horários de culto do distrito e igrejas"""
-    horarios = []
+    """
+    Busca horários de culto do distrito e igrejas com uma única consulta.
+    Igreja com horários próprios usa somente os seus; as demais usam os do distrito.
+    """
     dias_validos = {"sabado", "domingo", "quarta"}
     
-    # Horários do distrito (aplicados a todas igrejas)
-    horarios_distrito = db.query(HorarioCulto).filter(
-        HorarioCulto.distrito_id == distrito_id,
+    registros = db.query(HorarioCulto).filter(
+        or_(
+            HorarioCulto.distrito_id == distrito_id,
+            HorarioCulto.igreja_id.in_([igreja.id for igreja in igrejas])
+        ),
         HorarioCulto.ativo == True,
         HorarioCulto.requer_pregador == True
-    ).all()
+    ).order_by(HorarioCulto.horario).all()
     
+    # Horários do distrito (aplicados a todas igrejas) e específicos por igreja
+    horarios_distrito = [h for h in registros if h.igreja_id is None]
+    horarios_por_igreja: Dict = {}
+    for h in registros:
+        if h.igreja_id is not None:
+            horarios_por_igreja.setdefault(h.igreja_id, []).append(h)
+    
+    horarios = []
     for igreja in igrejas:
-        # Horários específicos da igreja
-        horarios_igreja = db.query(HorarioCulto).filter(
-            HorarioCulto.igreja_id == igreja.id,
-            HorarioCulto.ativo == True,
-            HorarioCulto.requer_pregador == True
-        ).all()
-        
-        if horarios_igreja:
-            for h in horarios_igreja:
-                dia = h.dia_semana if isinstance(h.dia_semana, str) else h.dia_semana.value
-                if dia in dias_validos:
-                    horarios.append({
-                        "igreja_id": igreja.id,
-                        "dia_semana": dia,
-                        "horario": h.horario,
-                        "nome_culto": h.nome_culto
-                    })
-        else:
-            # Usar horários do distrito
-            for h in horarios_distrito:
-                dia = h.dia_semana if isinstance(h.dia_semana, str) else h.dia_semana.value
-                if dia in dias_validos:
-                    horarios.append({
-                        "igreja_id": igreja.id,
-                        "dia_semana": dia,
-                        "horario": h.horario,
-                        "nome_culto": h.nome_culto
-                    })
+        for h in horarios_por_igreja.get(igreja.id) or horarios_distrito:
+            dia = h.dia_semana if isinstance(h.dia_semana, str) else h.dia_semana.value
+            if dia in dias_validos:
+                horarios.append({
+                    "igreja_id": igreja.id,
+                    "dia_semana": dia,
+                    "horario": h.horario,
+                    "nome_culto": h.nome_culto
+                })
     
     return horarios
 
 
-def selecionar_pregador_disponivel(
-    db: Session,
-    pregadores: List[tuple],
-    data: date,
-    contador_mes: Dict[str, int],
-    limite_por_usuario: Dict[str, int],
-    igreja_id: str,
-    distrito_id: str,
-    ocupacao_por_dia: Dict[str, set],
-    *,
-    evitar_consecutivo: bool = True,
-) -> Optional[tuple]:
-    """
-    Seleciona pregador com maior score disponível
-    Valida: indisponibilidade, conflitos, limite mensal
-    """
-    # Limites do mês (para contar pregações existentes no mês)
-    primeiro_dia_mes = date(data.year, data.month, 1)
-    if data.month == 12:
-        ultimo_dia_mes = date(data.year + 1, 1, 1) - timedelta(days=1)
-    else:
-        ultimo_dia_mes = date(data.year, data.month + 1, 1) - timedelta(days=1)
+def indexar_horarios(horarios_cultos: List[dict]) -> Dict[Tuple, List[dict]]:
+    """Índice dos horários por (igreja_id, dia_semana)"""
+    indice: Dict[Tuple, List[dict]] = {}
+    for horario in horarios_cultos:
+        indice.setdefault((horario["igreja_id"], horario["dia_semana"]), []).append(horario)
+    return indice
 
-    for usuario, perfil in pregadores:
-        uid = str(usuario.id)
-        # 0. Verificar ocupação nesta geração (mesmo dia em outra igreja)
-        if uid in ocupacao_por_dia and data in ocupacao_por_dia[uid]:
-            continue
-        # 1. Verificar indisponibilidade
-        indisponivel = db.query(PeriodoIndisponibilidade).filter(
-            PeriodoIndisponibilidade.pregador_id == usuario.id,
-            PeriodoIndisponibilidade.ativo == True,
-            PeriodoIndisponibilidade.data_inicio <= data,
-            PeriodoIndisponibilidade.data_fim >= data
-        ).first()
-        
-        if indisponivel:
-            continue
-        
-        # 2. Verificar conflito (já escalado no mesmo dia)
-        conflito = db.query(Pregacao).filter(
-            Pregacao.pregador_id == usuario.id,
-            Pregacao.data_pregacao == data,
-            Pregacao.status.in_(["agendado", "aceito"])
-        ).first()
-        
-        if conflito:
-            continue
-        
-        # 2.1 Evitar semanas consecutivas na MESMA igreja (quando habilitado)
-        if evitar_consecutivo:
-            data_anterior = data - timedelta(days=7)
-            consec = db.query(Pregacao).filter(
-                Pregacao.pregador_id == usuario.id,
-                Pregacao.igreja_id == igreja_id,
-                Pregacao.data_pregacao == data_anterior,
-                Pregacao.status.in_(["agendado", "aceito", "realizado"]),
-            ).first()
-            if consec:
-                continue
 
-        # 3. Verificar limite mensal (considerando já escaladas no BD + desta geração)
-        total_mes_existente = db.query(Pregacao).filter(
-            Pregacao.pregador_id == usuario.id,
-            Pregacao.data_pregacao >= primeiro_dia_mes,
-            Pregacao.data_pregacao <= ultimo_dia_mes,
-            Pregacao.status.in_(["agendado", "aceito", "realizado"]),
-        ).count()
-
-        pregacoes_mes_nesta_geracao = contador_mes.get(uid, 0)
-        limite = limite_por_usuario.get(uid, 4)
-        if (total_mes_existente + pregacoes_mes_nesta_geracao) >= limite:
-            continue
-        
-        # Pregador disponível!
-        return (usuario, perfil)
-    
-    return None
+class IndiceCandidatos:
+    """
+    Índice de candidatos para a seleção gulosa: escolhe o primeiro pregador de
+    `pregadores` (já ordenados por score efetivo) sem conflito no dia, não
+    indisponível na data, abaixo do limite mensal e (quando habilitado) sem ter
+    pregado na mesma igreja na semana anterior. Todas as validações usam a
+    fotografia em memória (sem SQL por candidato).
 
+    Cada data tem uma fila de prioridade (heap) com a posição de cada pregador no
+    ranking de score. Os candidatos inválidos são descartados sob demanda
+    (invalidação preguiçosa), e cada descarte é definitivo quando o motivo não
+    muda mais durante a geração:
+    - limite mensal atingido: sai do índice em todas as datas;
+    - já escalado ou indisponível na data: sai da fila daquela data.
+    Apenas a regra de semanas consecutivas (que depende da igreja) devolve o
+    candidato à fila. Assim cada seleção custa O(log P) amortizado em vez de O(P).
+    Com `matriz`, a fila de cada data já nasce só com os candidatos viáveis
+    (coluna da matriz de disponibilidade, na ordem do ranking).
 
-def buscar_tematica_para_data(db: Session, distrito_id: str, data: date, dia_semana: str) -> Optional[Tematica]:
-    """Busca temática sugestiva para uma data"""
-    from app.models import Distrito
-    
-    # Buscar associação do distrito
-    distrito = db.query(Distrito).filter(Distrito.id == distrito_id).first()
-    if not distrito:
-        return None
-    
-    # Buscar temática
-    tematica = db.query(Tematica).filter(
-        Tematica.associacao_id == distrito.associacao_id,
-        Tematica.ativo == True,
-        and_(
-            # Data específica
-            (Tematica.tipo_recorrencia == "data_especifica") & (Tematica.data_especifica == data) |
-            # Semanal
-            (Tematica.tipo_recorrencia == "semanal") & (Tematica.dia_semana_semanal == dia_semana) |
-            # Mensal (simplificado)
-            (Tematica.tipo_recorrencia == "mensal") & (Tematica.dia_semana_mensal == dia_semana)
-        )
-    ).first()
-    
-    return tematica
+    Supõe que as contagens do `snapshot` só aumentam enquanto o índice é usado
+    (a geração gulosa nunca remove atribuições).
+    """
+
+    def __init__(
+        self,
+        snapshot: SnapshotDisponibilidade,
+        pregadores: List[tuple],
+        limite_por_usuario: Dict[str, int],
+        matriz: Optional[MatrizDisponibilidade] = None,
+    ):
+        self.snapshot = snapshot
+        self.pregadores = pregadores
+        self.uids = [str(usuario.id) for usuario, _ in pregadores]
+        self.limites = [limite_por_usuario.get(uid, 4) for uid in self.uids]
+        self.esgotados: Set[int] = set()
+        self._filas_por_data: Dict[date, List[int]] = {}
+        self.matriz = matriz
+        self._viaveis = matriz.viaveis(np.array(self.limites, dtype=np.int64)) if matriz is not None else None
+
+    def _fila(self, data: date) -> List[int]:
+        fila = self._filas_por_data.get(data)
+        if fila is None:
+            coluna = self.matriz.coluna_por_data.get(data) if self.matriz is not None else None
+            if coluna is not None:
+                candidatos = np.flatnonzero(self._viaveis[:, coluna]).tolist()
+            else:
+                candidatos = range(len(self.uids))
+            # Lista crescente já é um heap válido: montagem O(P) uma vez por data
+            fila = [i for i in candidatos if i not in self.esgotados]
+            self._filas_por_data[data] = fila
+        return fila
+
+    def selecionar(self, data: date, igreja_id: str, *, evitar_consecutivo: bool = True) -> Optional[tuple]:
+        """Pregador de maior score válido para a data e a igreja (None se não houver)"""
+        snapshot = self.snapshot
+        fila = self._fila(data)
+        adiados: List[int] = []
+        escolhido = None
+        while fila:
+            posicao = fila[0]
+            uid = self.uids[posicao]
+            if posicao in self.esgotados:
+                heapq.heappop(fila)
+            elif snapshot.total_mes(uid) >= self.limites[posicao]:
+                heapq.heappop(fila)
+                self.esgotados.add(posicao)
+            elif snapshot.tem_conflito_no_dia(uid, data) or snapshot.esta_indisponivel(uid, data):
+                heapq.heappop(fila)
+            elif evitar_consecutivo and snapshot.pregou_semana_anterior(uid, igreja_id, data):
+                adiados.append(heapq.heappop(fila))
+            else:
+                escolhido = self.pregadores[posicao]
+                break
+
+        for posicao in adiados:
+            heapq.heappush(fila, posicao)
+        return escolhido
 
 
 def mapear_dia_semana(dia_en: str) -> str:
@@ -669,41 +1628,120 @@ def mapear_dia_semana(dia_en: str) -> str:
     return mapa.get(dia_en, "sabado")
 
 
-def executar_troca_automatica(db: Session, troca_id: str) -> None:
-    """Executa troca automática entre pregadores"""
-    troca = db.query(TrocaEscala).filter(TrocaEscala.id == troca_id).first()
-    if not troca:
-        return
-    
-    # Buscar pregações
-    pregacao_sol = db.query(Pregacao).filter(Pregacao.id == troca.pregacao_solicitante_id).first()
-    pregacao_dest = db.query(Pregacao).filter(Pregacao.id == troca.pregacao_destinatario_id).first()
-    
-    if not pregacao_sol or not pregacao_dest:
-        return
-    
-    # Guardar pregadores originais
-    pregador_original_sol = pregacao_sol.pregador_id
-    pregador_original_dest = pregacao_dest.pregacao_id
+def executar_troca_automatica(db: Session, troca_id: str) -> TrocaEscala:
+    """
+    Executa a troca entre pregadores em uma única transação curta:
+    1. trava a troca e confere que ainda está pendente;
+    2. trava os dois pregadores e as duas pregações (SELECT ... FOR UPDATE),
+       sempre na mesma ordem (por ID), para que trocas simultâneas sobre os
+       mesmos pregadores ou pregações não entrem em deadlock;
+    3. revalida com os dados travados: cada pregação ainda é de quem a troca
+       espera e ninguém fica com duas pregações no mesmo dia (uma consulta);
+    4. troca os pregadores, marca a troca como aceita e faz commit.
     
-    # TROCAR pregadores
-    pregacao_sol.pregador_id = troca.usuario_destinatario_id
-    setattr(pregacao_sol, "foi_trocado", True)
-    pregacao_sol.pregador_original_id = pregador_original_sol
+    A espera por travas é limitada por TROCA_LOCK_TIMEOUT_MS.
+    Levanta ValueError (após rollback) se a troca não puder mais ser aplicada.
+    """
+    from sqlalchemy.exc import OperationalError
+    from app.models.troca_escala import StatusTroca
+    from app.services.disponibilidade_service import STATUS_CONFLITO_DIA
     
-    pregacao_dest.pregador_id = troca.usuario_solicitante_id
-    setattr(pregacao_dest, "foi_trocado", True)
-    pregacao_dest.pregador_original_id = pregador_original_dest
+    try:
+        # Vale só para esta transação
+        db.execute(text(f"SET LOCAL lock_timeout = '{int(TROCA_LOCK_TIMEOUT_MS)}ms'"))
+        
+        troca = db.query(TrocaEscala).filter(
+            TrocaEscala.id == troca_id
+        ).with_for_update().populate_existing().first()
+        if not troca:
+            raise ValueError("Troca não encontrada")
+        if troca.status != StatusTroca.PENDENTE_DESTINATARIO:
+            raise ValueError("Troca não está mais pendente")
+        
+        # Travar os dois pregadores serializa as trocas que envolvem o mesmo
+        # pregador, mesmo sobre outras pregações (a checagem de conflito no dia
+        # lê linhas que esta troca não trava). NO KEY UPDATE não bloqueia FKs.
+        db.query(Usuario.id).filter(
+            Usuario.id.in_([troca.usuario_solicitante_id, troca.usuario_destinatario_id])
+        ).order_by(Usuario.id).with_for_update(key_share=True).all()
+        
+        ids = sorted([troca.pregacao_solicitante_id, troca.pregacao_destinatario_id], key=str)
+        pregacoes = {
+            p.id: p
+            for p in db.query(Pregacao).filter(
+                Pregacao.id.in_(ids)
+            ).order_by(Pregacao.id).with_for_update().populate_existing().all()
+        }
+        pregacao_sol = pregacoes.get(troca.pregacao_solicitante_id)
+        pregacao_dest = pregacoes.get(troca.pregacao_destinatario_id)
+        if not pregacao_sol or not pregacao_dest:
+            raise ValueError("Pregação da troca não encontrada")
+        
+        # Outra troca ou edição pode ter mudado os pregadores desde a solicitação
+        if (
+            pregacao_sol.pregador_id != troca.usuario_solicitante_id
+            or pregacao_dest.pregador_id != troca.usuario_destinatario_id
+        ):
+            raise ValueError("As pregações da troca mudaram de pregador desde a solicitação")
+        
+        # Conflito no mesmo dia após a troca (uma consulta para os dois pregadores)
+        conflito = db.query(Pregacao.id).filter(
+            Pregacao.id.notin_(ids),
+            Pregacao.status.in_(STATUS_CONFLITO_DIA),
+            or_(
+                and_(
+                    Pregacao.pregador_id == troca.usuario_solicitante_id,
+                    Pregacao.data_pregacao == pregacao_dest.data_pregacao
+                ),
+                and_(
+                    Pregacao.pregador_id == troca.usuario_destinatario_id,
+                    Pregacao.data_pregacao == pregacao_sol.data_pregacao
+                ),
+            )
+        ).first()
+        if conflito:
+            raise ValueError("A troca deixaria um pregador com duas pregações no mesmo dia")
+        
+        # Guardar pregadores originais
+        pregador_original_sol = pregacao_sol.pregador_id
+        pregador_original_dest = pregacao_dest.pregador_id
+        
+        # TROCAR pregadores
+        pregacao_sol.pregador_id = pregador_original_dest
+        pregacao_sol.foi_trocado = True
+        pregacao_sol.pregador_original_id = pregador_original_sol
+        
+        pregacao_dest.pregador_id = pregador_original_sol
+        pregacao_dest.foi_trocado = True
+        pregacao_dest.pregador_original_id = pregador_original_dest
+        
+        agora = datetime.utcnow()
+        troca.status = StatusTroca.ACEITA
+        troca.aceito_destinatario_em = agora
+        troca.concluido_em = agora
+        
+        db.commit()
+    except OperationalError as e:
+        db.rollback()
+        if getattr(e.orig, "pgcode", None) == "55P03":  # lock_not_available (lock_timeout)
+            raise ValueError("Troca em processamento por outra requisição, tente novamente")
+        raise
+    except Exception:
+        db.rollback()
+        raise
     
-    db.commit()
+    return troca
 
 
 def sugerir_pregador_substituto(db: Session, pregacao_id: str) -> Optional[Usuario]:
     """
     Sugere um pregador substituto quando uma pregação é recusada.
     Notifica o pastor distrital com a sugestão.
+    O ranking de candidatos vem do cache do distrito e a disponibilidade é
+    verificada para todos de uma vez (ver substituicao_service).
     """
     from app.models import Distrito, Notificacao
+    from app.services.substituicao_service import sugerir_substitutos
     
     pregacao = db.query(Pregacao).filter(Pregacao.id == pregacao_id).first()
     if not pregacao:
@@ -714,87 +1752,10 @@ def sugerir_pregador_substituto(db: Session, pregacao_id: str) -> Optional[Usuar
     if not escala:
         return None
     
-    # Buscar pregadores do distrito ordenados por score
-    from sqlalchemy import text
-    pregadores = db.query(Usuario, PerfilPregador).join(
-        PerfilPregador, Usuario.id == PerfilPregador.usuario_id
-    ).filter(
-        Usuario.distrito_id == escala.distrito_id,
-        Usuario.ativo == True,
-        Usuario.status_aprovacao == "aprovado",
-        PerfilPregador.ativo == True,
-        text("'pregador' = ANY(perfis)"),
-        Usuario.id != pregacao.pregador_id  # Excluir o pregador que recusou
-    ).order_by(PerfilPregador.score_medio.desc()).all()
-    
-    # Encontrar pregador disponível
-    for usuario, perfil in pregadores:
-        # Verificar indisponibilidade
-        indisponivel = db.query(PeriodoIndisponibilidade).filter(
-            PeriodoIndisponibilidade.pregador_id == usuario.id,
-            PeriodoIndisponibilidade.ativo == True,
-            PeriodoIndisponibilidade.data_inicio <= pregacao.data_pregacao,
-            PeriodoIndisponibilidade.data_fim >= pregacao.data_pregacao
-        ).first()
-        
-        if indisponivel:
-            continue
-        
-        # Verificar conflito no mesmo dia
-        conflito = db.query(Pregacao).filter(
-            Pregacao.pregador_id == usuario.id,
-            Pregacao.data_pregacao == pregacao.data_pregacao,
-            Pregacao.status.in_(["agendado", "aceito"])
-        ).first()
-        
-        if conflito:
-            continue
-        
-        # Verificar limite mensal
-        pregacoes_mes = db.query(Pregacao).filter(
-            Pregacao.pregador_id == usuario.id,
-            Pregacao.data_pregacao >= pregacao.data_pregacao.replace(day=1),
-            Pregacao.status.in_(["agendado", "aceito", "realizado"])
-        ).count()
-        
-        if pregacoes_mes >= perfil.max_pregacoes_mes:
-            continue
-        
-        # Encontrou pregador disponível! Criar notificação para o pastor
-        # Buscar pastor distrital do distrito
-        from sqlalchemy import text
-        pastor = db.query(Usuario).filter(
-            Usuario.distrito_id == escala.distrito_id,
-            text("'pastor_distrital' = ANY(perfis)"),
-            Usuario.ativo == True
-        ).first()
-        
-        if pastor:
-            from app.models import Igreja
-            igreja = db.query(Igreja).filter(Igreja.id == pregacao.igreja_id).first()
-            pregador_recusou = db.query(Usuario).filter(Usuario.id == pregacao.pregador_id).first()
-            
-            notificacao = Notificacao(
-                usuario_id=pastor.id,
-                pregacao_id=pregacao.id,
-                tipo="push",  # String direta por compatibilidade
-                titulo="Pregação Recusada - Sugestão de Substituto",
-                mensagem=f"O pregador {pregador_recusou.nome_completo if pregador_recusou else 'Desconhecido'} recusou a pregação do dia {pregacao.data_pregacao.strftime('%d/%m/%Y')} na {igreja.nome if igreja else 'igreja'}. "
-                        f"Sugestão: {usuario.nome_completo} (Score: {perfil.score_medio:.1f})",
-                dados_extra={
-                    "pregacao_id": str(pregacao.id),
-                    "pregador_sugerido_id": str(usuario.id),
-                    "pregador_sugerido_nome": usuario.nome_completo,
-                    "pregador_sugerido_score": float(perfil.score_medio) if perfil.score_medio else 0
-                }
-            )
-            db.add(notificacao)
-            db.commit()
-        
-        return usuario
+    sugestao = sugerir_substitutos(db, str(escala.distrito_id), [pregacao])[str(pregacao.id)]
+    candidato = sugestao["candidatos"][0] if sugestao["candidatos"] else None
     
-    # Não encontrou substituto, notificar pastor mesmo assim
-    from sqlalchemy import text
+    # Notificar o pastor distrital (com ou sem sugestão)
     pastor = db.query(Usuario).filter(
         Usuario.distrito_id == escala.distrito_id,
         text("'pastor_distrital' = ANY(perfis)"),
@@ -802,23 +1763,43 @@ def sugerir_pregador_substituto(db: Session, pregacao_id: str) -> Optional[Usuar
     ).first()
     
     if pastor:
-        from app.models import Igreja
         igreja = db.query(Igreja).filter(Igreja.id == pregacao.igreja_id).first()
         pregador_recusou = db.query(Usuario).filter(Usuario.id == pregacao.pregador_id).first()
-        
-        notificacao = Notificacao(
-            usuario_id=pastor.id,
-            pregacao_id=pregacao.id,
-            tipo="push",  # String direta por compatibilidade
-            titulo="Pregação Recusada - SEM Substituto Disponível",
-            mensagem=f"O pregador {pregador_recusou.nome_completo if pregador_recusou else 'Desconhecido'} recusou a pregação do dia {pregacao.data_pregacao.strftime('%d/%m/%Y')} na {igreja.nome if igreja else 'igreja'}. "
-                    f"Nenhum pregador disponível foi encontrado. Ação manual necessária.",
-            dados_extra={
-                "pregacao_id": str(pregacao.id),
-                "sem_substituto": True
-            }
+        recusa = (
+            f"O pregador {pregador_recusou.nome_completo if pregador_recusou else 'Desconhecido'} recusou a pregação "
+            f"do dia {pregacao.data_pregacao.strftime('%d/%m/%Y')} na {igreja.nome if igreja else 'igreja'}. "
         )
+        
+        if candidato:
+            notificacao = Notificacao(
+                usuario_id=pastor.id,
+                pregacao_id=pregacao.id,
+                tipo="push",  # String direta por compatibilidade
+                titulo="Pregação Recusada - Sugestão de Substituto",
+                mensagem=recusa + f"Sugestão: {candidato['pregador_nome']} (Score: {candidato['score']:.1f})",
+                dados_extra={
+                    "pregacao_id": str(pregacao.id),
+                    "pregador_sugerido_id": candidato["pregador_id"],
+                    "pregador_sugerido_nome": candidato["pregador_nome"],
+                    "pregador_sugerido_score": candidato["score"],
+                    "candidatos": [c["pregador_id"] for c in sugestao["candidatos"]],
+                }
+            )
+        else:
+            notificacao = Notificacao(
+                usuario_id=pastor.id,
+                pregacao_id=pregacao.id,
+                tipo="push",  # String direta por compatibilidade
+                titulo="Pregação Recusada - SEM Substituto Disponível",
+                mensagem=recusa + "Nenhum pregador disponível foi encontrado. Ação manual necessária.",
+                dados_extra={
+                    "pregacao_id": str(pregacao.id),
+                    "sem_substituto": True
+                }
+            )
         db.add(notificacao)
         db.commit()
     
-    return None
+    if not candidato:
+        return None
+    return db.query(Usuario).filter(Usuario.id == candidato["pregador_id"]).first()
@@ -0,0 +1,129 @@
+"""
+Service: Fila de Recálculo de Score
+Recálculo de score adiado e agrupado por pregador, fora da requisição.
+
+Depois de um culto, muitas avaliações do mesmo pregador chegam em poucos
+minutos (QR code). Cada avaliação só atualiza os agregados do perfil e agenda
+o recálculo; o worker recalcula cada pregador uma vez por janela
+(SCORE_FILA_JANELA_SEGUNDOS), não importa quantas avaliações chegaram nela.
+
+A fila é local ao processo e fica em memória: se o processo encerrar antes do
+recálculo, o score fica desatualizado até a próxima avaliação do pregador ou
+até o recálculo em lote (recalcular_estatisticas_pregadores.py).
+"""
+
+import logging
+import threading
+from time import monotonic
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+# pregador_id -> instante (monotonic) em que o recálculo vence
+_pendentes: Dict[str, float] = {}
+_trava = threading.Lock()
+_novo_item = threading.Event()
+_parar_worker = threading.Event()
+_thread_worker: Optional[threading.Thread] = None
+
+
+def agendar_recalculo_score(pregador_id: str) -> bool:
+    """
+    Agenda o recálculo do score do pregador para o fim da janela.
+    Pedidos repetidos dentro da janela são agrupados no primeiro.
+    Retorna False se o worker não estiver ativo (o chamador recalcula na hora).
+    """
+    if not worker_ativo():
+        return False
+    chave = str(pregador_id)
+    with _trava:
+        if chave not in _pendentes:
+            _pendentes[chave] = monotonic() + settings.SCORE_FILA_JANELA_SEGUNDOS
+            _novo_item.set()
+    return True
+
+
+def retirar_vencidos(agora: Optional[float] = None, todos: bool = False) -> List[str]:
+    """Remove da fila e retorna os pregadores cuja janela terminou (ou todos)"""
+    agora = monotonic() if agora is None else agora
+    with _trava:
+        vencidos = [uid for uid, vence_em in _pendentes.items() if todos or vence_em <= agora]
+        for uid in vencidos:
+            del _pendentes[uid]
+    return vencidos
+
+
+def proximo_vencimento() -> Optional[float]:
+    """Segundos até o próximo recálculo vencer (None com a fila vazia)"""
+    with _trava:
+        if not _pendentes:
+            return None
+        return max(0.0, min(_pendentes.values()) - monotonic())
+
+
+def processar_vencidos(todos: bool = False) -> int:
+    """Recalcula o score dos pregadores vencidos; retorna quantos foram recalculados"""
+    from app.services.pregador_service import recalcular_score
+
+    pregadores = retirar_vencidos(todos=todos)
+    if not pregadores:
+        return 0
+
+    db = SessionLocal()
+    try:
+        for pregador_id in pregadores:
+            try:
+                recalcular_score(db, pregador_id)
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Erro ao recalcular score do pregador {pregador_id}: {str(e)}", exc_info=True)
+    finally:
+        db.close()
+    return len(pregadores)
+
+
+def executar_worker(parar: threading.Event) -> None:
+    """Loop do worker: dorme até o próximo vencimento (ou novo item) e recalcula"""
+    while not parar.is_set():
+        espera = proximo_vencimento()
+        _novo_item.wait(espera)
+        _novo_item.clear()
+        try:
+            processar_vencidos()
+        except Exception as e:
+            logger.error(f"Erro no worker de score: {str(e)}", exc_info=True)
+
+    # Encerramento: não deixar recálculos agendados para trás
+    processar_vencidos(todos=True)
+
+
+def worker_ativo() -> bool:
+    return _thread_worker is not None and _thread_worker.is_alive() and not _parar_worker.is_set()
+
+
+def iniciar_worker_interno() -> None:
+    """Inicia o worker como thread daemon dentro do processo da API"""
+    global _thread_worker
+    if _thread_worker and _thread_worker.is_alive():
+        return
+    _parar_worker.clear()
+    _thread_worker = threading.Thread(
+        target=executar_worker,
+        args=(_parar_worker,),
+        name="worker-score",
+        daemon=True,
+    )
+    _thread_worker.start()
+    logger.info("Worker interno de recálculo de score iniciado")
+
+
+def parar_worker_interno(timeout: float = 10.0) -> None:
+    """Sinaliza o worker para encerrar e aguarda o processamento dos pendentes"""
+    _parar_worker.set()
+    _novo_item.set()
+    if _thread_worker and _thread_worker.is_alive():
+        _thread_worker.join(timeout)
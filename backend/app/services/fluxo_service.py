@@ -0,0 +1,303 @@
+"""
+Service: Fluxo de Custo Mínimo
+Estratégia alternativa de geração de escalas: o mês inteiro é modelado como um
+problema de fluxo de custo mínimo e resolvido em uma única passada.
+
+Rede (capacidade / custo):
+    origem -> pregador            limite mensal restante / 0
+    origem -> pregador            extra do preenchimento forçado / CUSTO_LIMITE_EXTRA
+    pregador -> pregador@data     1 / 0   (no máximo uma pregação por dia)
+    pregador@data -> horário      1 / custo pelo score, dia da semana e semana consecutiva
+    horário -> destino            1 / 0
+
+O fluxo máximo maximiza a cobertura; entre as soluções de cobertura máxima,
+o custo mínimo favorece os maiores scores (sobretudo aos sábados) e evita
+repetir o pregador na mesma igreja da semana anterior já gravada no banco.
+"""
+
+import heapq
+from datetime import timedelta
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+from app.services.disponibilidade_service import MatrizDisponibilidade, SnapshotDisponibilidade
+
+if TYPE_CHECKING:
+    from app.services.escala_service import ContextoGeracao
+
+
+# Peso do score por dia: pregadores de maior score vão primeiro para os sábados
+PESO_DIA = {"sabado": 3, "domingo": 2, "quarta": 1}
+# Acréscimo pequeno por dia para, sem cobertura total, deixar lacunas na quarta antes do sábado
+CUSTO_PRIORIDADE_DIA = {"sabado": 0, "domingo": 1, "quarta": 2}
+# Penalidade por repetir o pregador na mesma igreja em semanas consecutivas
+PENALIDADE_CONSECUTIVA = 100
+# Custo de usar capacidade acima do limite mensal (equivalente ao preenchimento forçado)
+CUSTO_LIMITE_EXTRA = 100000
+
+_INFINITO = float("inf")
+
+
+class RedeFluxo:
+    """Rede residual com fluxo de custo mínimo (caminhos mínimos com potenciais)"""
+
+    def __init__(self, total_nos: int):
+        self.total_nos = total_nos
+        self.adjacencia: List[List[int]] = [[] for _ in range(total_nos)]
+        # Arestas em pares (ida, volta): a volta de `e` é `e ^ 1`
+        self.destino: List[int] = []
+        self.capacidade: List[int] = []
+        self.custo: List[int] = []
+
+    def adicionar_aresta(self, origem: int, destino: int, capacidade: int, custo: int) -> int:
+        """Adiciona aresta e sua reversa; retorna o índice da aresta de ida"""
+        indice = len(self.destino)
+        self.destino.extend((destino, origem))
+        self.capacidade.extend((capacidade, 0))
+        self.custo.extend((custo, -custo))
+        self.adjacencia[origem].append(indice)
+        self.adjacencia[destino].append(indice + 1)
+        return indice
+
+    def resolver(self, origem: int, sumidouro: int) -> int:
+        """
+        Envia o fluxo máximo de custo mínimo de `origem` a `sumidouro`.
+        A cada Dijkstra (custos reduzidos não negativos), todos os caminhos
+        mínimos são saturados de uma vez sobre o grafo admissível (custo
+        reduzido zero), como em Dinic. Retorna o fluxo enviado.
+        """
+        dual = [0] * self.total_nos
+        fluxo_total = 0
+        while True:
+            distancia, visitado = self._dijkstra(origem, sumidouro, dual)
+            if not visitado[sumidouro]:
+                break
+            for no in range(self.total_nos):
+                if visitado[no]:
+                    dual[no] -= distancia[sumidouro] - distancia[no]
+            fluxo_total += self._saturar_caminhos_minimos(origem, sumidouro, dual)
+        return fluxo_total
+
+    def _dijkstra(self, origem: int, sumidouro: int, dual: List[int]) -> Tuple[List[float], List[bool]]:
+        distancia = [_INFINITO] * self.total_nos
+        visitado = [False] * self.total_nos
+        distancia[origem] = 0
+        fila = [(0, origem)]
+        while fila:
+            d, no = heapq.heappop(fila)
+            if visitado[no]:
+                continue
+            visitado[no] = True
+            if no == sumidouro:
+                break
+            for aresta in self.adjacencia[no]:
+                if self.capacidade[aresta] == 0:
+                    continue
+                vizinho = self.destino[aresta]
+                if visitado[vizinho]:
+                    continue
+                nova = d + self.custo[aresta] - dual[vizinho] + dual[no]
+                if nova < distancia[vizinho]:
+                    distancia[vizinho] = nova
+                    heapq.heappush(fila, (nova, vizinho))
+        return distancia, visitado
+
+    def _saturar_caminhos_minimos(self, origem: int, sumidouro: int, dual: List[int]) -> int:
+        """Fluxo bloqueante (unitário) sobre as arestas de custo reduzido zero"""
+        enviado = 0
+        while True:
+            nivel = self._niveis_admissiveis(origem, dual)
+            if nivel[sumidouro] < 0:
+                return enviado
+            proxima = [0] * self.total_nos
+            while True:
+                caminho = self._caminho_admissivel(origem, sumidouro, dual, nivel, proxima)
+                if caminho is None:
+                    break
+                for aresta in caminho:
+                    self.capacidade[aresta] -= 1
+                    self.capacidade[aresta ^ 1] += 1
+                enviado += 1
+
+    def _niveis_admissiveis(self, origem: int, dual: List[int]) -> List[int]:
+        destino, capacidade, custo, adjacencia = self.destino, self.capacidade, self.custo, self.adjacencia
+        nivel = [-1] * self.total_nos
+        nivel[origem] = 0
+        fila = [origem]
+        for no in fila:
+            proximo_nivel = nivel[no] + 1
+            dual_no = dual[no]
+            for aresta in adjacencia[no]:
+                vizinho = destino[aresta]
+                if (
+                    nivel[vizinho] < 0
+                    and capacidade[aresta] > 0
+                    and custo[aresta] - dual[vizinho] + dual_no == 0
+                ):
+                    nivel[vizinho] = proximo_nivel
+                    fila.append(vizinho)
+        return nivel
+
+    def _caminho_admissivel(self, origem, sumidouro, dual, nivel, proxima):
+        """Busca em profundidade iterativa no grafo de níveis; None quando não há caminho"""
+        destino, capacidade, custo, adjacencia = self.destino, self.capacidade, self.custo, self.adjacencia
+        caminho: List[int] = []
+        no = origem
+        while no != sumidouro:
+            arestas = adjacencia[no]
+            total = len(arestas)
+            avancou = False
+            while proxima[no] < total:
+                aresta = arestas[proxima[no]]
+                vizinho = destino[aresta]
+                if (
+                    nivel[vizinho] == nivel[no] + 1
+                    and capacidade[aresta] > 0
+                    and custo[aresta] - dual[vizinho] + dual[no] == 0
+                ):
+                    caminho.append(aresta)
+                    no = vizinho
+                    avancou = True
+                    break
+                proxima[no] += 1
+            if not avancou:
+                if no == origem:
+                    return None
+                # Beco sem saída: recuar e descartar a aresta usada para chegar aqui
+                aresta = caminho.pop()
+                no = destino[aresta ^ 1]
+                proxima[no] += 1
+        return caminho
+
+
+def atribuir_fluxo_custo_minimo(contexto: "ContextoGeracao", snapshot: SnapshotDisponibilidade) -> List[Dict]:
+    """
+    Estratégia "fluxo": atribui o mês inteiro resolvendo um fluxo de custo mínimo.
+    Respeita indisponibilidade, conflito no mesmo dia e limite mensal (com o mesmo
+    extra do preenchimento forçado). A repetição na mesma igreja em semanas
+    consecutivas é penalizada em relação às pregações já existentes no banco;
+    entre atribuições do próprio mês ela não é linear e é reduzida depois por
+    trocas entre horários da mesma data. Registra as atribuições em `snapshot`.
+    """
+    from app.services.escala_service import _nova_atribuicao
+
+    slots = contexto.slots()
+    if not slots:
+        return []
+
+    pregadores = [str(u.id) for u, _ in contexto.pregadores_list]
+    scores = contexto.score_por_usuario
+    score_maximo = max((scores.get(uid, 0.0) for uid in pregadores), default=0.0)
+
+    # Índices dos nós: 0 = origem, 1 = destino, depois pregadores, pregador@data e horários
+    origem, sumidouro = 0, 1
+    proximo_no = 2
+    no_pregador: Dict[str, int] = {}
+    for uid in pregadores:
+        no_pregador[uid] = proximo_no
+        proximo_no += 1
+    no_slot: List[int] = []
+    for _ in slots:
+        no_slot.append(proximo_no)
+        proximo_no += 1
+
+    slots_por_data: Dict = {}
+    for indice, (_, data_pregacao, _, _) in enumerate(slots):
+        slots_por_data.setdefault(data_pregacao, []).append(indice)
+
+    # Nós pregador@data apenas onde o pregador está livre naquele dia
+    # (máscara vetorizada; a ordem linha a linha preserva pregador -> data)
+    matriz = MatrizDisponibilidade(snapshot, pregadores, list(slots_por_data))
+    linhas_livres, colunas_livres = matriz.livre.nonzero()
+    pares_livres: List[Tuple[int, int]] = list(zip(linhas_livres.tolist(), colunas_livres.tolist()))
+    consecutivo_por_igreja = {str(igreja.id): matriz.consecutivo(str(igreja.id)) for igreja in contexto.igrejas}
+
+    rede = RedeFluxo(proximo_no + len(pares_livres))
+
+    for uid in pregadores:
+        limite = contexto.limite_por_usuario.get(uid, 4)
+        ja_escalado = snapshot.total_mes(uid)
+        normal = max(0, limite - ja_escalado)
+        extra = max(0, limite + contexto.limite_forcado_extra_max - ja_escalado) - normal
+        if normal:
+            rede.adicionar_aresta(origem, no_pregador[uid], normal, 0)
+        if extra:
+            rede.adicionar_aresta(origem, no_pregador[uid], extra, CUSTO_LIMITE_EXTRA)
+
+    for no in no_slot:
+        rede.adicionar_aresta(no, sumidouro, 1, 0)
+
+    arestas_atribuicao: List[Tuple[int, str, int]] = []
+    for deslocamento, (linha, coluna) in enumerate(pares_livres):
+        uid = pregadores[linha]
+        no_dia = proximo_no + deslocamento
+        rede.adicionar_aresta(no_pregador[uid], no_dia, 1, 0)
+        custo_score = int(round((score_maximo - scores.get(uid, 0.0)) * 10))
+        for indice in slots_por_data[matriz.datas[coluna]]:
+            dia_semana_pt, _, igreja, _ = slots[indice]
+            custo = custo_score * PESO_DIA.get(dia_semana_pt, 1) + CUSTO_PRIORIDADE_DIA.get(dia_semana_pt, 0)
+            if consecutivo_por_igreja[str(igreja.id)][linha, coluna]:
+                custo += PENALIDADE_CONSECUTIVA
+            aresta = rede.adicionar_aresta(no_dia, no_slot[indice], 1, custo)
+            arestas_atribuicao.append((aresta, uid, indice))
+
+    rede.resolver(origem, sumidouro)
+
+    atribuicoes: List[Dict] = []
+    for aresta, uid, indice in arestas_atribuicao:
+        if rede.capacidade[aresta] == 0:
+            dia_semana_pt, data_pregacao, igreja, horario = slots[indice]
+            atribuicoes.append(_nova_atribuicao(str(igreja.id), uid, dia_semana_pt, data_pregacao, horario))
+
+    _reduzir_repeticoes_consecutivas(snapshot, atribuicoes)
+
+    # Manter a ordem de prioridade dos horários
+    ordem = {(str(ig.id), d, h["horario"]): i for i, (_, d, ig, h) in enumerate(slots)}
+    atribuicoes.sort(key=lambda a: ordem[(a["igreja_id"], a["data_pregacao"], a["horario_pregacao"])])
+    for a in atribuicoes:
+        snapshot.registrar(a["pregador_id"], a["igreja_id"], a["data_pregacao"])
+
+    return atribuicoes
+
+
+def _reduzir_repeticoes_consecutivas(snapshot: SnapshotDisponibilidade, atribuicoes: List[Dict]) -> None:
+    """
+    Troca pregadores entre horários da mesma data quando isso elimina repetições
+    na mesma igreja em semanas consecutivas. Trocar dentro da data preserva
+    disponibilidade, conflito no dia, limites e a cobertura da solução.
+    """
+    pregacoes = set(snapshot.pregacoes_por_igreja)
+    for a in atribuicoes:
+        pregacoes.add((a["pregador_id"], a["igreja_id"], a["data_pregacao"]))
+
+    semana = timedelta(days=7)
+
+    def repete(uid: str, igreja_id: str, data_pregacao) -> int:
+        return int((uid, igreja_id, data_pregacao - semana) in pregacoes) + int(
+            (uid, igreja_id, data_pregacao + semana) in pregacoes
+        )
+
+    por_data: Dict = {}
+    for a in atribuicoes:
+        por_data.setdefault(a["data_pregacao"], []).append(a)
+
+    for data_pregacao in sorted(por_data):
+        do_dia = por_data[data_pregacao]
+        for a in do_dia:
+            if not repete(a["pregador_id"], a["igreja_id"], data_pregacao):
+                continue
+            for b in do_dia:
+                if b is a or b["igreja_id"] == a["igreja_id"]:
+                    continue
+                antes = repete(a["pregador_id"], a["igreja_id"], data_pregacao) + repete(
+                    b["pregador_id"], b["igreja_id"], data_pregacao
+                )
+                depois = repete(b["pregador_id"], a["igreja_id"], data_pregacao) + repete(
+                    a["pregador_id"], b["igreja_id"], data_pregacao
+                )
+                if depois < antes:
+                    pregacoes.discard((a["pregador_id"], a["igreja_id"], data_pregacao))
+                    pregacoes.discard((b["pregador_id"], b["igreja_id"], data_pregacao))
+                    a["pregador_id"], b["pregador_id"] = b["pregador_id"], a["pregador_id"]
+                    pregacoes.add((a["pregador_id"], a["igreja_id"], data_pregacao))
+                    pregacoes.add((b["pregador_id"], b["igreja_id"], data_pregacao))
+                    break
@@ -0,0 +1,170 @@
+"""
+Service: Geração por Associação
+Gera a escala de um mês para todos os distritos ativos de uma associação em paralelo
+"""
+
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from time import perf_counter
+from typing import Dict, List
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import Distrito, Igreja, Usuario
+
+logger = logging.getLogger(__name__)
+
+
+def gerar_escalas_associacao(
+    db: Session,
+    associacao_id: str,
+    mes: int,
+    ano: int,
+    criado_por_id: str,
+) -> Dict:
+    """
+    Gera as escalas do mês para todos os distritos ativos da associação.
+
+    Cada grupo de distritos roda em um processo novo (spawn), com sua própria
+    conexão e sessão.
+    Distritos que compartilham pregadores ficam no mesmo grupo e são gerados em
+    sequência, para que o segundo enxergue as pregações gravadas pelo primeiro
+    (conflito no mesmo dia e limite mensal).
+
+    Retorna o relatório consolidado.
+    """
+    distritos = db.query(Distrito.id, Distrito.nome).filter(
+        Distrito.associacao_id == associacao_id,
+        Distrito.ativo == True
+    ).order_by(Distrito.nome).all()
+
+    if not distritos:
+        raise ValueError("Nenhum distrito ativo na associação")
+
+    nomes = {str(d.id): d.nome for d in distritos}
+    grupos = agrupar_distritos_por_pregadores(db, list(nomes))
+
+    max_workers = settings.GERACAO_MAX_WORKERS or os.cpu_count() or 1
+    max_workers = max(1, min(max_workers, len(grupos)))
+
+    logger.info(
+        f"Gerando escalas da associação {associacao_id} ({mes}/{ano}): "
+        f"{len(nomes)} distritos em {len(grupos)} grupos, {max_workers} processos"
+    )
+
+    inicio = perf_counter()
+    resultados: List[Dict] = []
+    # spawn: o servidor tem threads (threadpool das rotas, workers de jobs e de
+    # score) e um fork poderia herdar travas presas por elas
+    contexto_processos = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=contexto_processos) as executor:
+        futuros = {
+            executor.submit(_gerar_grupo, grupo, mes, ano, str(criado_por_id)): grupo
+            for grupo in grupos
+        }
+        for futuro in as_completed(futuros):
+            try:
+                resultados.extend(futuro.result())
+            except Exception as e:
+                # Falha do processo (não da geração): marcar todos os distritos do grupo
+                logger.error(f"Erro no processo de geração: {str(e)}", exc_info=True)
+                resultados.extend(
+                    {"distrito_id": distrito_id, "sucesso": False, "erro": str(e)}
+                    for distrito_id in futuros[futuro]
+                )
+
+    for resultado in resultados:
+        resultado["distrito_nome"] = nomes.get(resultado["distrito_id"])
+    resultados.sort(key=lambda r: r["distrito_nome"] or "")
+
+    sucesso = [r for r in resultados if r["sucesso"]]
+    return {
+        "associacao_id": str(associacao_id),
+        "mes_referencia": mes,
+        "ano_referencia": ano,
+        "total_distritos": len(resultados),
+        "distritos_gerados": len(sucesso),
+        "distritos_com_erro": len(resultados) - len(sucesso),
+        "total_pregacoes": sum(r["relatorio"]["total_pregacoes"] for r in sucesso),
+        "total_horarios_sem_pregador": sum(r["relatorio"]["total_horarios_sem_pregador"] for r in sucesso),
+        "processos": max_workers,
+        "tempo_ms": round((perf_counter() - inicio) * 1000),
+        "distritos": resultados,
+    }
+
+
+def agrupar_distritos_por_pregadores(db: Session, distrito_ids: List[str]) -> List[List[str]]:
+    """
+    Agrupa distritos que compartilham pregadores (vínculo pelo distrito do usuário
+    ou pela igreja do usuário, os mesmos critérios da geração).
+    """
+    igreja_distrito = {
+        str(igreja_id): str(distrito_id)
+        for igreja_id, distrito_id in db.query(Igreja.id, Igreja.distrito_id).filter(
+            Igreja.distrito_id.in_(distrito_ids),
+            Igreja.ativo == True
+        ).all()
+    }
+
+    usuarios = db.query(Usuario.distrito_id, Usuario.igreja_id).filter(
+        or_(
+            Usuario.distrito_id.in_(distrito_ids),
+            Usuario.igreja_id.in_(list(igreja_distrito))
+        ),
+        Usuario.ativo == True,
+        Usuario.status_aprovacao == "aprovado"
+    ).all()
+
+    # Union-find simples sobre os distritos
+    pai = {distrito_id: distrito_id for distrito_id in distrito_ids}
+
+    def raiz(distrito_id: str) -> str:
+        while pai[distrito_id] != distrito_id:
+            pai[distrito_id] = pai[pai[distrito_id]]
+            distrito_id = pai[distrito_id]
+        return distrito_id
+
+    for distrito_id, igreja_id in usuarios:
+        vinculados = {str(distrito_id)} if distrito_id and str(distrito_id) in pai else set()
+        if igreja_id and str(igreja_id) in igreja_distrito:
+            vinculados.add(igreja_distrito[str(igreja_id)])
+        if len(vinculados) == 2:
+            a, b = (raiz(d) for d in vinculados)
+            pai[a] = b
+
+    grupos: Dict[str, List[str]] = {}
+    for distrito_id in distrito_ids:
+        grupos.setdefault(raiz(distrito_id), []).append(distrito_id)
+    # Grupos maiores primeiro para equilibrar a carga entre os processos
+    return sorted(grupos.values(), key=len, reverse=True)
+
+
+def _gerar_grupo(distrito_ids: List[str], mes: int, ano: int, criado_por_id: str) -> List[Dict]:
+    """Executado no worker: gera, em sequência, os distritos de um grupo com uma sessão própria"""
+    from app.core.database import SessionLocal
+    from app.services.escala_service import gerar_escala_automatica
+
+    resultados = []
+    db = SessionLocal()
+    try:
+        for distrito_id in distrito_ids:
+            try:
+                escala, relatorio = gerar_escala_automatica(db, distrito_id, mes, ano, criado_por_id)
+                resultados.append({
+                    "distrito_id": distrito_id,
+                    "sucesso": True,
+                    "escala_id": str(escala.id),
+                    "relatorio": relatorio,
+                })
+            except Exception as e:
+                db.rollback()
+                if not isinstance(e, ValueError):
+                    logger.error(f"Erro ao gerar escala do distrito {distrito_id}: {str(e)}", exc_info=True)
+                resultados.append({"distrito_id": distrito_id, "sucesso": False, "erro": str(e)})
+    finally:
+        db.close()
+    return resultados
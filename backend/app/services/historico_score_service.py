@@ -0,0 +1,160 @@
+"""
+Service: Histórico de Score
+Série temporal dos componentes do score por pregador (tabela historico_scores).
+
+Cada recálculo de score grava (ou sobrescreve) o ponto do dia do pregador; o
+job noturno (manter_historico_scores.py) grava o ponto do dia de todos os
+pregadores ativos e compacta os pontos diários mais antigos que
+HISTORICO_SCORE_DIAS_DIARIOS em um ponto mensal por pregador. Assim a tabela
+fica com no máximo ~90 linhas diárias + 1 por mês para cada pregador.
+"""
+
+from datetime import date, timedelta
+from time import perf_counter
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, or_, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import HistoricoScore
+
+GRANULARIDADE_DIA = "dia"
+GRANULARIDADE_MES = "mes"
+
+# Escopo do job noturno: todos os pregadores ativos
+ESCOPO_ATIVOS = "p.ativo = true AND u.ativo = true"
+
+COMPONENTES = ("score_medio", "score_avaliacoes", "score_frequencia", "score_pontualidade")
+
+SQL_REGISTRAR_PONTOS = """
+    INSERT INTO historico_scores (
+        pregador_id, periodo_inicio, granularidade,
+        score_medio, score_avaliacoes, score_frequencia, score_pontualidade,
+        avaliacoes_total, amostras, atualizado_em
+    )
+    SELECT
+        p.usuario_id, :dia, 'dia',
+        COALESCE(p.score_medio, 0), COALESCE(p.score_avaliacoes, 0),
+        COALESCE(p.score_frequencia, 0), COALESCE(p.score_pontualidade, 0),
+        p.avaliacoes_total, 1, now()
+    FROM perfis_pregadores p
+    JOIN usuarios u ON u.id = p.usuario_id
+    WHERE {escopo}
+    ON CONFLICT (pregador_id, periodo_inicio, granularidade) DO UPDATE SET
+        score_medio = EXCLUDED.score_medio,
+        score_avaliacoes = EXCLUDED.score_avaliacoes,
+        score_frequencia = EXCLUDED.score_frequencia,
+        score_pontualidade = EXCLUDED.score_pontualidade,
+        avaliacoes_total = EXCLUDED.avaliacoes_total,
+        atualizado_em = now()
+"""
+
+# Diários antigos viram um ponto mensal (média ponderada pelas amostras).
+# Se o mês já tem ponto mensal (mês compactado em duas noites), as médias
+# são combinadas pela quantidade de amostras de cada lado.
+SQL_COMPACTAR = """
+    WITH antigos AS (
+        DELETE FROM historico_scores
+        WHERE granularidade = 'dia' AND periodo_inicio < :limite
+        RETURNING *
+    ),
+    mensais AS (
+        INSERT INTO historico_scores (
+            pregador_id, periodo_inicio, granularidade,
+            score_medio, score_avaliacoes, score_frequencia, score_pontualidade,
+            avaliacoes_total, amostras, atualizado_em
+        )
+        SELECT
+            pregador_id, date_trunc('month', periodo_inicio)::date, 'mes',
+            ROUND(AVG(score_medio), 2), ROUND(AVG(score_avaliacoes), 2),
+            ROUND(AVG(score_frequencia), 2), ROUND(AVG(score_pontualidade), 2),
+            (array_agg(avaliacoes_total ORDER BY periodo_inicio DESC))[1],
+            COUNT(*), now()
+        FROM antigos
+        GROUP BY pregador_id, date_trunc('month', periodo_inicio)
+        ON CONFLICT (pregador_id, periodo_inicio, granularidade) DO UPDATE SET
+            {combinar},
+            avaliacoes_total = EXCLUDED.avaliacoes_total,
+            amostras = historico_scores.amostras + EXCLUDED.amostras,
+            atualizado_em = now()
+        RETURNING 1
+    )
+    SELECT (SELECT COUNT(*) FROM antigos) AS diarios, (SELECT COUNT(*) FROM mensais) AS mensais
+"""
+
+
+def registrar_pontos_score(db: Session, escopo: str, parametros: Dict, dia: Optional[date] = None) -> int:
+    """
+    Grava o ponto do dia com o score atual dos perfis do escopo (mesmo filtro
+    SQL sobre `p` = perfis_pregadores e `u` = usuarios do recálculo em lote).
+    Não faz commit. Retorna quantos pontos foram gravados.
+    """
+    resultado = db.execute(
+        text(SQL_REGISTRAR_PONTOS.format(escopo=escopo)),
+        {**parametros, "dia": dia or date.today()}
+    )
+    return resultado.rowcount
+
+
+def registrar_ponto_pregador(db: Session, pregador_id: str, dia: Optional[date] = None) -> int:
+    """Grava o ponto do dia de um pregador (não faz commit)"""
+    return registrar_pontos_score(db, "p.usuario_id = :pregador_id", {"pregador_id": str(pregador_id)}, dia)
+
+
+def compactar_historico(db: Session, dias_diarios: Optional[int] = None, hoje: Optional[date] = None) -> Dict:
+    """
+    Compacta os pontos diários mais antigos que `dias_diarios` (padrão
+    HISTORICO_SCORE_DIAS_DIARIOS) em pontos mensais, com um comando e um commit.
+
+    Retorna: {"pontos_diarios_compactados": int, "pontos_mensais": int, "tempo_ms": float}
+    """
+    dias_diarios = settings.HISTORICO_SCORE_DIAS_DIARIOS if dias_diarios is None else dias_diarios
+    limite = (hoje or date.today()) - timedelta(days=dias_diarios)
+    combinar = ",\n            ".join(
+        f"{c} = ROUND((historico_scores.{c} * historico_scores.amostras + EXCLUDED.{c} * EXCLUDED.amostras)"
+        f" / (historico_scores.amostras + EXCLUDED.amostras), 2)"
+        for c in COMPONENTES
+    )
+
+    inicio = perf_counter()
+    linha = db.execute(text(SQL_COMPACTAR.format(combinar=combinar)), {"limite": limite}).one()
+    db.commit()
+
+    return {
+        "pontos_diarios_compactados": linha.diarios,
+        "pontos_mensais": linha.mensais,
+        "tempo_ms": round((perf_counter() - inicio) * 1000, 1),
+    }
+
+
+def consultar_historico(db: Session, pregador_ids: List[str], inicio: date, fim: date) -> Dict[str, List[Dict]]:
+    """
+    Série de cada pregador entre `inicio` e `fim` (uma consulta), em ordem de
+    data: pontos mensais para o trecho já compactado e diários no restante.
+    Um mês compactado entra se começar dentro do intervalo ou contiver `inicio`.
+    """
+    series: Dict[str, List[Dict]] = {str(pid): [] for pid in pregador_ids}
+    if not series:
+        return series
+
+    pontos = db.query(HistoricoScore).filter(
+        HistoricoScore.pregador_id.in_(list(series)),
+        HistoricoScore.periodo_inicio <= fim,
+        or_(
+            and_(HistoricoScore.granularidade == GRANULARIDADE_DIA, HistoricoScore.periodo_inicio >= inicio),
+            and_(HistoricoScore.granularidade == GRANULARIDADE_MES, HistoricoScore.periodo_inicio >= inicio.replace(day=1)),
+        )
+    ).order_by(HistoricoScore.pregador_id, HistoricoScore.periodo_inicio, HistoricoScore.granularidade.desc()).all()
+
+    for ponto in pontos:
+        series[str(ponto.pregador_id)].append({
+            "data": ponto.periodo_inicio,
+            "granularidade": ponto.granularidade,
+            "score_medio": ponto.score_medio,
+            "score_avaliacoes": ponto.score_avaliacoes,
+            "score_frequencia": ponto.score_frequencia,
+            "score_pontualidade": ponto.score_pontualidade,
+            "avaliacoes_total": ponto.avaliacoes_total,
+        })
+    return series
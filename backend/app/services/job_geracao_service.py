@@ -0,0 +1,265 @@
+"""
+Service: Jobs de Geração
+Geração automática de escalas em segundo plano, com progresso persistido.
+
+Os jobs ficam na tabela `jobs_geracao`; qualquer processo pode executá-los
+reservando o próximo pendente com SELECT ... FOR UPDATE SKIP LOCKED. Por isso
+o worker pode rodar dentro da API (thread) ou separado (worker_geracao.py),
+ou os dois ao mesmo tempo, sem broker externo.
+"""
+
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from time import monotonic
+from typing import Optional
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models import Escala, JobGeracao, StatusJobGeracao
+
+logger = logging.getLogger(__name__)
+
+
+# Faixa de percentual ocupada por cada fase da geração
+FAIXAS_FASE = {
+    "carregando": (0, 10),
+    "atribuindo": (10, 80),
+    "otimizando": (80, 88),
+    "tematicas": (88, 90),
+    "gravando": (90, 99),
+}
+# Intervalo mínimo entre gravações de progresso (segundos)
+INTERVALO_PROGRESSO = 0.5
+
+STATUS_ATIVOS = (StatusJobGeracao.PENDENTE.value, StatusJobGeracao.EXECUTANDO.value)
+
+# Acorda o worker interno quando um job é criado neste processo
+_novo_job = threading.Event()
+_parar_worker = threading.Event()
+_thread_worker: Optional[threading.Thread] = None
+
+
+def criar_job(db: Session, distrito_id: str, mes: int, ano: int, solicitado_por: str) -> JobGeracao:
+    """
+    Enfileira a geração de um distrito/mês.
+    Se já houver job pendente ou em execução para o mesmo período, ele é
+    retornado (uma nova tentativa do cliente não dispara outra geração); se a
+    escala do período já foi gerada por um job, esse job concluído (com o
+    relatório) é retornado.
+    """
+    from app.services.escala_service import chave_trava_geracao
+
+    # Serializa chamadas simultâneas para o mesmo período até o commit, para
+    # que não criem dois jobs (escopo diferente da trava da própria geração)
+    db.execute(
+        text("SELECT pg_advisory_xact_lock(:chave)"),
+        {"chave": chave_trava_geracao(distrito_id, mes, ano, escopo="job")}
+    )
+
+    escala_existente = db.query(Escala.id).filter(
+        Escala.distrito_id == distrito_id,
+        Escala.mes_referencia == mes,
+        Escala.ano_referencia == ano
+    ).first()
+    if escala_existente:
+        concluido = db.query(JobGeracao).filter(
+            JobGeracao.escala_id == escala_existente.id,
+            JobGeracao.status == StatusJobGeracao.CONCLUIDO.value
+        ).order_by(JobGeracao.concluido_em.desc()).first()
+        db.rollback()
+        if concluido:
+            return concluido
+        raise ValueError("Já existe uma escala para este período")
+
+    job = db.query(JobGeracao).filter(
+        JobGeracao.distrito_id == distrito_id,
+        JobGeracao.mes_referencia == mes,
+        JobGeracao.ano_referencia == ano,
+        JobGeracao.status.in_(STATUS_ATIVOS)
+    ).first()
+    if job:
+        db.rollback()
+        return job
+
+    job = JobGeracao(
+        distrito_id=distrito_id,
+        mes_referencia=mes,
+        ano_referencia=ano,
+        solicitado_por=solicitado_por,
+        status=StatusJobGeracao.PENDENTE.value,
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+
+    _novo_job.set()
+    return job
+
+
+def reservar_proximo_job(db: Session) -> Optional[str]:
+    """Marca o job pendente mais antigo como em execução e retorna seu ID"""
+    job = db.query(JobGeracao).filter(
+        JobGeracao.status == StatusJobGeracao.PENDENTE.value
+    ).order_by(JobGeracao.criado_em).with_for_update(skip_locked=True).first()
+
+    if not job:
+        db.rollback()
+        return None
+
+    job.status = StatusJobGeracao.EXECUTANDO.value
+    job.fase = "carregando"
+    job.iniciado_em = datetime.now(timezone.utc)
+    db.commit()
+    return str(job.id)
+
+
+def executar_job(job_id: str) -> None:
+    """
+    Executa a geração de um job já reservado.
+    O progresso é gravado por uma sessão separada, pois a geração só faz
+    commit ao final (gravação em lote da escala).
+    """
+    from app.services.escala_service import gerar_escala_automatica
+
+    db_progresso = SessionLocal()
+    db_geracao = SessionLocal()
+    try:
+        job = db_progresso.query(JobGeracao).filter(JobGeracao.id == job_id).first()
+        if not job:
+            return
+
+        ultima_gravacao = [0.0]
+
+        def progresso(fase: str, processados: int, total: int) -> None:
+            inicio_faixa, fim_faixa = FAIXAS_FASE.get(fase, (0, 99))
+            fracao = processados / total if total else 0
+            percentual = int(inicio_faixa + (fim_faixa - inicio_faixa) * fracao)
+
+            agora = monotonic()
+            mudou_fase = fase != job.fase
+            if not mudou_fase and agora - ultima_gravacao[0] < INTERVALO_PROGRESSO:
+                return
+            ultima_gravacao[0] = agora
+
+            job.fase = fase
+            job.percentual = percentual
+            job.slots_processados = processados
+            job.slots_total = total
+            db_progresso.commit()
+
+        try:
+            escala, relatorio = gerar_escala_automatica(
+                db_geracao,
+                str(job.distrito_id),
+                job.mes_referencia,
+                job.ano_referencia,
+                str(job.solicitado_por) if job.solicitado_por else None,
+                progresso=progresso,
+                reaproveitar_recente=True,
+            )
+        except Exception as e:
+            db_geracao.rollback()
+            if not isinstance(e, ValueError):
+                logger.error(f"Erro no job de geração {job_id}: {str(e)}", exc_info=True)
+            job.status = StatusJobGeracao.ERRO.value
+            job.erro = str(e)
+            job.concluido_em = datetime.now(timezone.utc)
+            db_progresso.commit()
+            return
+
+        job.status = StatusJobGeracao.CONCLUIDO.value
+        job.fase = None
+        job.percentual = 100
+        job.slots_processados = job.slots_total
+        job.escala_id = escala.id
+        job.relatorio = jsonable_encoder(relatorio)
+        job.concluido_em = datetime.now(timezone.utc)
+        db_progresso.commit()
+        logger.info(f"Job de geração {job_id} concluído (escala {escala.id})")
+    finally:
+        db_geracao.close()
+        db_progresso.close()
+
+
+def processar_jobs_pendentes() -> int:
+    """Executa jobs pendentes até a fila esvaziar; retorna quantos foram executados"""
+    executados = 0
+    while True:
+        db = SessionLocal()
+        try:
+            job_id = reservar_proximo_job(db)
+        finally:
+            db.close()
+        if not job_id:
+            return executados
+        executar_job(job_id)
+        executados += 1
+
+
+def recuperar_jobs_interrompidos(db: Session) -> int:
+    """
+    Marca como erro os jobs em execução sem progresso há mais de
+    GERACAO_JOBS_TIMEOUT_MINUTOS (worker encerrado no meio da geração).
+    """
+    limite = datetime.now(timezone.utc) - timedelta(minutes=settings.GERACAO_JOBS_TIMEOUT_MINUTOS)
+    total = db.query(JobGeracao).filter(
+        JobGeracao.status == StatusJobGeracao.EXECUTANDO.value,
+        JobGeracao.atualizado_em < limite
+    ).update(
+        {
+            JobGeracao.status: StatusJobGeracao.ERRO.value,
+            JobGeracao.erro: "Job interrompido antes da conclusão",
+            JobGeracao.concluido_em: datetime.now(timezone.utc),
+        },
+        synchronize_session=False
+    )
+    db.commit()
+    if total:
+        logger.warning(f"{total} job(s) de geração interrompido(s) marcados como erro")
+    return total
+
+
+def executar_worker(parar: threading.Event, intervalo: Optional[float] = None) -> None:
+    """Loop do worker: processa a fila e aguarda novos jobs até `parar` ser sinalizado"""
+    intervalo = intervalo or settings.GERACAO_JOBS_INTERVALO_SEGUNDOS
+
+    db = SessionLocal()
+    try:
+        recuperar_jobs_interrompidos(db)
+    finally:
+        db.close()
+
+    while not parar.is_set():
+        try:
+            processar_jobs_pendentes()
+        except Exception as e:
+            logger.error(f"Erro no worker de geração: {str(e)}", exc_info=True)
+        _novo_job.wait(intervalo)
+        _novo_job.clear()
+
+
+def iniciar_worker_interno() -> None:
+    """Inicia o worker como thread daemon dentro do processo da API"""
+    global _thread_worker
+    if _thread_worker and _thread_worker.is_alive():
+        return
+    _parar_worker.clear()
+    _thread_worker = threading.Thread(
+        target=executar_worker,
+        args=(_parar_worker,),
+        name="worker-geracao",
+        daemon=True,
+    )
+    _thread_worker.start()
+    logger.info("Worker interno de geração de escalas iniciado")
+
+
+def parar_worker_interno() -> None:
+    """Sinaliza o worker interno para encerrar após o job atual"""
+    _parar_worker.set()
+    _novo_job.set()
@@ -0,0 +1,296 @@
+"""
+Service: Otimização de Escalas
+Busca local com orçamento de tempo sobre as atribuições de uma geração,
+executada somente em memória antes da gravação.
+
+Objetivo (menor é melhor):
+    PESO_LACUNA * horários sem pregador
+    + PESO_REPETICAO * repetições do pregador na mesma igreja em semanas consecutivas
+    + PESO_VARIANCIA * variância da carga mensal entre os pregadores do distrito
+
+Movimentos:
+    preencher  uma lacuna recebe um pregador viável; se o único impedimento for o
+               limite mensal, outra pregação dele passa antes para um pregador com folga
+    mover      uma atribuição passa para outro pregador viável na mesma data
+    trocar     duas atribuições trocam de pregador
+
+As regras rígidas da geração são mantidas em todos os movimentos:
+indisponibilidade, uma pregação por dia e limite mensal (o preenchimento de
+lacunas pode usar o mesmo extra do preenchimento forçado). Só são aceitos
+movimentos que não pioram o objetivo, então a solução corrente é sempre a
+melhor encontrada e pode ser devolvida quando o orçamento acaba.
+"""
+
+import random
+from datetime import date, timedelta
+from time import perf_counter
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from app.services.escala_service import ContextoGeracao
+
+
+PESO_LACUNA = 1000.0
+PESO_REPETICAO = 10.0
+PESO_VARIANCIA = 1.0
+
+# Frequência relativa de cada movimento (o preenchimento só é sorteado se houver lacunas)
+MOVIMENTOS = (("preencher", 2), ("mover", 3), ("trocar", 3))
+# Verificar o relógio a cada N iterações
+ITERACOES_POR_VERIFICACAO = 64
+
+_SEMANA = timedelta(days=7)
+
+
+class EstadoBusca:
+    """
+    Solução corrente da busca local com o objetivo mantido incrementalmente.
+    Toda alteração passa por `_retirar`/`_colocar`, que atualizam a fotografia
+    de disponibilidade, as repetições consecutivas e a soma (e soma dos
+    quadrados) das cargas em O(1).
+    """
+
+    def __init__(self, contexto: "ContextoGeracao", atribuicoes: List[Dict]):
+        from app.services.escala_service import chaves_de_atribuicoes, detectar_lacunas
+
+        self.contexto = contexto
+        self.snapshot = contexto.snapshot.copiar()
+        self.atribuicoes = [dict(a) for a in atribuicoes]
+        self.lacunas = detectar_lacunas(contexto.slots(), chaves_de_atribuicoes(atribuicoes))
+        self.uids = [str(u.id) for u, _ in contexto.pregadores_list]
+        self.limites = {uid: contexto.limite_por_usuario.get(uid, 4) for uid in self.uids}
+        self.extra = contexto.limite_forcado_extra_max
+        self.geradas = set()
+        self.repeticoes = 0
+
+        cargas = [self.snapshot.total_mes(uid) for uid in self.uids]
+        self.soma_cargas = sum(cargas)
+        self.soma_quadrados = sum(c * c for c in cargas)
+        for a in self.atribuicoes:
+            self._colocar(a["pregador_id"], a["igreja_id"], a["data_pregacao"])
+
+    # Objetivo
+
+    def variancia(self) -> float:
+        total = len(self.uids) or 1
+        media = self.soma_cargas / total
+        return self.soma_quadrados / total - media * media
+
+    def objetivo(self) -> float:
+        return (
+            PESO_LACUNA * len(self.lacunas)
+            + PESO_REPETICAO * self.repeticoes
+            + PESO_VARIANCIA * self.variancia()
+        )
+
+    def componentes(self) -> Dict:
+        return {
+            "valor": round(self.objetivo(), 4),
+            "lacunas": len(self.lacunas),
+            "repeticoes_consecutivas": self.repeticoes,
+            "variancia_carga": round(self.variancia(), 4),
+        }
+
+    # Alterações elementares
+
+    def _ligacoes(self, uid: str, igreja_id: str, data: date) -> int:
+        """
+        Repetições consecutivas que a pregação (uid, igreja, data) forma: com a
+        semana anterior (banco ou geração) e com a semana seguinte gerada.
+        Mesma contagem de `contar_repeticoes_consecutivas`.
+        """
+        return int((uid, igreja_id, data - _SEMANA) in self.snapshot.pregacoes_por_igreja) + int(
+            (uid, igreja_id, data + _SEMANA) in self.geradas
+        )
+
+    def _colocar(self, uid: str, igreja_id: str, data: date) -> None:
+        carga = self.snapshot.total_mes(uid)
+        self.repeticoes += self._ligacoes(uid, igreja_id, data)
+        self.snapshot.registrar(uid, igreja_id, data)
+        self.geradas.add((uid, igreja_id, data))
+        self.soma_cargas += 1
+        self.soma_quadrados += 2 * carga + 1
+
+    def _retirar(self, uid: str, igreja_id: str, data: date) -> None:
+        self.snapshot.remover(uid, igreja_id, data)
+        self.geradas.discard((uid, igreja_id, data))
+        self.repeticoes -= self._ligacoes(uid, igreja_id, data)
+        carga = self.snapshot.total_mes(uid)
+        self.soma_cargas -= 1
+        self.soma_quadrados -= 2 * carga + 1
+
+    def trocar_pregador(self, atribuicao: Dict, uid: str) -> None:
+        """Substitui o pregador de uma atribuição"""
+        self._retirar(atribuicao["pregador_id"], atribuicao["igreja_id"], atribuicao["data_pregacao"])
+        atribuicao["pregador_id"] = uid
+        self._colocar(uid, atribuicao["igreja_id"], atribuicao["data_pregacao"])
+
+    def pode_receber(self, uid: str, data: date, limite: int) -> bool:
+        return (
+            not self.snapshot.tem_conflito_no_dia(uid, data)
+            and not self.snapshot.esta_indisponivel(uid, data)
+            and self.snapshot.total_mes(uid) < limite
+        )
+
+
+def otimizar_atribuicoes(
+    contexto: "ContextoGeracao",
+    atribuicoes: List[Dict],
+    orcamento_segundos: float,
+    semente: int = 0,
+) -> Tuple[List[Dict], Dict]:
+    """
+    Melhora as atribuições de uma geração por busca local até o orçamento de tempo acabar.
+    Não altera `atribuicoes` nem a fotografia do contexto.
+
+    Retorna: (atribuicoes otimizadas, resumo com objetivo antes/depois)
+    """
+    from app.services.escala_service import _nova_atribuicao
+
+    inicio = perf_counter()
+    prazo = inicio + max(0.0, orcamento_segundos)
+    rng = random.Random(semente)
+    estado = EstadoBusca(contexto, atribuicoes)
+    antes = estado.componentes()
+
+    movimentos = {
+        "preencher": lambda: _preencher(estado, rng, _nova_atribuicao),
+        "mover": lambda: _mover(estado, rng),
+        "trocar": lambda: _trocar(estado, rng),
+    }
+    aceitos = {nome: 0 for nome in movimentos}
+    iteracoes = 0
+
+    if estado.atribuicoes or estado.lacunas:
+        while True:
+            if iteracoes % ITERACOES_POR_VERIFICACAO == 0 and perf_counter() >= prazo:
+                break
+            iteracoes += 1
+            opcoes = [(nome, peso) for nome, peso in MOVIMENTOS if nome != "preencher" or estado.lacunas]
+            nome = rng.choices([n for n, _ in opcoes], weights=[p for _, p in opcoes])[0]
+            if movimentos[nome]():
+                aceitos[nome] += 1
+
+    # Manter a ordem de prioridade dos horários
+    ordem = {(str(ig.id), d, h["horario"]): i for i, (_, d, ig, h) in enumerate(contexto.slots())}
+    resultado = sorted(
+        estado.atribuicoes,
+        key=lambda a: ordem.get((a["igreja_id"], a["data_pregacao"], a["horario_pregacao"]), len(ordem)),
+    )
+
+    return resultado, {
+        "orcamento_segundos": orcamento_segundos,
+        "tempo_ms": round((perf_counter() - inicio) * 1000, 1),
+        "iteracoes": iteracoes,
+        "movimentos_aceitos": aceitos,
+        "objetivo_antes": antes,
+        "objetivo_depois": estado.componentes(),
+    }
+
+
+def _aceitar(estado: EstadoBusca, objetivo_anterior: float) -> bool:
+    # Tolerância para ruído de ponto flutuante na variância incremental
+    return estado.objetivo() <= objetivo_anterior + 1e-9
+
+
+def _preencher(estado: EstadoBusca, rng: random.Random, nova_atribuicao) -> bool:
+    """Coloca um pregador em uma lacuna, liberando capacidade dele se necessário"""
+    indice_lacuna = rng.randrange(len(estado.lacunas))
+    dia_semana, data, igreja, horario = estado.lacunas[indice_lacuna]
+    igreja_id = str(igreja.id)
+    snapshot = estado.snapshot
+
+    candidatos = [
+        uid for uid in estado.uids
+        if not snapshot.tem_conflito_no_dia(uid, data) and not snapshot.esta_indisponivel(uid, data)
+    ]
+    if not candidatos:
+        return False
+    uid = rng.choice(candidatos)
+    objetivo_anterior = estado.objetivo()
+
+    # Sem folga nem com o extra: repassar outra pregação dele a quem tem folga
+    repassada: Optional[Tuple[Dict, str]] = None
+    if snapshot.total_mes(uid) >= estado.limites[uid] + estado.extra:
+        proprias = [a for a in estado.atribuicoes if a["pregador_id"] == uid and a["data_pregacao"] != data]
+        if not proprias:
+            return False
+        outra = rng.choice(proprias)
+        substitutos = [
+            q for q in estado.uids
+            if q != uid and estado.pode_receber(q, outra["data_pregacao"], estado.limites[q])
+        ]
+        if not substitutos:
+            return False
+        estado.trocar_pregador(outra, rng.choice(substitutos))
+        repassada = (outra, uid)
+
+    atribuicao = nova_atribuicao(igreja_id, uid, dia_semana, data, horario)
+    estado.lacunas[indice_lacuna] = estado.lacunas[-1]
+    estado.lacunas.pop()
+    estado.atribuicoes.append(atribuicao)
+    estado._colocar(uid, igreja_id, data)
+
+    if _aceitar(estado, objetivo_anterior):
+        return True
+
+    # Desfazer
+    estado._retirar(uid, igreja_id, data)
+    estado.atribuicoes.pop()
+    estado.lacunas.append((dia_semana, data, igreja, horario))
+    if repassada:
+        estado.trocar_pregador(*repassada)
+    return False
+
+
+def _mover(estado: EstadoBusca, rng: random.Random) -> bool:
+    """Passa uma atribuição para outro pregador viável na mesma data"""
+    if not estado.atribuicoes:
+        return False
+    atribuicao = rng.choice(estado.atribuicoes)
+    data = atribuicao["data_pregacao"]
+    uid = rng.choice(estado.uids)
+    if uid == atribuicao["pregador_id"] or not estado.pode_receber(uid, data, estado.limites[uid]):
+        return False
+
+    objetivo_anterior = estado.objetivo()
+    anterior = atribuicao["pregador_id"]
+    estado.trocar_pregador(atribuicao, uid)
+    if _aceitar(estado, objetivo_anterior):
+        return True
+    estado.trocar_pregador(atribuicao, anterior)
+    return False
+
+
+def _trocar(estado: EstadoBusca, rng: random.Random) -> bool:
+    """Troca os pregadores de duas atribuições (a carga de cada um não muda)"""
+    if len(estado.atribuicoes) < 2:
+        return False
+    a, b = rng.sample(estado.atribuicoes, 2)
+    uid_a, uid_b = a["pregador_id"], b["pregador_id"]
+    if uid_a == uid_b:
+        return False
+
+    snapshot = estado.snapshot
+    if a["data_pregacao"] != b["data_pregacao"]:
+        # Cada um precisa estar livre e disponível na data do outro
+        for uid, data in ((uid_a, b["data_pregacao"]), (uid_b, a["data_pregacao"])):
+            if snapshot.tem_conflito_no_dia(uid, data) or snapshot.esta_indisponivel(uid, data):
+                return False
+
+    objetivo_anterior = estado.objetivo()
+    # Retirar os dois antes de colocar, para a ocupação do dia não colidir
+    estado._retirar(uid_a, a["igreja_id"], a["data_pregacao"])
+    estado._retirar(uid_b, b["igreja_id"], b["data_pregacao"])
+    a["pregador_id"], b["pregador_id"] = uid_b, uid_a
+    estado._colocar(uid_b, a["igreja_id"], a["data_pregacao"])
+    estado._colocar(uid_a, b["igreja_id"], b["data_pregacao"])
+    if _aceitar(estado, objetivo_anterior):
+        return True
+
+    estado._retirar(uid_b, a["igreja_id"], a["data_pregacao"])
+    estado._retirar(uid_a, b["igreja_id"], b["data_pregacao"])
+    a["pregador_id"], b["pregador_id"] = uid_a, uid_b
+    estado._colocar(uid_a, a["igreja_id"], a["data_pregacao"])
+    estado._colocar(uid_b, b["igreja_id"], b["data_pregacao"])
+    return False
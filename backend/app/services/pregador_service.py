@@ -4,25 +4,35 @@ Lógica de negócio para pregadores
 """
 
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, text
 from decimal import Decimal
-from app.models import PerfilPregador, Avaliacao, Pregacao
+from time import perf_counter
+from typing import Dict, List, Optional
+from app.models import PerfilPregador, Avaliacao
+from app.services.historico_score_service import registrar_ponto_pregador, registrar_pontos_score
+from app.services.substituicao_service import invalidar_ranking, invalidar_ranking_do_pregador
+
+# Critérios opcionais da avaliação com soma/quantidade agregadas no perfil
+CRITERIOS_AVALIACAO = ("qualidade_conteudo", "apresentacao", "fundamentacao_biblica", "engajamento")
 
 
 def recalcular_score(db: Session, pregador_id: str) -> Decimal:
     """
     Recalcula o score de um pregador baseado na fórmula:
     SCORE = (Média_Avaliações × 0.6) + (Taxa_Frequência × 0.25) + (Taxa_Pontualidade × 0.15)
+    
+    A média das avaliações vem dos agregados do perfil (soma / total), sem
+    consultar o histórico de avaliações.
     """
-    # Buscar perfil
-    perfil = db.query(PerfilPregador).filter(PerfilPregador.usuario_id == pregador_id).first()
+    # Buscar perfil (recarregado: os agregados podem ter sido alterados por UPDATE direto)
+    perfil = db.query(PerfilPregador).filter(
+        PerfilPregador.usuario_id == pregador_id
+    ).populate_existing().first()
     if not perfil:
         return Decimal("0.00")
     
-    # Buscar média de avaliações
-    media_avaliacoes = db.query(func.avg(Avaliacao.nota)).filter(
-        Avaliacao.pregador_id == pregador_id
-    ).scalar() or Decimal("0.00")
+    # Média de avaliações a partir dos agregados
+    media_avaliacoes = media_agregada(perfil.avaliacoes_soma_notas, perfil.avaliacoes_total)
     
     # Taxa de frequência (0-100 convertido para 0-5)
     taxa_freq_normalizada = (perfil.taxa_frequencia / 100) * 5
@@ -43,9 +53,16 @@ def recalcular_score(db: Session, pregador_id: str) -> Decimal:
     perfil.score_frequencia = round(Decimal(str(taxa_freq_normalizada)), 2)
     perfil.score_pontualidade = round(Decimal(str(taxa_pont_normalizada)), 2)
     
+    # Ponto do dia na série histórica (sobrescrito pelos recálculos seguintes)
+    db.flush()
+    registrar_ponto_pregador(db, pregador_id)
+    
     db.commit()
     db.refresh(perfil)
     
+    # O ranking de substitutos em cache ordena por score
+    invalidar_ranking_do_pregador(db, pregador_id)
+    
     return perfil.score_medio
 
 
@@ -66,39 +83,211 @@ def aplicar_penalizacao_recusa(db: Session, pregador_id: str) -> None:
 
 
 def atualizar_estatisticas(db: Session, pregador_id: str) -> None:
-    """Atualiza estatísticas do pregador (totais, taxas)"""
-    perfil = db.query(PerfilPregador).filter(PerfilPregador.usuario_id == pregador_id).first()
-    if not perfil:
-        return
-    
-    # Contar pregações
-    total = db.query(func.count(Pregacao.id)).filter(Pregacao.pregador_id == pregador_id).scalar() or 0
-    realizadas = db.query(func.count(Pregacao.id)).filter(
-        Pregacao.pregador_id == pregador_id,
-        Pregacao.status == "realizado"
-    ).scalar() or 0
-    faltou = db.query(func.count(Pregacao.id)).filter(
-        Pregacao.pregador_id == pregador_id,
-        Pregacao.status == "faltou"
-    ).scalar() or 0
-    recusadas = db.query(func.count(Pregacao.id)).filter(
-        Pregacao.pregador_id == pregador_id,
-        Pregacao.status == "recusado"
-    ).scalar() or 0
-    
-    # Atualizar totais
-    perfil.total_pregacoes = total
-    perfil.pregacoes_realizadas = realizadas
-    perfil.pregacoes_faltou = faltou
-    perfil.pregacoes_recusadas = recusadas
-    
-    # Calcular taxa de frequência
-    if total > 0:
-        perfil.taxa_frequencia = round(Decimal((realizadas / total) * 100), 2)
+    """Atualiza estatísticas do pregador (totais, taxas) e o score"""
+    recalcular_estatisticas_em_lote(db, pregador_id=pregador_id)
+
+
+# Estatísticas e score de vários perfis em um único comando: contagens
+# condicionais agrupadas por pregador + UPDATE ... FROM. Mesma fórmula de
+# recalcular_score, com a média das avaliações vinda dos agregados do perfil.
+SQL_RECALCULAR_ESTATISTICAS = """
+    WITH alvo AS (
+        SELECT
+            p.id,
+            p.usuario_id,
+            CASE WHEN p.avaliacoes_total > 0
+                THEN p.avaliacoes_soma_notas / p.avaliacoes_total ELSE 0 END AS media_avaliacoes,
+            COALESCE(p.taxa_pontualidade, 100) / 100 * 5 AS pontualidade
+        FROM perfis_pregadores p
+        JOIN usuarios u ON u.id = p.usuario_id
+        WHERE {escopo}
+    ),
+    contagens AS (
+        SELECT
+            a.id,
+            a.media_avaliacoes,
+            a.pontualidade,
+            COUNT(pr.id) AS total,
+            COUNT(pr.id) FILTER (WHERE pr.status = 'realizado') AS realizadas,
+            COUNT(pr.id) FILTER (WHERE pr.status = 'faltou') AS faltou,
+            COUNT(pr.id) FILTER (WHERE pr.status = 'recusado') AS recusadas
+        FROM alvo a
+        LEFT JOIN pregacoes pr ON pr.pregador_id = a.usuario_id
+        GROUP BY a.id, a.media_avaliacoes, a.pontualidade
+    ),
+    taxas AS (
+        SELECT
+            c.*,
+            CASE WHEN c.total > 0 THEN ROUND(c.realizadas * 100.0 / c.total, 2) ELSE 100.00 END AS taxa_frequencia
+        FROM contagens c
+    )
+    UPDATE perfis_pregadores p SET
+        total_pregacoes = t.total,
+        pregacoes_realizadas = t.realizadas,
+        pregacoes_faltou = t.faltou,
+        pregacoes_recusadas = t.recusadas,
+        taxa_frequencia = t.taxa_frequencia,
+        score_avaliacoes = ROUND(t.media_avaliacoes, 2),
+        score_frequencia = ROUND(t.taxa_frequencia / 100 * 5, 2),
+        score_pontualidade = ROUND(t.pontualidade, 2),
+        score_medio = ROUND(
+            t.media_avaliacoes * 0.6 + t.taxa_frequencia / 100 * 5 * 0.25 + t.pontualidade * 0.15,
+            2
+        ),
+        atualizado_em = now()
+    FROM taxas t
+    WHERE p.id = t.id
+"""
+
+
+def recalcular_estatisticas_em_lote(
+    db: Session,
+    distrito_id: Optional[str] = None,
+    associacao_id: Optional[str] = None,
+    pregador_id: Optional[str] = None
+) -> Dict:
+    """
+    Recalcula totais de pregações, taxa de frequência e score de todos os
+    pregadores de um distrito (vinculados ao distrito ou a uma de suas igrejas),
+    de uma associação ou de um único pregador, com um só comando e um commit
+    (junto com o ponto do dia no histórico de score).
+
+    Retorna: {"perfis_atualizados": int, "tempo_ms": float}
+    """
+    if distrito_id:
+        escopo = "(u.distrito_id = :distrito_id OR u.igreja_id IN (SELECT id FROM igrejas WHERE distrito_id = :distrito_id))"
+        parametros = {"distrito_id": str(distrito_id)}
+    elif associacao_id:
+        escopo = "u.associacao_id = :associacao_id"
+        parametros = {"associacao_id": str(associacao_id)}
+    elif pregador_id:
+        escopo = "p.usuario_id = :pregador_id"
+        parametros = {"pregador_id": str(pregador_id)}
     else:
-        perfil.taxa_frequencia = Decimal("100.00")
-    
+        raise ValueError("Informe o distrito, a associação ou o pregador")
+
+    inicio = perf_counter()
+    resultado = db.execute(text(SQL_RECALCULAR_ESTATISTICAS.format(escopo=escopo)), parametros)
+    registrar_pontos_score(db, escopo, parametros)
     db.commit()
+
+    # O ranking de substitutos em cache ordena por score
+    if distrito_id:
+        invalidar_ranking(distrito_id)
+    elif associacao_id:
+        invalidar_ranking()
+    else:
+        invalidar_ranking_do_pregador(db, pregador_id)
+
+    return {
+        "perfis_atualizados": resultado.rowcount,
+        "tempo_ms": round((perf_counter() - inicio) * 1000, 1),
+    }
+
+
+def media_agregada(soma, total) -> Decimal:
+    """Média a partir de um par soma/quantidade agregado (0 sem avaliações)"""
+    if not total:
+        return Decimal("0.00")
+    return Decimal(str(soma or 0)) / Decimal(total)
+
+
+def atualizar_agregados_avaliacao(db: Session, avaliacao: Avaliacao, sinal: int = 1) -> None:
+    """
+    Soma (sinal=1) ou subtrai (sinal=-1) uma avaliação dos agregados do perfil
+    do pregador, com um único UPDATE atômico: o custo não depende do histórico
+    e avaliações simultâneas do mesmo pregador não se sobrescrevem.
+    Não faz commit (faz parte da transação que grava ou exclui a avaliação).
+    """
+    valores = {
+        PerfilPregador.avaliacoes_total: PerfilPregador.avaliacoes_total + sinal,
+        PerfilPregador.avaliacoes_soma_notas: PerfilPregador.avaliacoes_soma_notas + sinal * Decimal(str(avaliacao.nota)),
+    }
+    for criterio in CRITERIOS_AVALIACAO:
+        nota_criterio = getattr(avaliacao, criterio)
+        if nota_criterio is None:
+            continue
+        coluna_soma = getattr(PerfilPregador, f"soma_{criterio}")
+        coluna_total = getattr(PerfilPregador, f"total_{criterio}")
+        valores[coluna_soma] = coluna_soma + sinal * Decimal(str(nota_criterio))
+        valores[coluna_total] = coluna_total + sinal
+
+    db.query(PerfilPregador).filter(
+        PerfilPregador.usuario_id == avaliacao.pregador_id
+    ).update(valores, synchronize_session=False)
+
+
+def descontar_avaliacoes_pregacao(db: Session, pregacao) -> List[str]:
+    """
+    Subtrai dos agregados as avaliações de uma pregação que será excluída
+    (saem em cascata com ela). Chamar antes de `db.delete(pregacao)`; não faz
+    commit. Retorna os pregadores afetados, para `agendar_scores` após o commit.
+    """
+    pregadores = set()
+    for avaliacao in pregacao.avaliacoes:
+        atualizar_agregados_avaliacao(db, avaliacao, sinal=-1)
+        pregadores.add(str(avaliacao.pregador_id))
+    return sorted(pregadores)
+
+
+def agendar_scores(db: Session, pregador_ids: List[str]) -> None:
+    """Agenda o recálculo do score na fila (recalcula na hora se o worker não estiver ativo)"""
+    from app.services.fila_score_service import agendar_recalculo_score
+
+    for pregador_id in pregador_ids:
+        if not agendar_recalculo_score(pregador_id):
+            recalcular_score(db, pregador_id)
+
+
+def verificar_agregados_avaliacoes(
+    db: Session,
+    corrigir: bool = False,
+    pregador_id: Optional[str] = None
+) -> List[Dict]:
+    """
+    Confere os agregados dos perfis contra a tabela de avaliações (uma consulta
+    agrupada) e retorna as divergências. Com `corrigir`, grava os valores
+    recalculados e atualiza o score dos perfis corrigidos.
     
-    # Recalcular score
-    recalcular_score(db, pregador_id)
+    Envio e exclusão de pregações pelo sistema mantêm os agregados (ver
+    `descontar_avaliacoes_pregacao`); divergências aparecem por exclusões fora
+    desses caminhos (ex.: cascata no banco ao excluir um usuário) ou por edição
+    manual, e são corrigidas aqui.
+    """
+    colunas = [
+        func.count(Avaliacao.id).label("avaliacoes_total"),
+        func.coalesce(func.sum(Avaliacao.nota), 0).label("avaliacoes_soma_notas"),
+    ]
+    for criterio in CRITERIOS_AVALIACAO:
+        coluna = getattr(Avaliacao, criterio)
+        colunas.append(func.coalesce(func.sum(coluna), 0).label(f"soma_{criterio}"))
+        colunas.append(func.count(coluna).label(f"total_{criterio}"))
+    campos = [c.name for c in colunas]
+
+    consulta = db.query(Avaliacao.pregador_id, *colunas).group_by(Avaliacao.pregador_id)
+    perfis = db.query(PerfilPregador)
+    if pregador_id:
+        consulta = consulta.filter(Avaliacao.pregador_id == pregador_id)
+        perfis = perfis.filter(PerfilPregador.usuario_id == pregador_id)
+    reais = {str(linha[0]): dict(zip(campos, linha[1:])) for linha in consulta.all()}
+
+    divergencias = []
+    for perfil in perfis.all():
+        esperado = reais.get(str(perfil.usuario_id), dict.fromkeys(campos, 0))
+        diferencas = {
+            campo: {"perfil": getattr(perfil, campo) or 0, "avaliacoes": valor}
+            for campo, valor in esperado.items()
+            if Decimal(str(getattr(perfil, campo) or 0)) != Decimal(str(valor or 0))
+        }
+        if not diferencas:
+            continue
+        divergencias.append({"pregador_id": str(perfil.usuario_id), "diferencas": diferencas})
+        if corrigir:
+            for campo, valor in esperado.items():
+                setattr(perfil, campo, valor or 0)
+
+    if corrigir and divergencias:
+        db.commit()
+        for divergencia in divergencias:
+            recalcular_score(db, divergencia["pregador_id"])
+    return divergencias
@@ -0,0 +1,160 @@
+"""
+Service: Simulação de pesos
+Compara vários conjuntos de pesos do score (`escala.pesos_score`) executando a
+atribuição sobre uma única fotografia do distrito, sem gravar nada.
+"""
+
+import math
+from time import perf_counter
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.models import Escala, Pregacao
+from app.services.config_service import (
+    get_score_weights,
+    get_estrategia_geracao,
+    ESTRATEGIA_FLUXO,
+)
+from app.services.disponibilidade_service import STATUS_CONTABILIZADOS
+
+# Ordem das colunas da matriz de componentes do score
+COMPONENTES_SCORE = ("avaliacoes", "frequencia", "pontualidade")
+# Fração dos pregadores de maior score usada na métrica de concentração
+FRACAO_TOPO = 0.2
+
+
+def normalizar_pesos(pesos: List[Dict[str, float]]) -> np.ndarray:
+    """Matriz conjuntos × componentes com cada linha somando 1 (como get_score_weights)"""
+    matriz = np.array([[float(p.get(c, 0) or 0) for c in COMPONENTES_SCORE] for p in pesos], dtype=np.float64)
+    if (matriz < 0).any():
+        raise ValueError("Os pesos do score não podem ser negativos")
+    totais = matriz.sum(axis=1, keepdims=True)
+    if (totais == 0).any():
+        raise ValueError("Cada conjunto de pesos precisa ter ao menos um peso positivo")
+    return matriz / totais
+
+
+def simular_pesos(
+    db: Session,
+    distrito_id: str,
+    mes: int,
+    ano: int,
+    pesos: List[Dict[str, float]],
+    estrategia: Optional[str] = None
+) -> Dict:
+    """
+    Executa a atribuição do mês para cada conjunto de pesos e mede o resultado.
+
+    Tudo é carregado uma vez (igrejas, pregadores, horários, fotografia de
+    disponibilidade e a matriz pregadores × datas). Os scores de todos os
+    conjuntos saem de um único produto de matrizes; cada execução só reordena o
+    ranking e as linhas da matriz e trabalha sobre uma cópia da fotografia.
+
+    Se o período já tiver escala, as pregações dela são desconsideradas, para
+    simular a geração a partir do zero.
+
+    Retorna métricas por conjunto: cobertura, distribuição de carga,
+    concentração nos pregadores de maior score e repetições consecutivas.
+    """
+    from app.services.escala_service import (
+        atribuir_guloso,
+        carregar_contexto_geracao,
+        contar_repeticoes_consecutivas,
+    )
+    from app.services.fluxo_service import atribuir_fluxo_custo_minimo
+
+    inicio_total = perf_counter()
+    matriz_pesos = normalizar_pesos(pesos)
+    estrategia = estrategia or get_estrategia_geracao(db, distrito_id)
+
+    try:
+        base = carregar_contexto_geracao(db, distrito_id, mes, ano, somente_leitura=True)
+        _desconsiderar_escala_existente(db, base.snapshot, distrito_id, mes, ano)
+        pesos_atuais = get_score_weights(db, distrito_id)
+    finally:
+        # A simulação nunca deixa alterações pendentes na sessão
+        db.rollback()
+
+    uids = [str(u.id) for u, _ in base.pregadores_list]
+    componentes = np.array([
+        [_componente(perfil, c) for c in COMPONENTES_SCORE]
+        for _, perfil in base.pregadores_list
+    ], dtype=np.float64)
+    # conjuntos × pregadores
+    scores = matriz_pesos @ componentes.T
+
+    slots = base.slots()
+    total_slots = len(slots)
+    matriz_base = base.matriz()
+    tamanho_topo = max(1, math.ceil(FRACAO_TOPO * len(uids)))
+
+    resultados = []
+    for k, linha_pesos in enumerate(matriz_pesos):
+        score_por_usuario = dict(zip(uids, scores[k].tolist()))
+        contexto = base.para_mes(mes, ano, base.snapshot, score_por_usuario)
+        ordem = [str(u.id) for u, _ in contexto.pregadores_list]
+
+        inicio = perf_counter()
+        snapshot = base.snapshot.copiar()
+        if estrategia == ESTRATEGIA_FLUXO:
+            atribuicoes = atribuir_fluxo_custo_minimo(contexto, snapshot)
+        else:
+            atribuicoes = atribuir_guloso(contexto, snapshot, matriz=matriz_base.reordenada(ordem))
+        tempo_ms = (perf_counter() - inicio) * 1000
+
+        # Carga por pregador na ordem do ranking deste conjunto
+        posicao = {uid: i for i, uid in enumerate(ordem)}
+        carga = np.bincount(
+            np.array([posicao[a["pregador_id"]] for a in atribuicoes], dtype=np.int64),
+            minlength=len(ordem),
+        )
+        resultados.append({
+            "pesos": dict(zip(COMPONENTES_SCORE, (round(float(p), 4) for p in linha_pesos))),
+            "pregacoes": len(atribuicoes),
+            "horarios_sem_pregador": total_slots - len(atribuicoes),
+            "cobertura_percentual": round(100 * len(atribuicoes) / total_slots, 1) if total_slots else 100.0,
+            "pregadores_escalados": int((carga > 0).sum()),
+            "carga_minima": int(carga.min()) if len(carga) else 0,
+            "carga_maxima": int(carga.max()) if len(carga) else 0,
+            "carga_desvio_padrao": round(float(carga.std()), 2) if len(carga) else 0.0,
+            "concentracao_top_percentual": (
+                round(100 * float(carga[:tamanho_topo].sum()) / len(atribuicoes), 1) if atribuicoes else 0.0
+            ),
+            "repeticoes_consecutivas": contar_repeticoes_consecutivas(base.snapshot, atribuicoes),
+            "tempo_ms": round(tempo_ms, 1),
+        })
+
+    return {
+        "distrito_id": str(distrito_id),
+        "mes_referencia": mes,
+        "ano_referencia": ano,
+        "estrategia": estrategia,
+        "total_horarios": total_slots,
+        "total_pregadores": len(uids),
+        "pesos_atuais": pesos_atuais,
+        "resultados": resultados,
+        "tempo_total_ms": round((perf_counter() - inicio_total) * 1000, 1),
+    }
+
+
+def _componente(perfil, nome: str) -> float:
+    try:
+        return float(getattr(perfil, f"score_{nome}") or 0)
+    except Exception:
+        return 0.0
+
+
+def _desconsiderar_escala_existente(db: Session, snapshot, distrito_id: str, mes: int, ano: int) -> None:
+    """Remove da fotografia as pregações da escala do próprio período, se houver"""
+    pregacoes = db.query(Pregacao.pregador_id, Pregacao.igreja_id, Pregacao.data_pregacao).join(
+        Escala, Pregacao.escala_id == Escala.id
+    ).filter(
+        Escala.distrito_id == distrito_id,
+        Escala.mes_referencia == mes,
+        Escala.ano_referencia == ano,
+        Pregacao.status.in_(STATUS_CONTABILIZADOS)
+    ).all()
+    for pregador_id, igreja_id, data in pregacoes:
+        snapshot.remover(str(pregador_id), str(igreja_id), data)
@@ -0,0 +1,184 @@
+"""
+Service: Substituição
+Sugestão de pregadores substitutos para pregações recusadas
+"""
+
+import threading
+from datetime import date, timedelta
+from time import monotonic
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.models import Escala, Igreja, PerfilPregador, Pregacao, Usuario
+from app.services.disponibilidade_service import SnapshotDisponibilidade
+
+
+# Validade do ranking de candidatos em cache (segundos)
+RANKING_VALIDADE_SEGUNDOS = 300
+# Candidatos devolvidos por pregação
+MAX_CANDIDATOS = 5
+# Limite mensal quando o perfil não define
+LIMITE_MENSAL_PADRAO = 4
+
+# distrito_id -> (expira_em, ranking)
+_ranking_por_distrito: Dict[str, Tuple[float, List[Dict]]] = {}
+_trava_ranking = threading.Lock()
+
+
+def ranking_distrito(db: Session, distrito_id: str) -> List[Dict]:
+    """
+    Pregadores ativos e aprovados do distrito, por score (DESC).
+    O ranking fica em cache por até RANKING_VALIDADE_SEGUNDOS e é descartado
+    quando o score de um pregador do distrito é recalculado (pregador_service);
+    a disponibilidade nunca é cacheada (é consultada a cada sugestão).
+    """
+    chave = str(distrito_id)
+    agora = monotonic()
+    with _trava_ranking:
+        em_cache = _ranking_por_distrito.get(chave)
+        if em_cache and em_cache[0] > agora:
+            return em_cache[1]
+
+    linhas = db.query(
+        Usuario.id, Usuario.nome_completo, PerfilPregador.score_medio, PerfilPregador.max_pregacoes_mes
+    ).join(
+        PerfilPregador, Usuario.id == PerfilPregador.usuario_id
+    ).filter(
+        Usuario.distrito_id == distrito_id,
+        Usuario.ativo == True,
+        Usuario.status_aprovacao == "aprovado",
+        PerfilPregador.ativo == True,
+        text("'pregador' = ANY(perfis)")
+    ).order_by(PerfilPregador.score_medio.desc()).all()
+
+    ranking = [
+        {
+            "pregador_id": str(usuario_id),
+            "pregador_nome": nome,
+            "score": float(score or 0),
+            "limite_mensal": int(limite) if limite else LIMITE_MENSAL_PADRAO,
+        }
+        for usuario_id, nome, score, limite in linhas
+    ]
+    with _trava_ranking:
+        _ranking_por_distrito[chave] = (agora + RANKING_VALIDADE_SEGUNDOS, ranking)
+    return ranking
+
+
+def invalidar_ranking(distrito_id: Optional[str] = None) -> None:
+    """Descarta o ranking em cache de um distrito (ou de todos)"""
+    with _trava_ranking:
+        if distrito_id is None:
+            _ranking_por_distrito.clear()
+        else:
+            _ranking_por_distrito.pop(str(distrito_id), None)
+
+
+def invalidar_ranking_do_pregador(db: Session, pregador_id: str) -> None:
+    """Descarta o ranking em cache do distrito do pregador (score alterado)"""
+    distrito_id = db.query(Usuario.distrito_id).filter(Usuario.id == pregador_id).scalar()
+    if distrito_id:
+        invalidar_ranking(distrito_id)
+
+
+def sugerir_substitutos(
+    db: Session,
+    distrito_id: str,
+    pregacoes: List[Pregacao],
+    max_candidatos: int = MAX_CANDIDATOS
+) -> Dict[str, Dict]:
+    """
+    Candidatos a substituto para cada pregação, na ordem do ranking do distrito.
+
+    A disponibilidade de todos os candidatos é carregada de uma vez para o
+    período das pregações (indisponibilidades, conflitos no dia e contagem
+    mensal), sem consultas por candidato. Além da lista, cada pregação recebe
+    um `sugerido_id` escolhido de forma que nenhum pregador seja sugerido para
+    duas pregações no mesmo dia nem acima do limite mensal.
+
+    Retorna: {pregacao_id: {"candidatos": [...], "sugerido_id": str ou None}}
+    """
+    if not pregacoes:
+        return {}
+
+    ranking = ranking_distrito(db, distrito_id)
+    resultado: Dict[str, Dict] = {}
+    # Quem recusou uma pregação do lote não é sugerido para outra no mesmo dia
+    recusas = {(str(p.pregador_id), p.data_pregacao) for p in pregacoes}
+
+    # A contagem mensal da fotografia vale para o período carregado: um por mês
+    por_mes: Dict[Tuple[int, int], List[Pregacao]] = {}
+    for pregacao in pregacoes:
+        por_mes.setdefault((pregacao.data_pregacao.year, pregacao.data_pregacao.month), []).append(pregacao)
+
+    for (ano, mes), do_mes in sorted(por_mes.items()):
+        primeiro_dia = date(ano, mes, 1)
+        ultimo_dia = (date(ano + 1, 1, 1) if mes == 12 else date(ano, mes + 1, 1)) - timedelta(days=1)
+        snapshot = SnapshotDisponibilidade.carregar(
+            db, [c["pregador_id"] for c in ranking], primeiro_dia, ultimo_dia
+        )
+        # Cópia onde as sugestões do lote são registradas (evita sugerir o mesmo pregador duas vezes no dia)
+        reservas = snapshot.copiar()
+
+        for pregacao in sorted(do_mes, key=lambda p: (p.data_pregacao, p.horario_pregacao)):
+            candidatos = []
+            sugerido_id = None
+            for candidato in ranking:
+                uid = candidato["pregador_id"]
+                if (uid, pregacao.data_pregacao) in recusas or not _disponivel(snapshot, candidato, pregacao.data_pregacao):
+                    continue
+                if sugerido_id is None and _disponivel(reservas, candidato, pregacao.data_pregacao):
+                    sugerido_id = uid
+                    reservas.registrar(uid, str(pregacao.igreja_id), pregacao.data_pregacao)
+                if len(candidatos) < max_candidatos:
+                    candidatos.append({**candidato, "pregacoes_mes": snapshot.total_mes(uid)})
+                if len(candidatos) >= max_candidatos and sugerido_id is not None:
+                    break
+
+            resultado[str(pregacao.id)] = {"candidatos": candidatos, "sugerido_id": sugerido_id}
+
+    return resultado
+
+
+def _disponivel(snapshot: SnapshotDisponibilidade, candidato: Dict, data: date) -> bool:
+    uid = candidato["pregador_id"]
+    return (
+        not snapshot.esta_indisponivel(uid, data)
+        and not snapshot.tem_conflito_no_dia(uid, data)
+        and snapshot.total_mes(uid) < candidato["limite_mensal"]
+    )
+
+
+def substitutos_da_escala(db: Session, escala: Escala) -> List[Dict]:
+    """Candidatos a substituto para todas as pregações recusadas de uma escala"""
+    recusadas = db.query(Pregacao).filter(
+        Pregacao.escala_id == escala.id,
+        Pregacao.status == "recusado"
+    ).order_by(Pregacao.data_pregacao, Pregacao.horario_pregacao).all()
+    if not recusadas:
+        return []
+
+    sugestoes = sugerir_substitutos(db, str(escala.distrito_id), recusadas)
+
+    ids_usuarios = {p.pregador_id for p in recusadas}
+    nomes = dict(db.query(Usuario.id, Usuario.nome_completo).filter(Usuario.id.in_(ids_usuarios)).all())
+    igrejas = dict(db.query(Igreja.id, Igreja.nome).filter(
+        Igreja.id.in_({p.igreja_id for p in recusadas})
+    ).all())
+
+    return [
+        {
+            "pregacao_id": str(p.id),
+            "igreja_id": str(p.igreja_id),
+            "igreja_nome": igrejas.get(p.igreja_id),
+            "data_pregacao": p.data_pregacao,
+            "horario_pregacao": p.horario_pregacao,
+            "pregador_recusou_id": str(p.pregador_id),
+            "pregador_recusou_nome": nomes.get(p.pregador_id),
+            "motivo_recusa": p.motivo_recusa,
+            **sugestoes[str(p.id)],
+        }
+        for p in recusadas
+    ]
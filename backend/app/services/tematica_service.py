@@ -0,0 +1,120 @@
+"""
+Service: Temática
+Expansão das temáticas recorrentes em um calendário (data -> temática)
+"""
+
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.models import Distrito, Tematica
+
+
+# date.weekday() -> nome do dia usado nas temáticas (0 = segunda)
+DIAS_SEMANA = ["segunda", "terca", "quarta", "quinta", "sexta", "sabado", "domingo"]
+
+# Quando mais de uma temática cobre a mesma data, vence a mais específica
+PRIORIDADE_RECORRENCIA = {
+    "data_especifica": 0,
+    "mensal": 1,
+    "semanal": 2,        # dia da semana definido
+    "semana_toda": 3,    # semanal com semana_toda
+}
+
+
+def montar_calendario_tematicas(
+    db: Session,
+    distrito_id: str,
+    primeiro_dia: date,
+    ultimo_dia: date
+) -> Dict[date, str]:
+    """
+    Carrega as temáticas ativas da associação do distrito com uma consulta e
+    expande cada uma nas datas do período.
+
+    Retorna: {data: tematica_id} (datas sem temática ficam fora do mapa)
+    """
+    associacao_id = db.query(Distrito.associacao_id).filter(Distrito.id == distrito_id).scalar()
+    if not associacao_id:
+        return {}
+
+    tematicas = db.query(Tematica).filter(
+        Tematica.associacao_id == associacao_id,
+        Tematica.ativo == True,
+        or_(Tematica.valido_de == None, Tematica.valido_de <= ultimo_dia),
+        or_(Tematica.valido_ate == None, Tematica.valido_ate >= primeiro_dia),
+    ).order_by(Tematica.codigo).all()
+
+    calendario: Dict[date, str] = {}
+    prioridade_por_data: Dict[date, int] = {}
+    for tematica in tematicas:
+        prioridade = _prioridade(tematica)
+        for data in expandir_tematica(tematica, primeiro_dia, ultimo_dia):
+            # Em empate de prioridade, mantém a de menor código (cadastrada primeiro)
+            if prioridade < prioridade_por_data.get(data, len(PRIORIDADE_RECORRENCIA)):
+                calendario[data] = str(tematica.id)
+                prioridade_por_data[data] = prioridade
+
+    return calendario
+
+
+def expandir_tematica(tematica: Tematica, primeiro_dia: date, ultimo_dia: date) -> List[date]:
+    """Datas do período cobertas pela temática, respeitando valido_de/valido_ate"""
+    inicio = max(primeiro_dia, tematica.valido_de) if tematica.valido_de else primeiro_dia
+    fim = min(ultimo_dia, tematica.valido_ate) if tematica.valido_ate else ultimo_dia
+    if inicio > fim:
+        return []
+
+    if tematica.tipo_recorrencia == "data_especifica":
+        data = tematica.data_especifica
+        return [data] if data and inicio <= data <= fim else []
+
+    if tematica.tipo_recorrencia == "semanal":
+        if tematica.semana_toda:
+            return [inicio + timedelta(days=i) for i in range((fim - inicio).days + 1)]
+        dia = _indice_dia(tematica.dia_semana_semanal)
+        if dia is None:
+            return []
+        primeira = inicio + timedelta(days=(dia - inicio.weekday()) % 7)
+        return [primeira + timedelta(days=7 * i) for i in range((fim - primeira).days // 7 + 1)] if primeira <= fim else []
+
+    if tematica.tipo_recorrencia == "mensal":
+        dia = _indice_dia(tematica.dia_semana_mensal)
+        if dia is None or not tematica.numero_semana_mes:
+            return []
+        datas = []
+        ano, mes = inicio.year, inicio.month
+        while date(ano, mes, 1) <= fim:
+            data = _ocorrencia_no_mes(ano, mes, dia, tematica.numero_semana_mes)
+            if data and inicio <= data <= fim:
+                datas.append(data)
+            ano, mes = (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+        return datas
+
+    return []
+
+
+def _prioridade(tematica: Tematica) -> int:
+    if tematica.tipo_recorrencia == "semanal" and tematica.semana_toda:
+        return PRIORIDADE_RECORRENCIA["semana_toda"]
+    return PRIORIDADE_RECORRENCIA.get(tematica.tipo_recorrencia, len(PRIORIDADE_RECORRENCIA))
+
+
+def _indice_dia(nome: Optional[str]) -> Optional[int]:
+    nome = (nome or "").strip().lower()
+    return DIAS_SEMANA.index(nome) if nome in DIAS_SEMANA else None
+
+
+def _ocorrencia_no_mes(ano: int, mes: int, dia_semana: int, numero: int) -> Optional[date]:
+    """N-ésima ocorrência do dia da semana no mês (5 = última ocorrência)"""
+    primeiro = date(ano, mes, 1)
+    data = primeiro + timedelta(days=(dia_semana - primeiro.weekday()) % 7)
+    ocorrencias = []
+    while data.month == mes:
+        ocorrencias.append(data)
+        data += timedelta(days=7)
+    if numero >= 5:
+        return ocorrencias[-1]
+    return ocorrencias[numero - 1] if 1 <= numero <= len(ocorrencias) else None
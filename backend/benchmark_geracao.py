@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Benchmark da geração automática de escalas
+Cria uma associação sintética no PostgreSQL local, executa a geração de cada
+distrito e mede:
+- Tempo total e por fase (carregando, atribuindo, tematicas, gravando)
+- Quantidade de comandos SQL executados
+- Pico de memória (tracemalloc)
+- Instrumentação interna por fase (tempo, comandos SQL e linhas), do relatório
+
+Os resultados são gravados em JSON para comparar execuções.
+
+Uso:
+    python benchmark_geracao.py --distritos 3 --igrejas 12 --pregadores 40
+    python benchmark_geracao.py --indisponibilidade 0.3 --horarios sabado:09:00,sabado:11:00,domingo:19:00
+    python benchmark_geracao.py --saida resultados/antes.json --manter
+
+ATENÇÃO: grava dados no banco configurado em DATABASE_URL. Os dados sintéticos
+são removidos ao final, a menos que --manter seja informado.
+"""
+
+import sys
+import os
+import argparse
+import json
+import platform
+import random
+import tracemalloc
+import uuid
+from datetime import date, datetime, time, timedelta
+from time import perf_counter
+
+# Adicionar o diretório atual ao path para importar os módulos
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import app.main  # noqa: F401  (registra todos os modelos)
+from sqlalchemy import event
+from app.core.database import SessionLocal, engine
+from app.models import (
+    Associacao, Distrito, Igreja, Usuario, PerfilPregador, HorarioCulto,
+    PeriodoIndisponibilidade, PerfilUsuario, StatusAprovacao
+)
+from app.services.escala_service import gerar_escala_automatica, datas_do_mes
+
+PREFIXO_EMAIL = "benchmark-geracao"
+HORARIOS_PADRAO = "sabado:09:00,sabado:11:00,domingo:19:00,quarta:19:30"
+
+
+class ContadorSQL:
+    """Conta os comandos SQL enviados pelo engine enquanto ativo"""
+
+    def __init__(self):
+        self.total = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.total += 1
+
+    def __enter__(self):
+        self.total = 0
+        event.listen(engine, "before_cursor_execute", self)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(engine, "before_cursor_execute", self)
+
+
+def parse_horarios(texto: str):
+    horarios = []
+    for item in texto.split(","):
+        dia, hora = item.strip().split(":", 1)
+        horas, minutos = hora.split(":")
+        horarios.append((dia.strip().lower(), time(int(horas), int(minutos))))
+    return horarios
+
+
+def semear_associacao(session, args, rng: random.Random):
+    """Cria associação, distritos, igrejas, pregadores, horários e indisponibilidades"""
+    execucao = uuid.uuid4().hex[:8]
+    associacao = Associacao(nome=f"Benchmark {execucao}", sigla="BENCH")
+    session.add(associacao)
+    session.flush()
+
+    primeiro_dia, ultimo_dia, _ = datas_do_mes(args.mes, args.ano)
+    dias_mes = (ultimo_dia - primeiro_dia).days + 1
+    horarios = parse_horarios(args.horarios)
+
+    distritos = []
+    for d in range(args.distritos):
+        distrito = Distrito(associacao_id=associacao.id, nome=f"Distrito Benchmark {d + 1:03d}")
+        session.add(distrito)
+        session.flush()
+        distritos.append(distrito)
+
+        for dia, horario in horarios:
+            session.add(HorarioCulto(
+                distrito_id=distrito.id,
+                dia_semana=dia,
+                horario=horario,
+                nome_culto=f"Culto {dia} {horario.strftime('%H:%M')}",
+                requer_pregador=True,
+                ativo=True,
+            ))
+
+        session.add_all([
+            Igreja(distrito_id=distrito.id, nome=f"Igreja {d + 1:03d}-{i + 1:03d}")
+            for i in range(args.igrejas)
+        ])
+
+        usuarios = [
+            Usuario(
+                associacao_id=associacao.id,
+                distrito_id=distrito.id,
+                email=f"{PREFIXO_EMAIL}-{execucao}-{d}-{p}@example.com",
+                senha_hash="benchmark",
+                nome_completo=f"Pregador {d + 1:03d}-{p + 1:04d}",
+                perfis=[PerfilUsuario.PREGADOR],
+                status_aprovacao=StatusAprovacao.APROVADO,
+                ativo=True,
+            )
+            for p in range(args.pregadores)
+        ]
+        session.add_all(usuarios)
+        session.flush()
+
+        for usuario in usuarios:
+            session.add(PerfilPregador(
+                usuario_id=usuario.id,
+                ativo=True,
+                max_pregacoes_mes=args.limite_mensal,
+                score_avaliacoes=round(rng.uniform(2.5, 5.0), 2),
+                score_frequencia=round(rng.uniform(2.5, 5.0), 2),
+                score_pontualidade=round(rng.uniform(2.5, 5.0), 2),
+            ))
+            # Densidade = fração dos pregadores com um período de indisponibilidade no mês
+            if rng.random() < args.indisponibilidade:
+                inicio = primeiro_dia + timedelta(days=rng.randrange(dias_mes))
+                fim = min(ultimo_dia, inicio + timedelta(days=rng.randint(1, 10)))
+                session.add(PeriodoIndisponibilidade(
+                    pregador_id=usuario.id,
+                    data_inicio=inicio,
+                    data_fim=fim,
+                    motivo="benchmark",
+                    ativo=True,
+                ))
+
+    session.commit()
+    return associacao, distritos, execucao
+
+
+def remover_associacao(session, associacao_id, execucao: str):
+    """Remove os dados sintéticos (distritos, escalas e igrejas saem em cascata)"""
+    session.query(Usuario).filter(
+        Usuario.email.like(f"{PREFIXO_EMAIL}-{execucao}-%")
+    ).delete(synchronize_session=False)
+    session.query(Associacao).filter(Associacao.id == associacao_id).delete(synchronize_session=False)
+    session.commit()
+
+
+def medir_distrito(distrito_id, args, criado_por_id):
+    """Gera a escala de um distrito medindo tempo total, fases, SQL e memória"""
+    fases = {}
+    marcas = {"fase": None, "inicio": None}
+
+    def progresso(fase: str, processados: int, total: int) -> None:
+        agora = perf_counter()
+        if fase != marcas["fase"]:
+            if marcas["fase"]:
+                fases[marcas["fase"]] = fases.get(marcas["fase"], 0) + (agora - marcas["inicio"]) * 1000
+            marcas["fase"], marcas["inicio"] = fase, agora
+
+    session = SessionLocal()
+    try:
+        tracemalloc.start()
+        with ContadorSQL() as contador:
+            inicio = perf_counter()
+            escala, relatorio = gerar_escala_automatica(
+                session, str(distrito_id), args.mes, args.ano, criado_por_id, progresso=progresso
+            )
+            fim = perf_counter()
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        if marcas["fase"]:
+            fases[marcas["fase"]] = fases.get(marcas["fase"], 0) + (fim - marcas["inicio"]) * 1000
+
+        resultado = {
+            "distrito_id": str(distrito_id),
+            "escala_id": str(escala.id),
+            "horarios": relatorio["total_pregacoes"] + relatorio["total_horarios_sem_pregador"],
+            "pregacoes": relatorio["total_pregacoes"],
+            "horarios_sem_pregador": relatorio["total_horarios_sem_pregador"],
+            "estrategia": relatorio.get("estrategia"),
+            "tempo_total_ms": round((fim - inicio) * 1000, 1),
+            "fases_ms": {fase: round(ms, 1) for fase, ms in fases.items()},
+            "comandos_sql": contador.total,
+            "pico_memoria_kb": round(pico / 1024, 1),
+            "instrumentacao": relatorio.get("instrumentacao"),
+        }
+
+        if not args.manter:
+            session.delete(escala)
+            session.commit()
+        return resultado
+    finally:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        session.close()
+
+
+def resumir(resultados):
+    tempos = sorted(r["tempo_total_ms"] for r in resultados)
+    if not tempos:
+        return {}
+    return {
+        "execucoes": len(tempos),
+        "tempo_medio_ms": round(sum(tempos) / len(tempos), 1),
+        "tempo_mediana_ms": tempos[len(tempos) // 2],
+        "tempo_max_ms": tempos[-1],
+        "comandos_sql_medio": round(sum(r["comandos_sql"] for r in resultados) / len(resultados), 1),
+        "pico_memoria_max_kb": max(r["pico_memoria_kb"] for r in resultados),
+        "cobertura_percentual": round(
+            100 * sum(r["pregacoes"] for r in resultados) / max(1, sum(r["horarios"] for r in resultados)), 1
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da geração automática de escalas")
+    parser.add_argument("--distritos", type=int, default=3, help="Quantidade de distritos")
+    parser.add_argument("--igrejas", type=int, default=10, help="Igrejas por distrito")
+    parser.add_argument("--pregadores", type=int, default=30, help="Pregadores por distrito")
+    parser.add_argument("--indisponibilidade", type=float, default=0.2, help="Fração de pregadores com indisponibilidade no mês")
+    parser.add_argument("--horarios", default=HORARIOS_PADRAO, help="Horários do distrito: dia:HH:MM,...")
+    parser.add_argument("--limite-mensal", type=int, default=4, help="max_pregacoes_mes dos pregadores")
+    parser.add_argument("--mes", type=int, default=date.today().month)
+    parser.add_argument("--ano", type=int, default=date.today().year)
+    parser.add_argument("--repeticoes", type=int, default=1, help="Gerações por distrito (a escala é removida entre elas)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--saida", default=None, help="Arquivo JSON de resultados")
+    parser.add_argument("--manter", action="store_true", help="Não remover os dados sintéticos ao final")
+    args = parser.parse_args()
+
+    if args.manter and args.repeticoes > 1:
+        parser.error("--manter não pode ser usado com --repeticoes > 1")
+
+    print("=== BENCHMARK DA GERAÇÃO DE ESCALAS ===\n")
+    rng = random.Random(args.seed)
+    session = SessionLocal()
+    try:
+        inicio_semeadura = perf_counter()
+        associacao, distritos, execucao = semear_associacao(session, args, rng)
+        tempo_semeadura = perf_counter() - inicio_semeadura
+        print(f"🏛️  Associação sintética criada em {tempo_semeadura:.1f}s: "
+              f"{args.distritos} distritos × {args.igrejas} igrejas × {args.pregadores} pregadores")
+
+        resultados = []
+        try:
+            for repeticao in range(args.repeticoes):
+                for distrito in distritos:
+                    resultado = medir_distrito(distrito.id, args, None)
+                    resultado["repeticao"] = repeticao + 1
+                    resultados.append(resultado)
+                    print(
+                        f"   {distrito.nome}: {resultado['tempo_total_ms']:.0f} ms, "
+                        f"{resultado['comandos_sql']} SQL, {resultado['pico_memoria_kb']:.0f} KB, "
+                        f"{resultado['pregacoes']}/{resultado['horarios']} horários"
+                    )
+        finally:
+            if not args.manter:
+                remover_associacao(session, associacao.id, execucao)
+                print("\n🧹 Dados sintéticos removidos")
+
+        saida = {
+            "executado_em": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "parametros": vars(args),
+            "resumo": resumir(resultados),
+            "resultados": resultados,
+        }
+
+        print(f"\n📊 Resumo: {json.dumps(saida['resumo'], ensure_ascii=False)}")
+        if args.saida:
+            os.makedirs(os.path.dirname(os.path.abspath(args.saida)), exist_ok=True)
+            with open(args.saida, "w", encoding="utf-8") as arquivo:
+                json.dump(saida, arquivo, ensure_ascii=False, indent=2, default=str)
+            print(f"💾 Resultados gravados em {args.saida}")
+
+    except Exception as e:
+        print(f"❌ Erro no benchmark: {str(e)}")
+        import traceback
+        traceback.print_exc()
+
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Teste de carga do envio de avaliações (POST /avaliacoes/)
+Simula o fim de um culto: centenas de celulares enviando avaliações ao mesmo
+tempo para a API em execução, e mede:
+- Avaliações gravadas por segundo (sustentadas durante o teste)
+- Latência por requisição (mediana, p95, p99, máxima)
+- Respostas por código HTTP (reenvios esperam 400 "já avaliou")
+- Consistência ao final: avaliações gravadas × respostas 201 e agregados dos
+  perfis × tabela de avaliações
+
+Cria no banco de DATABASE_URL uma igreja sintética com pregações no dia de
+hoje e um avaliador por celular; os tokens são emitidos com a SECRET_KEY
+local, então a API testada precisa usar o mesmo banco e a mesma chave.
+
+Uso:
+    python carga_avaliacoes.py --url http://localhost:8000
+    python carga_avaliacoes.py --celulares 500 --pregacoes 4 --reenvios 0.1
+    python carga_avaliacoes.py --saida resultados/carga.json --manter
+
+ATENÇÃO: grava dados no banco configurado em DATABASE_URL. Os dados sintéticos
+são removidos ao final, a menos que --manter seja informado.
+"""
+
+import sys
+import os
+import argparse
+import asyncio
+import json
+import platform
+import random
+import uuid
+from collections import Counter
+from datetime import date, datetime, time
+from time import perf_counter
+
+import httpx
+
+# Adicionar o diretório atual ao path para importar os módulos
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import app.main  # noqa: F401  (registra todos os modelos)
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.security import create_access_token
+from app.models import (
+    Associacao, Distrito, Igreja, Usuario, PerfilPregador, Escala, Pregacao,
+    Avaliacao, PerfilUsuario, StatusAprovacao
+)
+from app.services.pregador_service import verificar_agregados_avaliacoes
+
+PREFIXO_EMAIL = "carga-avaliacoes"
+
+
+def semear_igreja(session, args):
+    """Cria associação, distrito, igreja, pregadores, pregações de hoje e avaliadores"""
+    execucao = uuid.uuid4().hex[:8]
+    hoje = date.today()
+
+    associacao = Associacao(nome=f"Carga {execucao}", sigla="CARGA")
+    session.add(associacao)
+    session.flush()
+    distrito = Distrito(associacao_id=associacao.id, nome=f"Distrito Carga {execucao}")
+    session.add(distrito)
+    session.flush()
+    igreja = Igreja(distrito_id=distrito.id, nome=f"Igreja Carga {execucao}")
+    escala = Escala(distrito_id=distrito.id, mes_referencia=hoje.month, ano_referencia=hoje.year)
+    session.add_all([igreja, escala])
+    session.flush()
+
+    def usuario(papel: str, indice: int, perfil: PerfilUsuario) -> Usuario:
+        return Usuario(
+            associacao_id=associacao.id,
+            distrito_id=distrito.id,
+            igreja_id=igreja.id,
+            email=f"{PREFIXO_EMAIL}-{execucao}-{papel}-{indice}@example.com",
+            senha_hash="carga",
+            nome_completo=f"{papel.capitalize()} {indice + 1:04d}",
+            perfis=[perfil],
+            status_aprovacao=StatusAprovacao.APROVADO,
+            ativo=True,
+        )
+
+    pregadores = [usuario("pregador", i, PerfilUsuario.PREGADOR) for i in range(args.pregacoes)]
+    avaliadores = [usuario("avaliador", i, PerfilUsuario.AVALIADOR) for i in range(args.celulares)]
+    session.add_all(pregadores + avaliadores)
+    session.flush()
+
+    session.add_all([PerfilPregador(usuario_id=p.id, ativo=True) for p in pregadores])
+    # Uma pregação por pregador, em horários distintos do dia de hoje
+    pregacoes = [
+        Pregacao(
+            escala_id=escala.id,
+            igreja_id=igreja.id,
+            pregador_id=p.id,
+            data_pregacao=hoje,
+            horario_pregacao=time(8 + i // 4, (i % 4) * 15),
+            status="realizado",
+        )
+        for i, p in enumerate(pregadores)
+    ]
+    session.add_all(pregacoes)
+    session.commit()
+
+    alvos = [(str(p.id), str(p.pregador_id)) for p in pregacoes]
+    tokens = [create_access_token({"sub": str(a.id)}) for a in avaliadores]
+    return associacao.id, execucao, alvos, tokens
+
+
+def remover_dados(session, associacao_id, execucao: str):
+    """Remove os dados sintéticos (avaliações, pregações e igreja saem em cascata)"""
+    session.query(Usuario).filter(
+        Usuario.email.like(f"{PREFIXO_EMAIL}-{execucao}-%")
+    ).delete(synchronize_session=False)
+    session.query(Associacao).filter(Associacao.id == associacao_id).delete(synchronize_session=False)
+    session.commit()
+
+
+async def celular(cliente, url, token, alvos, args, rng, latencias, respostas):
+    """Um membro avaliando cada pregação (em ordem aleatória), com reenvios ocasionais"""
+    cabecalhos = {"Authorization": f"Bearer {token}"}
+    ordem = list(alvos)
+    rng.shuffle(ordem)
+    for pregacao_id, pregador_id in ordem:
+        corpo = {
+            "pregacao_id": pregacao_id,
+            "pregador_id": pregador_id,
+            "nota": rng.choice([3, 3.5, 4, 4.5, 5]),
+            "qualidade_conteudo": rng.choice([None, 4, 5]),
+            "engajamento": rng.choice([None, 3, 4, 5]),
+        }
+        envios = 2 if rng.random() < args.reenvios else 1
+        for _ in range(envios):
+            inicio = perf_counter()
+            try:
+                resposta = await cliente.post(url, json=corpo, headers=cabecalhos)
+                respostas[str(resposta.status_code)] += 1
+            except httpx.HTTPError as e:
+                respostas[type(e).__name__] += 1
+            latencias.append((perf_counter() - inicio) * 1000)
+
+
+async def disparar(args, alvos, tokens):
+    url = f"{args.url.rstrip('/')}{settings.API_V1_PREFIX}/avaliacoes/"
+    latencias, respostas = [], Counter()
+    limites = httpx.Limits(max_connections=args.celulares, max_keepalive_connections=args.celulares)
+    async with httpx.AsyncClient(limits=limites, timeout=args.timeout) as cliente:
+        inicio = perf_counter()
+        await asyncio.gather(*[
+            celular(cliente, url, token, alvos, args, random.Random(args.seed + i), latencias, respostas)
+            for i, token in enumerate(tokens)
+        ])
+        duracao = perf_counter() - inicio
+    return latencias, respostas, duracao
+
+
+def percentil(valores, fracao: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return round(ordenados[min(len(ordenados) - 1, int(fracao * len(ordenados)))], 1)
+
+
+def conferir(session, alvos, respostas):
+    """Compara o que foi gravado com as respostas e confere os agregados dos perfis"""
+    pregacoes = [pregacao_id for pregacao_id, _ in alvos]
+    gravadas = session.query(Avaliacao).filter(Avaliacao.pregacao_id.in_(pregacoes)).count()
+    divergencias = []
+    for _, pregador_id in alvos:
+        divergencias.extend(verificar_agregados_avaliacoes(session, pregador_id=pregador_id))
+    return {
+        "avaliacoes_gravadas": gravadas,
+        "respostas_201": respostas.get("201", 0),
+        "perfis_com_agregados_divergentes": len(divergencias),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do envio de avaliações")
+    parser.add_argument("--url", default="http://localhost:8000", help="Endereço da API em execução")
+    parser.add_argument("--celulares", type=int, default=300, help="Membros enviando ao mesmo tempo")
+    parser.add_argument("--pregacoes", type=int, default=3, help="Pregações do dia avaliadas por cada membro")
+    parser.add_argument("--reenvios", type=float, default=0.05, help="Fração de avaliações reenviadas (toque duplo, nova tentativa)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Timeout por requisição (segundos)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--saida", default=None, help="Arquivo JSON de resultados")
+    parser.add_argument("--manter", action="store_true", help="Não remover os dados sintéticos ao final")
+    args = parser.parse_args()
+
+    if not 1 <= args.pregacoes <= 48:
+        parser.error("--pregacoes deve estar entre 1 e 48 (horários de 08:00 a 19:45)")
+
+    print("=== TESTE DE CARGA: ENVIO DE AVALIAÇÕES ===\n")
+    session = SessionLocal()
+    try:
+        associacao_id, execucao, alvos, tokens = semear_igreja(session, args)
+        print(f"⛪ Igreja sintética criada: {args.pregacoes} pregações hoje, {args.celulares} avaliadores")
+
+        try:
+            print(f"📱 Enviando {args.celulares * args.pregacoes} avaliações para {args.url} ...")
+            latencias, respostas, duracao = asyncio.run(disparar(args, alvos, tokens))
+            gravadas = respostas.get("201", 0)
+
+            resumo = {
+                "requisicoes": len(latencias),
+                "duracao_s": round(duracao, 2),
+                "avaliacoes_por_segundo": round(gravadas / duracao, 1) if duracao else 0.0,
+                "requisicoes_por_segundo": round(len(latencias) / duracao, 1) if duracao else 0.0,
+                "latencia_mediana_ms": percentil(latencias, 0.5),
+                "latencia_p95_ms": percentil(latencias, 0.95),
+                "latencia_p99_ms": percentil(latencias, 0.99),
+                "latencia_max_ms": round(max(latencias), 1) if latencias else 0.0,
+                "respostas": dict(respostas),
+            }
+            resumo["conferencia"] = conferir(session, alvos, respostas)
+        finally:
+            if not args.manter:
+                remover_dados(session, associacao_id, execucao)
+                print("\n🧹 Dados sintéticos removidos")
+
+        conferencia = resumo["conferencia"]
+        print(f"\n📊 {resumo['avaliacoes_por_segundo']} avaliações/s em {resumo['duracao_s']}s "
+              f"(mediana {resumo['latencia_mediana_ms']} ms, p95 {resumo['latencia_p95_ms']} ms, "
+              f"p99 {resumo['latencia_p99_ms']} ms)")
+        print(f"   Respostas: {json.dumps(resumo['respostas'])}")
+        if (conferencia["avaliacoes_gravadas"] == conferencia["respostas_201"]
+                and not conferencia["perfis_com_agregados_divergentes"]):
+            print(f"✅ {conferencia['avaliacoes_gravadas']} avaliações gravadas, agregados consistentes")
+        else:
+            print(f"⚠️  Inconsistência: {json.dumps(conferencia)}")
+
+        saida = {
+            "executado_em": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "parametros": vars(args),
+            "resumo": resumo,
+        }
+        if args.saida:
+            os.makedirs(os.path.dirname(os.path.abspath(args.saida)), exist_ok=True)
+            with open(args.saida, "w", encoding="utf-8") as arquivo:
+                json.dump(saida, arquivo, ensure_ascii=False, indent=2, default=str)
+            print(f"💾 Resultados gravados em {args.saida}")
+
+    except Exception as e:
+        print(f"❌ Erro no teste de carga: {str(e)}")
+        import traceback
+        traceback.print_exc()
+
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Job noturno do histórico de score dos pregadores
+1. Grava o ponto do dia de todos os pregadores ativos (inclusive os que não
+   tiveram recálculo hoje), para que as séries não tenham buracos
+2. Compacta os pontos diários mais antigos que HISTORICO_SCORE_DIAS_DIARIOS
+   em um ponto mensal por pregador
+
+Uso (ex.: cron diário às 23:50):
+    python manter_historico_scores.py
+    python manter_historico_scores.py --dias-diarios 60
+    python manter_historico_scores.py --somente-compactar
+"""
+
+import sys
+import os
+import argparse
+
+# Adicionar o diretório atual ao path para importar os módulos
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import app.main  # noqa: F401  (registra todos os modelos)
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.services.historico_score_service import (
+    ESCOPO_ATIVOS,
+    registrar_pontos_score,
+    compactar_historico,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manutenção do histórico de score dos pregadores")
+    parser.add_argument(
+        "--dias-diarios", type=int, default=settings.HISTORICO_SCORE_DIAS_DIARIOS,
+        help="Manter pontos diários destes últimos dias (os anteriores viram mensais)"
+    )
+    parser.add_argument("--somente-compactar", action="store_true", help="Não gravar o ponto do dia")
+    args = parser.parse_args()
+
+    print("=== HISTÓRICO DE SCORE DOS PREGADORES ===\n")
+    session = SessionLocal()
+    try:
+        if not args.somente_compactar:
+            pontos = registrar_pontos_score(session, ESCOPO_ATIVOS, {})
+            session.commit()
+            print(f"📈 Ponto do dia gravado para {pontos} pregador(es) ativo(s)")
+
+        resultado = compactar_historico(session, dias_diarios=args.dias_diarios)
+        print(
+            f"🗜️  {resultado['pontos_diarios_compactados']} ponto(s) diário(s) com mais de {args.dias_diarios} dias "
+            f"compactado(s) em {resultado['pontos_mensais']} ponto(s) mensal(is) ({resultado['tempo_ms']:.0f} ms)"
+        )
+        print("\n✅ Histórico atualizado")
+        return 0
+
+    except Exception as e:
+        session.rollback()
+        print(f"❌ Erro na manutenção do histórico: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
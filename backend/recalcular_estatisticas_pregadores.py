@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Script para recalcular estatísticas e scores dos pregadores em lote
+Recalcula totais de pregações (realizadas, faltas, recusas), taxa de
+frequência e score de todos os pregadores de um distrito ou de uma associação
+com um único comando no banco.
+
+Uso:
+    python recalcular_estatisticas_pregadores.py --distrito <distrito_id>
+    python recalcular_estatisticas_pregadores.py --associacao <associacao_id>
+"""
+
+import sys
+import os
+import argparse
+
+# Adicionar o diretório atual ao path para importar os módulos
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import app.main  # noqa: F401  (registra todos os modelos)
+from app.core.database import SessionLocal
+from app.services.pregador_service import recalcular_estatisticas_em_lote
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recálculo em lote de estatísticas e scores dos pregadores")
+    escopo = parser.add_mutually_exclusive_group(required=True)
+    escopo.add_argument("--distrito", help="ID do distrito")
+    escopo.add_argument("--associacao", help="ID da associação")
+    args = parser.parse_args()
+
+    print("=== RECÁLCULO DE ESTATÍSTICAS DOS PREGADORES ===\n")
+    session = SessionLocal()
+    try:
+        resultado = recalcular_estatisticas_em_lote(
+            session, distrito_id=args.distrito, associacao_id=args.associacao
+        )
+        print(f"✅ {resultado['perfis_atualizados']} perfil(is) atualizado(s) em {resultado['tempo_ms']:.0f} ms")
+
+    except Exception as e:
+        session.rollback()
+        print(f"❌ Erro no recálculo: {str(e)}")
+        import traceback
+        traceback.print_exc()
+
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
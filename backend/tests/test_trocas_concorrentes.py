@@ -0,0 +1,63 @@
+"""
+Trocas de escala concorrentes (executar_troca_automatica)
+
+Dispara em paralelo trocas sobrepostas (várias sobre as mesmas pregações)
+contra o PostgreSQL de DATABASE_URL e confere que cada pregação termina com
+exatamente um pregador, sem atribuição perdida ou duplicada e sem pregador
+duas vezes no mesmo dia. Sem DATABASE_URL o módulo é ignorado.
+
+Grava dados sintéticos (ano 2099) no banco e os remove ao final.
+"""
+
+import os
+import random
+import sys
+from argparse import Namespace
+from collections import Counter
+
+import pytest
+
+if not os.environ.get("DATABASE_URL"):
+    pytest.skip("DATABASE_URL não configurada (teste exige PostgreSQL)", allow_module_level=True)
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import SessionLocal  # noqa: E402
+from app.models import Pregacao  # noqa: E402
+from validar_trocas_concorrentes import (  # noqa: E402
+    executar_concorrentes,
+    remover_dados,
+    semear_escala,
+    verificar_estado,
+)
+
+
+@pytest.fixture
+def escala_com_trocas():
+    """Escala sintética com trocas pendentes sobrepostas; removida ao final"""
+    args = Namespace(igrejas=6, pregadores=12, datas=4, trocas=200, mes=1, ano=2099)
+    session = SessionLocal()
+    associacao, escala, trocas_ids, estado_inicial, execucao = semear_escala(session, args, random.Random(42))
+    try:
+        yield session, escala.id, trocas_ids, estado_inicial
+    finally:
+        remover_dados(session, associacao.id, execucao)
+        session.close()
+
+
+def test_trocas_concorrentes_sem_atribuicao_perdida_ou_duplicada(escala_com_trocas):
+    session, escala_id, trocas_ids, estado_inicial = escala_com_trocas
+
+    # Trocas sobrepostas: bem mais trocas do que pregações
+    assert len(trocas_ids) > len(estado_inicial)
+
+    resultados = executar_concorrentes(trocas_ids, threads=16)
+
+    assert any(erro is None for _, erro in resultados), "nenhuma troca foi aplicada"
+    assert verificar_estado(session, escala_id, trocas_ids, estado_inicial, resultados) == []
+
+    finais = session.query(Pregacao).filter(Pregacao.escala_id == escala_id).all()
+    assert sorted(p.id for p in finais) == sorted(estado_inicial)
+    assert all(p.pregador_id is not None for p in finais)
+    por_dia = Counter((p.pregador_id, p.data_pregacao) for p in finais)
+    assert max(por_dia.values()) == 1
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Script para validar trocas de escala concorrentes
+Cria uma escala sintética, dispara muitas trocas em paralelo (várias sobre as
+mesmas pregações) e verifica:
+- Nenhuma atribuição perdida ou duplicada (o conjunto de pregadores da escala não muda)
+- Nenhum pregador com duas pregações no mesmo dia
+- Nenhuma atualização perdida: reaplicar as trocas aceitas, na ordem de
+  conclusão, sobre a escala inicial reproduz exatamente o estado final
+- Trocas com dados desatualizados são recusadas, não aplicadas pela metade
+
+Uso:
+    python validar_trocas_concorrentes.py --trocas 300 --threads 16
+    python validar_trocas_concorrentes.py --pregadores 10 --datas 4 --manter
+
+ATENÇÃO: grava dados no banco configurado em DATABASE_URL. Os dados sintéticos
+são removidos ao final, a menos que --manter seja informado.
+"""
+
+import sys
+import os
+import argparse
+import random
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time, timedelta
+from time import perf_counter
+
+# Adicionar o diretório atual ao path para importar os módulos
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import app.main  # noqa: F401  (registra todos os modelos)
+from app.core.database import SessionLocal
+from app.models import (
+    Associacao, Distrito, Igreja, Escala, Pregacao, TrocaEscala, Usuario,
+    PerfilUsuario, StatusAprovacao
+)
+from app.models.troca_escala import StatusTroca
+from app.services.escala_service import executar_troca_automatica
+
+PREFIXO_EMAIL = "validacao-trocas"
+
+
+def semear_escala(session, args, rng: random.Random):
+    """Associação, distrito, igrejas, pregadores e uma escala com uma pregação por igreja e data"""
+    execucao = uuid.uuid4().hex[:8]
+    associacao = Associacao(nome=f"Validação trocas {execucao}", sigla="TROCA")
+    session.add(associacao)
+    session.flush()
+
+    distrito = Distrito(associacao_id=associacao.id, nome=f"Distrito trocas {execucao}")
+    session.add(distrito)
+    session.flush()
+
+    igrejas = [Igreja(distrito_id=distrito.id, nome=f"Igreja {i + 1:02d}") for i in range(args.igrejas)]
+    pregadores = [
+        Usuario(
+            associacao_id=associacao.id,
+            distrito_id=distrito.id,
+            email=f"{PREFIXO_EMAIL}-{execucao}-{p}@example.com",
+            senha_hash="validacao",
+            nome_completo=f"Pregador {p + 1:03d}",
+            perfis=[PerfilUsuario.PREGADOR],
+            status_aprovacao=StatusAprovacao.APROVADO,
+            ativo=True,
+        )
+        for p in range(args.pregadores)
+    ]
+    session.add_all(igrejas + pregadores)
+    session.flush()
+
+    escala = Escala(distrito_id=distrito.id, mes_referencia=args.mes, ano_referencia=args.ano)
+    session.add(escala)
+    session.flush()
+
+    # Um pregador diferente por igreja em cada data
+    primeira = date(args.ano, args.mes, 1)
+    pregacoes = []
+    for d in range(args.datas):
+        data = primeira + timedelta(days=d)
+        escolhidos = rng.sample(pregadores, len(igrejas))
+        for igreja, pregador in zip(igrejas, escolhidos):
+            pregacoes.append(Pregacao(
+                escala_id=escala.id,
+                igreja_id=igreja.id,
+                pregador_id=pregador.id,
+                data_pregacao=data,
+                horario_pregacao=time(9, 0),
+                status="agendado",
+            ))
+    session.add_all(pregacoes)
+    session.flush()
+
+    # Trocas criadas todas antes da execução: muitas ficam desatualizadas
+    # quando outra troca sobre a mesma pregação é aplicada primeiro
+    trocas = []
+    for _ in range(args.trocas):
+        sol, dest = rng.sample(pregacoes, 2)
+        trocas.append(TrocaEscala(
+            pregacao_solicitante_id=sol.id,
+            usuario_solicitante_id=sol.pregador_id,
+            pregacao_destinatario_id=dest.id,
+            usuario_destinatario_id=dest.pregador_id,
+            status=StatusTroca.PENDENTE_DESTINATARIO,
+        ))
+    session.add_all(trocas)
+    session.commit()
+
+    estado_inicial = {p.id: p.pregador_id for p in pregacoes}
+    return associacao, escala, [t.id for t in trocas], estado_inicial, execucao
+
+
+def executar(troca_id):
+    session = SessionLocal()
+    try:
+        executar_troca_automatica(session, troca_id)
+        return troca_id, None
+    except ValueError as e:
+        return troca_id, str(e)
+    finally:
+        session.close()
+
+
+def executar_concorrentes(trocas_ids, threads: int):
+    """Executa as trocas em paralelo, cada uma com sua sessão; retorna [(troca_id, erro)]"""
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        return list(executor.map(executar, trocas_ids))
+
+
+def verificar_estado(session, escala_id, trocas_ids, estado_inicial, resultados):
+    """Confere o estado final da escala contra as trocas executadas; retorna a lista de falhas"""
+    session.expire_all()
+    falhas = []
+    recusadas = sum(1 for _, erro in resultados if erro)
+    aplicadas = len(resultados) - recusadas
+
+    # 1. Estado final: toda pregação continua na escala, com um pregador
+    finais = session.query(Pregacao).filter(Pregacao.escala_id == escala_id).all()
+    estado_final = {p.id: p.pregador_id for p in finais}
+    if set(estado_final) != set(estado_inicial) or any(pid is None for pid in estado_final.values()):
+        falhas.append("Pregação removida, criada ou sem pregador")
+
+    # 2. Nenhuma atribuição perdida ou duplicada
+    if Counter(estado_final.values()) != Counter(estado_inicial.values()):
+        falhas.append("Conjunto de pregadores da escala mudou (atribuição perdida ou duplicada)")
+
+    # 3. Nenhum pregador duas vezes no mesmo dia
+    por_dia = Counter((p.pregador_id, p.data_pregacao) for p in finais)
+    duplicados = [chave for chave, total in por_dia.items() if total > 1]
+    if duplicados:
+        falhas.append(f"{len(duplicados)} pregador(es) com duas pregações no mesmo dia")
+
+    # 4. Reaplicar as trocas aceitas na ordem de conclusão
+    aceitas = session.query(TrocaEscala).filter(
+        TrocaEscala.id.in_(trocas_ids),
+        TrocaEscala.status == StatusTroca.ACEITA
+    ).order_by(TrocaEscala.concluido_em).all()
+    if len(aceitas) != aplicadas:
+        falhas.append(f"{aplicadas} trocas aplicadas, mas {len(aceitas)} marcadas como aceitas")
+
+    replay = dict(estado_inicial)
+    for troca in aceitas:
+        sol, dest = troca.pregacao_solicitante_id, troca.pregacao_destinatario_id
+        if replay[sol] != troca.usuario_solicitante_id or replay[dest] != troca.usuario_destinatario_id:
+            falhas.append(f"Troca {troca.id} aplicada sobre dados desatualizados")
+            break
+        replay[sol], replay[dest] = replay[dest], replay[sol]
+    if replay != estado_final:
+        falhas.append("Reaplicar as trocas aceitas não reproduz o estado final (atualização perdida)")
+
+    pendentes = session.query(TrocaEscala).filter(
+        TrocaEscala.id.in_(trocas_ids),
+        TrocaEscala.status == StatusTroca.PENDENTE_DESTINATARIO
+    ).count()
+    if pendentes != recusadas:
+        falhas.append("Trocas recusadas não ficaram pendentes (troca aplicada pela metade)")
+
+    return falhas
+
+
+def remover_dados(session, associacao_id, execucao: str):
+    """Remove os dados sintéticos (igrejas, escala, pregações e trocas saem em cascata)"""
+    session.rollback()
+    session.query(Usuario).filter(
+        Usuario.email.like(f"{PREFIXO_EMAIL}-{execucao}-%")
+    ).delete(synchronize_session=False)
+    session.query(Associacao).filter(Associacao.id == associacao_id).delete(synchronize_session=False)
+    session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validação de trocas de escala concorrentes")
+    parser.add_argument("--igrejas", type=int, default=6)
+    parser.add_argument("--pregadores", type=int, default=12, help="Deve ser >= igrejas")
+    parser.add_argument("--datas", type=int, default=4)
+    parser.add_argument("--trocas", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--mes", type=int, default=1)
+    parser.add_argument("--ano", type=int, default=2099)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--manter", action="store_true", help="Não remover os dados sintéticos ao final")
+    args = parser.parse_args()
+
+    if args.pregadores < args.igrejas:
+        parser.error("--pregadores deve ser maior ou igual a --igrejas")
+
+    print("=== VALIDAÇÃO DE TROCAS CONCORRENTES ===\n")
+    rng = random.Random(args.seed)
+    session = SessionLocal()
+    associacao = None
+    try:
+        associacao, escala, trocas_ids, estado_inicial, execucao = semear_escala(session, args, rng)
+        print(f"📅 Escala sintética: {len(estado_inicial)} pregações, {len(trocas_ids)} trocas pendentes")
+
+        inicio = perf_counter()
+        resultados = executar_concorrentes(trocas_ids, args.threads)
+        tempo = perf_counter() - inicio
+
+        recusas = Counter(erro for _, erro in resultados if erro)
+        aplicadas = sum(1 for _, erro in resultados if not erro)
+        print(f"⚡ {len(resultados)} trocas em {tempo:.2f}s com {args.threads} threads: "
+              f"{aplicadas} aplicadas, {sum(recusas.values())} recusadas")
+        for motivo, total in recusas.most_common():
+            print(f"   - {motivo}: {total}")
+
+        falhas = verificar_estado(session, escala.id, trocas_ids, estado_inicial, resultados)
+        if falhas:
+            print("\n❌ Falhas encontradas:")
+            for falha in falhas:
+                print(f"   - {falha}")
+        else:
+            print("\n✅ Nenhuma atribuição perdida ou duplicada; estado final consistente com as trocas aceitas")
+
+    except Exception as e:
+        print(f"❌ Erro na validação: {str(e)}")
+        import traceback
+        traceback.print_exc()
+
+    finally:
+        if associacao is not None and not args.manter:
+            remover_dados(session, associacao.id, execucao)
+            print("🧹 Dados sintéticos removidos")
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Script para conferir os agregados de avaliações dos perfis de pregador
+Compara total, soma das notas e soma/quantidade de cada critério gravados em
+perfis_pregadores com os valores recalculados da tabela de avaliações.
+
+Uso:
+    python verificar_agregados_avaliacoes.py
+    python verificar_agregados_avaliacoes.py --corrigir
+    python verificar_agregados_avaliacoes.py --pregador <usuario_id>
+
+Sem --corrigir, apenas lista as divergências (sai com código 1 se houver).
+"""
+
+import sys
+import os
+import argparse
+
+# Adicionar o diretório atual ao path para importar os módulos
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import app.main  # noqa: F401  (registra todos os modelos)
+from app.core.database import SessionLocal
+from app.services.pregador_service import verificar_agregados_avaliacoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Conferência dos agregados de avaliações dos pregadores")
+    parser.add_argument("--corrigir", action="store_true", help="Gravar os valores recalculados e atualizar o score")
+    parser.add_argument("--pregador", default=None, help="Conferir apenas um pregador (usuario_id)")
+    args = parser.parse_args()
+
+    print("=== CONFERÊNCIA DOS AGREGADOS DE AVALIAÇÕES ===\n")
+    session = SessionLocal()
+    try:
+        divergencias = verificar_agregados_avaliacoes(session, corrigir=args.corrigir, pregador_id=args.pregador)
+
+        if not divergencias:
+            print("✅ Agregados consistentes com a tabela de avaliações")
+            return 0
+
+        print(f"⚠️  {len(divergencias)} perfil(is) com agregados divergentes:")
+        for divergencia in divergencias:
+            print(f"\n   Pregador {divergencia['pregador_id']}")
+            for campo, valores in divergencia["diferencas"].items():
+                print(f"      {campo}: perfil={valores['perfil']} avaliações={valores['avaliacoes']}")
+
+        if args.corrigir:
+            print(f"\n🔧 {len(divergencias)} perfil(is) corrigido(s) e score recalculado")
+            return 0
+        print("\nExecute com --corrigir para gravar os valores recalculados")
+        return 1
+
+    except Exception as e:
+        print(f"❌ Erro na conferência: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return 2
+
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Worker local de jobs de geração de escalas
+Executa os jobs enfileirados por POST /api/v1/escalas/gerar/jobs fora do processo da API.
+
+Uso:
+    python worker_geracao.py            # roda continuamente
+    python worker_geracao.py --uma-vez  # processa a fila atual e encerra
+
+Pode rodar junto com o worker interno da API (GERACAO_JOBS_WORKER_INTERNO):
+cada job é reservado por um único worker (SELECT ... FOR UPDATE SKIP LOCKED).
+"""
+
+import sys
+import os
+import signal
+import threading
+import logging
+
+# Adicionar o diretório atual ao path para importar os módulos
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import app.main  # noqa: F401  (registra todos os modelos)
+from app.services.job_geracao_service import executar_worker, processar_jobs_pendentes
+
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+
+    if "--uma-vez" in sys.argv:
+        total = processar_jobs_pendentes()
+        print(f"✅ {total} job(s) processado(s)")
+        return
+
+    parar = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: parar.set())
+    signal.signal(signal.SIGTERM, lambda *_: parar.set())
+
+    print("🚀 Worker de geração de escalas iniciado (Ctrl+C para encerrar)")
+    executar_worker(parar)
+    print("👋 Worker encerrado")
+
+
+if __name__ == "__main__":
+    main()